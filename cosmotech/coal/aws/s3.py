@@ -12,8 +12,9 @@ this module provides functions for interacting with S3 buckets, including
 uploading, downloading, and deleting files.
 """
 
+import os
 import pathlib
-from io import BytesIO
+from typing import BinaryIO
 
 import boto3
 from cosmotech.orchestrator.utils.translate import T
@@ -165,17 +166,16 @@ class S3:
                 LOGGER.info(T("coal.services.azure_storage.downloading").format(path=path_name, output=output_file))
                 bucket.download_file(_file.key, output_file)
 
-    def upload_data_stream(self, data_stream: BytesIO, file_name: str) -> None:
+    def upload_data_stream(self, data_stream: BinaryIO, file_name: str) -> None:
         """
         Upload a data stream to an S3 bucket.
 
         Args:
-            data_stream: BytesIO stream containing the data to upload
+            data_stream: Seekable binary stream (BytesIO, temporary file...) containing the data to upload
             file_name: Name of the file to create in the bucket
         """
         uploaded_file_name = self.file_prefix + file_name
-        data_stream.seek(0)
-        size = len(data_stream.read())
+        size = data_stream.seek(0, os.SEEK_END)
         data_stream.seek(0)
 
         LOGGER.info(T("coal.common.data_transfer.sending_data").format(size=size))
@@ -12,6 +12,7 @@ from cosmotech.coal.azure.adx.auth import (
 )
 from cosmotech.coal.azure.adx.ingestion import (
     IngestionStatus,
+    IngestionStatusTracker,
     check_ingestion_status,
     handle_failures,
     ingest_dataframe,
@@ -30,11 +31,20 @@ from cosmotech.coal.azure.adx.store import (
     send_pyarrow_table_to_adx,
     send_store_to_adx,
     send_table_data,
+    split_reader,
 )
 from cosmotech.coal.azure.adx.tables import (
+    DatabaseSchema,
     _drop_by_tag,
     check_and_create_table,
     create_table,
+    create_tables,
+    list_tables,
     table_exists,
 )
-from cosmotech.coal.azure.adx.utils import create_column_mapping, type_mapping
+from cosmotech.coal.azure.adx.utils import (
+    arrow_type_mapping,
+    create_column_mapping,
+    create_ingestion_mapping,
+    type_mapping,
+)
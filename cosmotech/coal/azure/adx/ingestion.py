@@ -5,13 +5,16 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
+import asyncio
 import os
+import random
 import time
 from enum import Enum
-from typing import Dict, Iterator, List, Optional, Tuple
+from typing import Callable, Container, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import pandas as pd
 import tqdm
+from azure.core.exceptions import HttpResponseError
 from azure.kusto.data import KustoClient
 from azure.kusto.data.data_format import DataFormat
 from azure.kusto.ingest import IngestionProperties, QueuedIngestClient, ReportLevel
@@ -39,6 +42,10 @@ class IngestionStatus(Enum):
 _ingest_status: Dict[str, IngestionStatus] = {}
 _ingest_times: Dict[str, float] = {}
 
+# Seconds a status message read from a queue stays hidden from the other consumers of the queue at most, messages
+# of other ingestions are made visible again once the queue is read
+STATUS_VISIBILITY_TIMEOUT = 30
+
 
 def ingest_dataframe(
     client: QueuedIngestClient,
@@ -129,6 +136,48 @@ def send_to_adx(
     return ingest_dataframe(ingest_client, database, table_name, df, drop_by_tag)
 
 
+def _receive_statuses(
+    status_queues: KustoIngestStatusQueues, source_ids: Container[str]
+) -> Iterator[Tuple[str, IngestionStatus]]:
+    """
+    Drain the success and failure queues, yielding the status of the given source ids.
+
+    Every page of every queue is read. Messages of the given source ids are deleted. The other ones stay hidden while
+    the queue is read, so each message is received once, then they are made visible again for their own consumers.
+    """
+    for queues, cast_func, status, log_function in [
+        (status_queues.success, SuccessMessage, IngestionStatus.SUCCESS, LOGGER.debug),
+        (status_queues.failure, FailureMessage, IngestionStatus.FAILURE, LOGGER.error),
+    ]:
+        for queue in queues._get_queues():
+            seen_messages = set()
+            other_messages = []
+            try:
+                for message in queue.receive_messages(
+                    messages_per_page=32, visibility_timeout=STATUS_VISIBILITY_TIMEOUT
+                ):
+                    # Messages come back once their visibility timeout ends if the queue takes that long to read
+                    if message.id in seen_messages:
+                        break
+                    seen_messages.add(message.id)
+                    source_id = str(cast_func(message.content).IngestionSourceId)
+                    if source_id in source_ids:
+                        log_function(
+                            T("coal.services.adx.status_found").format(source_id=source_id, status=status.value)
+                        )
+                        queue.delete_message(message)
+                        yield source_id, status
+                    else:
+                        other_messages.append(message)
+            finally:
+                for message in other_messages:
+                    try:
+                        queue.update_message(message, visibility_timeout=0)
+                    except HttpResponseError:
+                        # The visibility timeout already ended, the message may have been received again
+                        pass
+
+
 def check_ingestion_status(
     client: QueuedIngestClient,
     source_ids: List[str],
@@ -167,57 +216,162 @@ def check_ingestion_status(
 
     LOGGER.debug(T("coal.services.adx.checking_status").format(count=len(remaining_ids)))
 
-    # Get status queues
-    qs = KustoIngestStatusQueues(client)
-
-    def get_messages(queues):
-        _r = []
-        for q in queues:
-            _r.extend(((q, m) for m in q.receive_messages(messages_per_page=32, visibility_timeout=1)))
-        return _r
-
-    successes = get_messages(qs.success._get_queues())
-    failures = get_messages(qs.failure._get_queues())
-
-    LOGGER.debug(T("coal.services.adx.status_messages").format(success=len(successes), failure=len(failures)))
-
-    queued_ids = list(remaining_ids)
-    # Process success and failure messages
-    for messages, cast_func, status, log_function in [
-        (successes, SuccessMessage, IngestionStatus.SUCCESS, LOGGER.debug),
-        (failures, FailureMessage, IngestionStatus.FAILURE, LOGGER.error),
-    ]:
-        for _q, _m in messages:
-            dm = cast_func(_m.content)
-            to_check_ids = remaining_ids[:]
-
-            for source_id in to_check_ids:
-                if dm.IngestionSourceId == str(source_id):
-                    _ingest_status[source_id] = status
-
-                    log_function(T("coal.services.adx.status_found").format(source_id=source_id, status=status.value))
-
-                    _q.delete_message(_m)
-                    remaining_ids.remove(source_id)
-                    break
-            else:
-                # The message did not correspond to a known ID
-                continue
+    # Source ids waiting for a status, by their text form used in the status messages
+    waiting_ids = {str(source_id): source_id for source_id in remaining_ids}
+    for source_id, status in _receive_statuses(KustoIngestStatusQueues(client), waiting_ids):
+        _ingest_status[waiting_ids.pop(source_id)] = status
 
     # Check for timeouts
     actual_timeout = timeout if timeout is not None else default_timeout
-    for source_id in remaining_ids:
+    for source_id in waiting_ids.values():
         if time.time() - _ingest_times[source_id] > actual_timeout:
             _ingest_status[source_id] = IngestionStatus.TIMEOUT
             LOGGER.warning(T("coal.services.adx.ingestion_timeout").format(source_id=source_id))
 
     # Yield results for remaining IDs
-    for source_id in queued_ids:
+    for source_id in remaining_ids:
         yield source_id, _ingest_status[source_id]
 
 
+class IngestionStatusTracker:
+    """
+    Track the status of queued ingestions from the status queues of an ingest client.
+
+    Status messages are matched to the tracked source ids with a dictionary lookup, each poll drains every message
+    available in the status queues. Waiting polls the queues again as soon as statuses come in, and backs off
+    exponentially with jitter while none do. Waiting can be done from a thread or from asyncio, with a callback
+    receiving the statuses resolved by each poll.
+    """
+
+    def __init__(
+        self,
+        client: QueuedIngestClient,
+        source_ids: Iterable[str] = (),
+        timeout: int = 900,
+        min_interval: float = 1.0,
+        max_interval: float = 30.0,
+    ):
+        """
+        Args:
+            client: The QueuedIngestClient the ingestions were queued with
+            source_ids: Source ids of the ingestions to track
+            timeout: Seconds after which an ingestion without status is timed out
+            min_interval: Seconds between polls while statuses come in
+            max_interval: Maximum number of seconds between polls while no status comes in
+        """
+        self.client = client
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.statuses: Dict[str, IngestionStatus] = {}
+        self._queued_times: Dict[str, float] = {}
+        self._status_queues: Optional[KustoIngestStatusQueues] = None
+        self.add(source_ids)
+
+    def add(self, source_ids: Iterable[str]) -> None:
+        """
+        Start tracking ingestions.
+
+        Args:
+            source_ids: Source ids of the ingestions to track
+        """
+        now = time.time()
+        for source_id in map(str, source_ids):
+            if source_id not in self.statuses:
+                self.statuses[source_id] = IngestionStatus.QUEUED
+                self._queued_times[source_id] = now
+
+    @property
+    def pending(self) -> List[str]:
+        """Source ids of the tracked ingestions still waiting for a status"""
+        return list(self._queued_times)
+
+    def poll(self) -> Dict[str, IngestionStatus]:
+        """
+        Drain the status queues once and time out the ingestions waiting for too long.
+
+        Returns:
+            The statuses resolved by this poll, by source id
+        """
+        if not self._queued_times:
+            return {}
+        LOGGER.debug(T("coal.services.adx.checking_status").format(count=len(self._queued_times)))
+        if self._status_queues is None:
+            self._status_queues = KustoIngestStatusQueues(self.client)
+
+        resolved = dict()
+        for source_id, status in _receive_statuses(self._status_queues, self._queued_times):
+            del self._queued_times[source_id]
+            resolved[source_id] = status
+
+        now = time.time()
+        for source_id, queued_time in list(self._queued_times.items()):
+            if now - queued_time > self.timeout:
+                LOGGER.warning(T("coal.services.adx.ingestion_timeout").format(source_id=source_id))
+                resolved[source_id] = IngestionStatus.TIMEOUT
+                del self._queued_times[source_id]
+
+        self.statuses.update(resolved)
+        return resolved
+
+    def _next_interval(self, interval: float, resolved: Dict[str, IngestionStatus]) -> float:
+        return self.min_interval if resolved else min(interval * 2, self.max_interval)
+
+    @staticmethod
+    def _jitter(interval: float) -> float:
+        # Spread the polls of concurrent trackers over the second half of the interval
+        return random.uniform(interval / 2, interval)
+
+    def wait(
+        self, on_resolved: Optional[Callable[[Dict[str, IngestionStatus]], None]] = None
+    ) -> Dict[str, IngestionStatus]:
+        """
+        Poll the status queues until every tracked ingestion has a status.
+
+        Args:
+            on_resolved: Called with the statuses resolved by each poll
+
+        Returns:
+            The status of every tracked ingestion, by source id
+        """
+        interval = self.min_interval
+        while self._queued_times:
+            resolved = self.poll()
+            if resolved and on_resolved is not None:
+                on_resolved(resolved)
+            if self._queued_times:
+                interval = self._next_interval(interval, resolved)
+                time.sleep(self._jitter(interval))
+        return self.statuses
+
+    async def wait_async(
+        self, on_resolved: Optional[Callable[[Dict[str, IngestionStatus]], None]] = None
+    ) -> Dict[str, IngestionStatus]:
+        """
+        Poll the status queues until every tracked ingestion has a status, without blocking the event loop.
+
+        Args:
+            on_resolved: Called with the statuses resolved by each poll
+
+        Returns:
+            The status of every tracked ingestion, by source id
+        """
+        interval = self.min_interval
+        while self._queued_times:
+            resolved = await asyncio.to_thread(self.poll)
+            if resolved and on_resolved is not None:
+                on_resolved(resolved)
+            if self._queued_times:
+                interval = self._next_interval(interval, resolved)
+                await asyncio.sleep(self._jitter(interval))
+        return self.statuses
+
+
 def monitor_ingestion(
-    ingest_client: QueuedIngestClient, source_ids: List[str], table_ingestion_id_mapping: Dict[str, str]
+    ingest_client: QueuedIngestClient,
+    source_ids: List[str],
+    table_ingestion_id_mapping: Dict[str, str],
+    timeout: int = 900,
 ) -> bool:
     """
     Monitor the ingestion process with progress reporting.
@@ -226,55 +380,34 @@ def monitor_ingestion(
         ingest_client: The ingest client
         source_ids: List of source IDs to monitor
         table_ingestion_id_mapping: Mapping of source IDs to table names
+        timeout: Seconds after which an ingestion without status is timed out
 
     Returns:
         bool: True if any failures occurred, False otherwise
     """
     has_failures = False
-    source_ids_copy = source_ids.copy()
+    tables = {str(source_id): table for source_id, table in table_ingestion_id_mapping.items()}
+    tracker = IngestionStatusTracker(ingest_client, source_ids, timeout=timeout)
 
     LOGGER.info(T("coal.services.adx.waiting_ingestion"))
 
-    with tqdm.tqdm(desc="Ingestion status", total=len(source_ids_copy)) as pbar:
-        while any(
-            list(
-                map(
-                    lambda _status: _status[1] in (IngestionStatus.QUEUED, IngestionStatus.UNKNOWN),
-                    results := list(check_ingestion_status(ingest_client, source_ids_copy)),
-                )
-            )
-        ):
-            # Check for failures
-            for ingestion_id, ingestion_status in results:
+    with tqdm.tqdm(desc="Ingestion status", total=len(tracker.statuses)) as pbar:
+
+        def _on_resolved(resolved: Dict[str, IngestionStatus]):
+            nonlocal has_failures
+            for ingestion_id, ingestion_status in resolved.items():
                 if ingestion_status == IngestionStatus.FAILURE:
                     LOGGER.error(
                         T("coal.services.adx.ingestion_failed").format(
-                            ingestion_id=ingestion_id, table=table_ingestion_id_mapping.get(ingestion_id)
+                            ingestion_id=ingestion_id, table=tables.get(ingestion_id)
                         )
                     )
                     has_failures = True
-
-            cleared_ids = list(
-                result for result in results if result[1] not in (IngestionStatus.QUEUED, IngestionStatus.UNKNOWN)
-            )
-
-            for ingestion_id, ingestion_status in cleared_ids:
-                pbar.update(1)
-                source_ids_copy.remove(ingestion_id)
-
-            time.sleep(1)
+            pbar.update(len(resolved))
             if os.environ.get("CSM_USE_RICH", "False").lower() in ("true", "1", "yes", "t", "y"):
                 pbar.refresh()
-        else:
-            for ingestion_id, ingestion_status in results:
-                if ingestion_status == IngestionStatus.FAILURE:
-                    LOGGER.error(
-                        T("coal.services.adx.ingestion_failed").format(
-                            ingestion_id=ingestion_id, table=table_ingestion_id_mapping.get(ingestion_id)
-                        )
-                    )
-                    has_failures = True
-        pbar.update(len(source_ids_copy))
+
+        tracker.wait(on_resolved=_on_resolved)
 
     LOGGER.info(T("coal.services.adx.ingestion_completed"))
     return has_failures
@@ -9,24 +9,72 @@ import os
 import tempfile
 import time
 import uuid
-from typing import Any, Dict, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 import pyarrow
 import pyarrow.csv as pc
+import pyarrow.parquet as pq
 from azure.kusto.data import KustoClient
-from azure.kusto.data.data_format import DataFormat
+from azure.kusto.data.data_format import DataFormat, IngestionMappingKind
 from azure.kusto.ingest import IngestionProperties, QueuedIngestClient, ReportLevel
 from cosmotech.orchestrator.utils.translate import T
 
 from cosmotech.coal.azure.adx.auth import initialize_clients
 from cosmotech.coal.azure.adx.ingestion import handle_failures, monitor_ingestion
-from cosmotech.coal.azure.adx.tables import _drop_by_tag, check_and_create_table
+from cosmotech.coal.azure.adx.tables import DatabaseSchema, _drop_by_tag, create_tables
+from cosmotech.coal.azure.adx.utils import create_column_mapping, create_ingestion_mapping
+from cosmotech.coal.store.csv import write_csv_stream
 from cosmotech.coal.store.store import Store
+from cosmotech.coal.utils.configuration import Configuration
 from cosmotech.coal.utils.logger import LOGGER
 
+# Formats of the files sent for ingestion
+DATA_FORMATS = ("csv", "parquet")
+# Uncompressed size of the data sent in each ingestion file, in bytes
+DEFAULT_CHUNK_BYTES = 1 << 30
+
+
+def split_reader(reader: pyarrow.RecordBatchReader, chunk_bytes: int) -> Iterator[pyarrow.RecordBatchReader]:
+    """
+    Split the batches of a reader in consecutive readers holding up to chunk_bytes of uncompressed data each.
+
+    Chunks are cut between batches: a batch bigger than chunk_bytes makes a chunk on its own. Chunks are read one
+    after the other, the batches a chunk did not yield yet are skipped once the next one is requested.
+
+    Args:
+        reader: reader to split
+        chunk_bytes: maximum size of the batches of a chunk, in bytes
+
+    Returns:
+        An iterator over readers yielding the batches of each chunk
+    """
+    batches = iter(reader)
+    next_batch = next(batches, None)
+
+    def _chunk():
+        nonlocal next_batch
+        size = 0
+        while next_batch is not None and (size == 0 or size + next_batch.nbytes <= chunk_bytes):
+            size += next_batch.nbytes
+            yield next_batch
+            next_batch = next(batches, None)
+
+    while next_batch is not None:
+        chunk = _chunk()
+        yield pyarrow.RecordBatchReader.from_batches(reader.schema, chunk)
+        for _ in chunk:
+            pass
+
 
 def send_table_data(
-    ingest_client: QueuedIngestClient, database: str, table_name: str, data: pyarrow.Table, operation_tag: str
+    ingest_client: QueuedIngestClient,
+    database: str,
+    table_name: str,
+    data: Union[pyarrow.Table, pyarrow.RecordBatchReader],
+    operation_tag: str,
+    data_format: str = "csv",
 ) -> Tuple[str, str]:
     """
     Send a PyArrow table to ADX.
@@ -35,52 +83,154 @@ def send_table_data(
         ingest_client: The ingest client
         database: The database name
         table_name: The table name
-        data: The PyArrow table data
+        data: The PyArrow table data, or a reader streaming it
         operation_tag: The operation tag for tracking
+        data_format: The format of the file sent for ingestion, one of DATA_FORMATS
 
     Returns:
         tuple: (source_id, table_name)
     """
     LOGGER.debug(T("coal.services.adx.sending_data").format(table_name=table_name))
-    result = send_pyarrow_table_to_adx(ingest_client, database, table_name, data, operation_tag)
+    result = send_pyarrow_table_to_adx(ingest_client, database, table_name, data, operation_tag, data_format)
     return result.source_id, table_name
 
 
+def _read_column_types(store: Store, target_table_name: str) -> Optional[Dict[str, str]]:
+    """ADX column types of a store table guessed from its first batch, None if the table has no rows"""
+    LOGGER.info(T("coal.services.adx.working_on_table").format(table_name=target_table_name))
+    reader = store.iter_batches(target_table_name)
+    first_batch = next((batch for batch in reader if batch.num_rows), None)
+    reader.close()
+
+    if first_batch is None:
+        LOGGER.warning(T("coal.services.adx.table_empty").format(table_name=target_table_name))
+        return None
+    return create_column_mapping(pyarrow.Table.from_batches([first_batch]))
+
+
+def _send_table(
+    store: Store,
+    ingest_client: QueuedIngestClient,
+    database: str,
+    target_table_name: str,
+    operation_tag: str,
+    data_format: str,
+    chunk_bytes: int,
+) -> List[str]:
+    """Queue the ingestion of the chunks of a store table, returns their source ids"""
+    _s_time = time.perf_counter()
+    source_ids = []
+    for chunk_index, chunk in enumerate(split_reader(store.iter_batches(target_table_name), chunk_bytes)):
+        LOGGER.debug(T("coal.services.adx.sending_chunk").format(chunk=chunk_index, table_name=target_table_name))
+        source_id, _ = send_table_data(ingest_client, database, target_table_name, chunk, operation_tag, data_format)
+        source_ids.append(source_id)
+
+    _up_time = time.perf_counter()
+    LOGGER.info(
+        T("coal.services.adx.table_sent").format(
+            table_name=target_table_name, count=len(source_ids), time=f"{_up_time - _s_time:0.3}"
+        )
+    )
+    return source_ids
+
+
+def _run_tasks(executor: ThreadPoolExecutor, tasks: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+    """
+    Run tasks in the executor and gather their results by name.
+
+    If a task fails, the tasks not started yet are cancelled and the running ones are finished before the error is
+    raised.
+    """
+    futures = {executor.submit(task): name for name, task in tasks.items()}
+    results = dict()
+    try:
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    except Exception:
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        raise
+    return results
+
+
 def process_tables(
-    store: Store, kusto_client: KustoClient, ingest_client: QueuedIngestClient, database: str, operation_tag: str
+    store: Store,
+    kusto_client: KustoClient,
+    ingest_client: QueuedIngestClient,
+    database: str,
+    operation_tag: str,
+    data_format: str = "csv",
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    max_workers: int = 1,
+    schema: Optional[DatabaseSchema] = None,
 ) -> Tuple[List[str], Dict[str, str]]:
     """
     Process all tables in the store.
 
+    Column types of each table are guessed from its first batch, the tables missing from the database are created
+    with a single database script. Tables are then sent as one ingestion per chunk of chunk_bytes of uncompressed
+    data, ADX ingests the chunks of a table in parallel. Every chunk is tagged with the operation tag, the source
+    ids returned hold one id per chunk.
+
+    With several workers, tables are read from the store and uploaded concurrently. If a table fails, the tables
+    not started yet are left out and the ones being sent are finished before the error is raised, so dropping the
+    operation tag afterwards removes everything sent.
+
     Args:
         store: The data store
         kusto_client: The Kusto client
         ingest_client: The ingest client
         database: The database name
         operation_tag: The operation tag for tracking
+        data_format: The format of the files sent for ingestion, one of DATA_FORMATS
+        chunk_bytes: The maximum uncompressed size of the data sent in each ingestion, in bytes
+        max_workers: The maximum number of tables sent at the same time
+        schema: Snapshot of the database tables, fetched from the database when not given
 
     Returns:
         tuple: (source_ids, table_ingestion_id_mapping)
     """
     source_ids = []
     table_ingestion_id_mapping = dict()
+    schema = schema or DatabaseSchema(kusto_client, database)
 
     LOGGER.debug(T("coal.services.adx.listing_tables"))
     table_list = list(store.list_tables())
 
-    for target_table_name in table_list:
-        LOGGER.info(T("coal.services.adx.working_on_table").format(table_name=target_table_name))
-        data = store.get_table(target_table_name)
-
-        if data.num_rows < 1:
-            LOGGER.warning(T("coal.services.adx.table_empty").format(table_name=target_table_name))
-            continue
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        column_types = _run_tasks(executor, {name: partial(_read_column_types, store, name) for name in table_list})
+        tables_to_send = [name for name in table_list if column_types[name] is not None]
+
+        _s_time = time.perf_counter()
+        LOGGER.debug(T("coal.services.adx.checking_table_exists"))
+        missing_tables = {name: column_types[name] for name in tables_to_send if not schema.table_exists(name)}
+        if missing_tables:
+            LOGGER.debug(T("coal.services.adx.creating_nonexistent_table"))
+            if not create_tables(kusto_client, database, missing_tables):
+                # Failures got logged by create_tables, sending data to tables missing from ADX is pointless
+                raise RuntimeError(T("coal.services.adx.tables_creation_failed").format(tables=list(missing_tables)))
+            schema.refresh()
+        LOGGER.debug(
+            T("coal.common.timing.operation_completed").format(
+                operation="Create missing tables in ADX", time=f"{time.perf_counter() - _s_time:0.3}"
+            )
+        )
 
-        check_and_create_table(kusto_client, database, target_table_name, data)
+        table_source_ids = _run_tasks(
+            executor,
+            {
+                name: partial(
+                    _send_table, store, ingest_client, database, name, operation_tag, data_format, chunk_bytes
+                )
+                for name in tables_to_send
+            },
+        )
 
-        source_id, _ = send_table_data(ingest_client, database, target_table_name, data, operation_tag)
-        source_ids.append(source_id)
-        table_ingestion_id_mapping[source_id] = target_table_name
+    for target_table_name in tables_to_send:
+        for source_id in table_source_ids[target_table_name]:
+            source_ids.append(source_id)
+            table_ingestion_id_mapping[source_id] = target_table_name
 
     return source_ids, table_ingestion_id_mapping
 
@@ -89,23 +239,60 @@ def send_pyarrow_table_to_adx(
     client: QueuedIngestClient,
     database: str,
     table_name: str,
-    table_data: pyarrow.Table,
+    table_data: Union[pyarrow.Table, pyarrow.RecordBatchReader],
     drop_by_tag: Optional[str] = None,
+    data_format: str = "csv",
 ):
+    """
+    Write a PyArrow table to a temporary file and queue its ingestion in ADX.
+
+    CSV files are written without header, their columns are matched to the ADX table columns by position.
+    Parquet files keep the Arrow column types, their columns are matched to the ADX table columns by name.
+
+    Args:
+        client: The ingest client
+        database: The database name
+        table_name: The table name
+        table_data: The PyArrow table data, or a reader streaming it
+        drop_by_tag: Tag set on the ingested extents, to drop them later
+        data_format: The format of the file sent for ingestion, one of DATA_FORMATS
+
+    Returns:
+        The ingestion result
+    """
+    if data_format not in DATA_FORMATS:
+        raise ValueError(
+            T("coal.services.adx.unknown_data_format").format(data_format=data_format, formats=", ".join(DATA_FORMATS))
+        )
     drop_by_tags = [drop_by_tag] if (drop_by_tag is not None) else None
 
+    if data_format == "parquet":
+        format_properties = dict(
+            data_format=DataFormat.PARQUET,
+            column_mappings=create_ingestion_mapping(table_data.schema),
+            ingestion_mapping_kind=IngestionMappingKind.PARQUET,
+        )
+    else:
+        format_properties = dict(data_format=DataFormat.CSV)
     properties = IngestionProperties(
         database=database,
         table=table_name,
-        data_format=DataFormat.CSV,
         drop_by_tags=drop_by_tags,
         report_level=ReportLevel.FailuresAndSuccesses,
         flush_immediately=True,
+        **format_properties,
     )
 
-    file_name = f"adx_{database}_{table_name}_{int(time.time())}_{uuid.uuid4()}.csv"
+    file_name = f"adx_{database}_{table_name}_{int(time.time())}_{uuid.uuid4()}.{data_format}"
     temp_file_path = os.path.join(os.environ.get("CSM_TEMP_ABSOLUTE_PATH", tempfile.gettempdir()), file_name)
-    pc.write_csv(table_data, temp_file_path, pc.WriteOptions(include_header=False))
+    if data_format == "parquet":
+        with pq.ParquetWriter(temp_file_path, table_data.schema) as writer:
+            for batch in table_data if isinstance(table_data, pyarrow.RecordBatchReader) else table_data.to_batches():
+                writer.write_batch(batch)
+    elif isinstance(table_data, pyarrow.RecordBatchReader):
+        write_csv_stream(table_data, temp_file_path, include_header=False)
+    else:
+        pc.write_csv(table_data, temp_file_path, pc.WriteOptions(include_header=False))
     try:
         return client.ingest_from_file(temp_file_path, properties)
     finally:
@@ -119,6 +306,9 @@ def send_store_to_adx(
     wait: bool = False,
     tag: Optional[str] = None,
     store_location: Optional[str] = None,
+    data_format: str = "csv",
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    max_workers: int = 1,
 ) -> Union[bool, Any]:
     """
     Send data from the store to Azure Data Explorer.
@@ -130,6 +320,11 @@ def send_store_to_adx(
         wait: Whether to wait for ingestion to complete
         tag: The operation tag for tracking (will generate a unique one if not provided)
         store_location: Optional store location (uses default if not provided)
+        data_format: The format of the files sent for ingestion, one of DATA_FORMATS. Parquet files are smaller
+            and keep the column types of the store
+        chunk_bytes: The maximum uncompressed size of the data sent in each ingestion, in bytes. Large tables are
+            split in several ingestions, all tagged with the operation tag
+        max_workers: The maximum number of tables sent at the same time
 
     Returns:
         bool: True if successful, False otherwise
@@ -141,15 +336,17 @@ def send_store_to_adx(
     # Initialize clients
     kusto_client, ingest_client = initialize_clients(adx_uri, adx_ingest_uri)
     database = database_name
+    # Tables of the database are fetched once and shared by every table check
+    schema = DatabaseSchema(kusto_client, database)
 
     # Load datastore
     LOGGER.debug(T("coal.services.adx.loading_datastore"))
-    store = Store(store_location=store_location)
+    store = Store(configuration=Configuration({"coal": {"store": store_location}})) if store_location else Store()
 
     try:
         # Process tables
         source_ids, table_ingestion_id_mapping = process_tables(
-            store, kusto_client, ingest_client, database, operation_tag
+            store, kusto_client, ingest_client, database, operation_tag, data_format, chunk_bytes, max_workers, schema
         )
 
         LOGGER.info(T("coal.services.adx.data_sent"))
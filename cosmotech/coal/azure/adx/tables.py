@@ -5,7 +5,8 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
-from typing import Dict
+import threading
+from typing import Dict, Optional, Set
 
 import pyarrow
 from azure.kusto.data import KustoClient
@@ -14,6 +15,30 @@ from cosmotech.orchestrator.utils.translate import T
 from cosmotech.coal.utils.logger import LOGGER
 
 
+def list_tables(client: KustoClient, database: str) -> Set[str]:
+    """
+    Get the names of the tables of the database with a single schema query.
+
+    Args:
+        client: The KustoClient to use
+        database: The name of the database
+
+    Returns:
+        set: The names of the tables of the database
+    """
+    get_tables_query = f".show database ['{database}'] schema| distinct TableName"
+    tables = client.execute(database, get_tables_query)
+    return {r[0] for r in tables.primary_results[0]}
+
+
+def _log_table_exists(table_name: str, exists: bool) -> bool:
+    if exists:
+        LOGGER.debug(T("coal.services.adx.table_exists").format(table_name=table_name))
+    else:
+        LOGGER.debug(T("coal.services.adx.table_not_exists").format(table_name=table_name))
+    return exists
+
+
 def table_exists(client: KustoClient, database: str, table_name: str) -> bool:
     """
     Check if a table exists in the database.
@@ -27,20 +52,53 @@ def table_exists(client: KustoClient, database: str, table_name: str) -> bool:
         bool: True if the table exists, False otherwise
     """
     LOGGER.debug(T("coal.services.adx.checking_table").format(database=database, table_name=table_name))
+    return _log_table_exists(table_name, table_name in list_tables(client, database))
 
-    get_tables_query = f".show database ['{database}'] schema| distinct TableName"
-    tables = client.execute(database, get_tables_query)
-
-    for r in tables.primary_results[0]:
-        if table_name == r[0]:
-            LOGGER.debug(T("coal.services.adx.table_exists").format(table_name=table_name))
-            return True
 
-    LOGGER.debug(T("coal.services.adx.table_not_exists").format(table_name=table_name))
-    return False
+class DatabaseSchema:
+    """
+    Snapshot of the tables of an ADX database.
 
+    The table names are fetched with a single schema query on first use, then looked up in memory. The snapshot
+    can be shared by threads, it has to be refreshed once tables get created.
+    """
 
-def check_and_create_table(kusto_client: KustoClient, database: str, table_name: str, data: pyarrow.Table) -> bool:
+    def __init__(self, client: KustoClient, database: str):
+        self.client = client
+        self.database = database
+        self._tables: Optional[Set[str]] = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """Fetch the table names of the database again"""
+        with self._lock:
+            self._tables = list_tables(self.client, self.database)
+
+    def table_exists(self, table_name: str) -> bool:
+        """
+        Check if a table exists in the snapshot, fetching it on first use.
+
+        Args:
+            table_name: The name of the table to check
+
+        Returns:
+            bool: True if the table exists, False otherwise
+        """
+        LOGGER.debug(T("coal.services.adx.checking_table").format(database=self.database, table_name=table_name))
+        with self._lock:
+            if self._tables is None:
+                self._tables = list_tables(self.client, self.database)
+            exists = table_name in self._tables
+        return _log_table_exists(table_name, exists)
+
+
+def check_and_create_table(
+    kusto_client: KustoClient,
+    database: str,
+    table_name: str,
+    data: pyarrow.Table,
+    schema: Optional[DatabaseSchema] = None,
+) -> bool:
     """
     Check if a table exists and create it if it doesn't.
 
@@ -49,17 +107,25 @@ def check_and_create_table(kusto_client: KustoClient, database: str, table_name:
         database: The database name
         table_name: The table name
         data: The PyArrow table data
+        schema: Snapshot of the database tables to check against, refreshed if the table gets created.
+            The database is queried when not given
 
     Returns:
         bool: True if the table was created, False if it already existed
     """
     LOGGER.debug(T("coal.services.adx.checking_table_exists"))
-    if not table_exists(kusto_client, database, table_name):
+    if schema is not None:
+        exists = schema.table_exists(table_name)
+    else:
+        exists = table_exists(kusto_client, database, table_name)
+    if not exists:
         from cosmotech.coal.azure.adx.utils import create_column_mapping
 
         mapping = create_column_mapping(data)
         LOGGER.debug(T("coal.services.adx.creating_nonexistent_table"))
         create_table(kusto_client, database, table_name, mapping)
+        if schema is not None:
+            schema.refresh()
         return True
     return False
 
@@ -100,12 +166,7 @@ def create_table(client: KustoClient, database: str, table_name: str, schema: Di
     """
     LOGGER.debug(T("coal.services.adx.creating_table").format(database=database, table_name=table_name))
 
-    create_query = f".create-merge table {table_name}("
-
-    for column_name, column_type in schema.items():
-        create_query += f"{column_name}:{column_type},"
-
-    create_query = create_query[:-1] + ")"
+    create_query = _create_merge_command(table_name, schema)
 
     LOGGER.debug(T("coal.services.adx.create_query").format(query=create_query))
 
@@ -116,3 +177,48 @@ def create_table(client: KustoClient, database: str, table_name: str, schema: Di
     except Exception as e:
         LOGGER.error(T("coal.services.adx.table_creation_error").format(table_name=table_name, error=str(e)))
         return False
+
+
+def _create_merge_command(table_name: str, schema: Dict[str, str]) -> str:
+    columns = ",".join(f"{column_name}:{column_type}" for column_name, column_type in schema.items())
+    return f".create-merge table {table_name}({columns})"
+
+
+def create_tables(client: KustoClient, database: str, schemas: Dict[str, Dict[str, str]]) -> bool:
+    """
+    Create several tables in the database with a single database script.
+
+    Args:
+        client: The KustoClient to use
+        database: The name of the database
+        schemas: Dictionary mapping the names of the tables to create to their column types
+
+    Returns:
+        bool: True if every table was created successfully, False otherwise
+    """
+    if not schemas:
+        return True
+    for table_name in schemas:
+        LOGGER.debug(T("coal.services.adx.creating_table").format(database=database, table_name=table_name))
+
+    commands = "\n".join(_create_merge_command(table_name, schema) for table_name, schema in schemas.items())
+    create_query = f".execute database script <|\n{commands}"
+
+    LOGGER.debug(T("coal.services.adx.create_query").format(query=create_query))
+
+    try:
+        results = client.execute(database, create_query)
+    except Exception as e:
+        LOGGER.error(T("coal.services.adx.tables_creation_error").format(tables=list(schemas), error=str(e)))
+        return False
+
+    # The script returns the outcome of each of its commands
+    failures = [row for row in results.primary_results[0] if row["Result"] != "Completed"]
+    for row in failures:
+        LOGGER.error(
+            T("coal.services.adx.script_command_failed").format(command=row["CommandText"], reason=row["Reason"])
+        )
+    if not failures:
+        for table_name in schemas:
+            LOGGER.info(T("coal.services.adx.table_created").format(table_name=table_name))
+    return not failures
@@ -5,10 +5,11 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 import dateutil.parser
 import pyarrow
+from azure.kusto.ingest import ColumnMapping
 from cosmotech.orchestrator.utils.translate import T
 
 from cosmotech.coal.utils.logger import LOGGER
@@ -69,3 +70,54 @@ def type_mapping(key: str, key_example_value: Any) -> str:
 
     # Default case to string
     return "string"
+
+
+def arrow_type_mapping(data_type: pyarrow.DataType) -> str:
+    """
+    Map Arrow types to ADX types.
+
+    Args:
+        data_type: The Arrow type of a column
+
+    Returns:
+        str: The name of the type used in ADX
+    """
+    if pyarrow.types.is_boolean(data_type):
+        return "bool"
+    if pyarrow.types.is_integer(data_type):
+        return "long"
+    if pyarrow.types.is_floating(data_type):
+        return "real"
+    if pyarrow.types.is_decimal(data_type):
+        return "decimal"
+    if pyarrow.types.is_timestamp(data_type) or pyarrow.types.is_date(data_type):
+        return "datetime"
+    if pyarrow.types.is_duration(data_type):
+        return "timespan"
+    if pyarrow.types.is_nested(data_type):
+        return "dynamic"
+    return "string"
+
+
+def create_ingestion_mapping(schema: pyarrow.Schema) -> List[ColumnMapping]:
+    """
+    Create the ingestion mapping of a Parquet file written from an Arrow schema.
+
+    Columns of the file are mapped by name to the columns of the ADX table, the ADX types are only used by ADX for
+    columns missing from the table. Paths use the bracket notation so any column name can be mapped.
+
+    Args:
+        schema: The Arrow schema of the ingested data
+
+    Returns:
+        list: The column mappings of the Parquet ingestion
+    """
+    return [
+        ColumnMapping(field.name, arrow_type_mapping(field.type), path=f"$['{_escape_path_name(field.name)}']")
+        for field in schema
+    ]
+
+
+def _escape_path_name(name: str) -> str:
+    """Escape a column name for a quoted member of a JSON path"""
+    return name.replace("\\", "\\\\").replace("'", "\\'")
@@ -12,15 +12,17 @@ This module provides functions for interacting with Azure Blob Storage,
 including uploading data from the Store.
 """
 
-from io import BytesIO
+import os
+import tempfile
+from typing import BinaryIO
 
-import pyarrow.csv as pc
-import pyarrow.parquet as pq
 from azure.identity import ClientSecretCredential
 from azure.storage.blob import BlobServiceClient
 from cosmotech.orchestrator.utils.translate import T
 
-from cosmotech.coal.store.store import Store
+from cosmotech.coal.store.csv import write_csv_stream
+from cosmotech.coal.store.parquet import write_parquet_stream
+from cosmotech.coal.store.store import Store, non_empty_reader
 from cosmotech.coal.utils.configuration import Configuration
 from cosmotech.coal.utils.logger import LOGGER
 
@@ -62,18 +64,17 @@ def dump_store_to_azure(
         ),
     ).get_container_client(configuration.azure.container_name)
 
-    def data_upload(data_stream: BytesIO, file_name: str):
+    def data_upload(data_stream: BinaryIO, file_name: str):
         uploaded_file_name = file_prefix + file_name
-        data_stream.seek(0)
-        size = len(data_stream.read())
+        size = data_stream.seek(0, os.SEEK_END)
         data_stream.seek(0)
 
         LOGGER.info(T("coal.common.data_transfer.sending_data").format(size=size))
         container_client.upload_blob(name=uploaded_file_name, data=data_stream, length=size, overwrite=True)
 
     if output_type == "sqlite":
-        _file_path = _s._database_path
-        _file_name = "db.sqlite"
+        _file_path = _s.database_file()
+        _file_name = _file_path.name
         _uploaded_file_name = file_prefix + _file_name
         LOGGER.info(
             T("coal.common.data_transfer.file_sent").format(file_path=_file_path, uploaded_name=_uploaded_file_name)
@@ -85,22 +86,23 @@ def dump_store_to_azure(
         if selected_tables:
             tables = [t for t in tables if t in selected_tables]
         for table_name in tables:
-            _data_stream = BytesIO()
             _file_name = None
-            _data = _s.get_table(table_name)
-            if not len(_data):
+            _data = non_empty_reader(_s.iter_batches(table_name))
+            if _data is None:
                 LOGGER.info(T("coal.common.data_transfer.table_empty").format(table_name=table_name))
                 continue
-            if output_type == "csv":
-                _file_name = table_name + ".csv"
-                pc.write_csv(_data, _data_stream)
-            elif output_type == "parquet":
-                _file_name = table_name + ".parquet"
-                pq.write_table(_data, _data_stream)
-            LOGGER.info(
-                T("coal.common.data_transfer.sending_table").format(table_name=table_name, output_type=output_type)
-            )
-            data_upload(_data_stream, _file_name)
+            # Files are written on disk batch by batch so memory use does not depend on the table size
+            with tempfile.TemporaryFile(dir=os.environ.get("CSM_TEMP_ABSOLUTE_PATH")) as _data_stream:
+                if output_type == "csv":
+                    _file_name = table_name + ".csv"
+                    write_csv_stream(_data, _data_stream)
+                elif output_type == "parquet":
+                    _file_name = table_name + ".parquet"
+                    write_parquet_stream(_data, _data_stream)
+                LOGGER.info(
+                    T("coal.common.data_transfer.sending_table").format(table_name=table_name, output_type=output_type)
+                )
+                data_upload(_data_stream, _file_name)
 
 
 def delete_azure_blobs(configuration: Configuration = Configuration()) -> None:
@@ -19,4 +19,5 @@ from cosmotech.coal.postgresql.runner import (
 # Re-export functions from the store module
 from cosmotech.coal.postgresql.store import (
     dump_store_to_postgresql,
+    load_from_postgresql,
 )
@@ -12,6 +12,8 @@ This module provides functions for interacting with PostgreSQL databases
 for runner metadata operations.
 """
 
+from typing import Optional
+
 from adbc_driver_postgresql import dbapi
 from cosmotech.orchestrator.utils.translate import T
 
@@ -84,6 +86,34 @@ def send_runner_metadata_to_postgresql(
     return runner.get("lastRunInfo").get("lastRunId")
 
 
+def get_runner_run_id_from_postgresql(
+    configuration: Configuration,
+) -> Optional[str]:
+    """
+    Get the run id recorded for the runner in the metadata table.
+
+    Args:
+        configuration: coal configuration
+
+    Returns:
+        The last run id sent for the runner, None if no metadata is recorded for it
+    """
+    _psql = PostgresUtils(configuration)
+    if not _psql.is_metadata_exists():
+        return None
+
+    with dbapi.connect(_psql.full_uri, autocommit=True) as conn:
+        with conn.cursor() as curs:
+            schema_table = f"{_psql.db_schema}.{_psql.metadata_table_name}"
+            sql_select_run_id = f"""
+                SELECT last_csm_run_id FROM {schema_table}
+                WHERE id= $1;
+            """
+            curs.execute(sql_select_run_id, (configuration.cosmotech.runner_id,))
+            row = curs.fetchone()
+    return row[0] if row else None
+
+
 def remove_runner_metadata_from_postgresql(
     configuration: Configuration,
 ) -> str:
@@ -12,12 +12,23 @@ This module provides functions for interacting with PostgreSQL databases
 for store operations.
 """
 
+import pathlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from time import perf_counter
+from typing import Optional
 
+import pyarrow as pa
 from cosmotech.orchestrator.utils.translate import T
 
-from cosmotech.coal.postgresql.utils import PostgresUtils
-from cosmotech.coal.store.store import Store
+from cosmotech.coal.postgresql.utils import PostgresUtils, _quote
+from cosmotech.coal.store.store import (
+    Store,
+    non_empty_reader,
+    read_spool,
+    spool_reader,
+)
 from cosmotech.coal.utils.configuration import Configuration
 from cosmotech.coal.utils.logger import LOGGER
 
@@ -35,6 +46,14 @@ def dump_store_to_postgresql(
     force_encode: bool = False,
     selected_tables: list[str] = [],
     fk_id: str = None,
+    max_workers: int = 1,
+    staged: bool = False,
+    unlogged: bool = False,
+    upsert_keys: Optional[list[str]] = None,
+    skip_unchanged: bool = False,
+    defer_constraints: bool = False,
+    not_valid: bool = False,
+    partition_by_run: bool = False,
 ) -> None:
     """
     Dump Store data to a PostgreSQL database.
@@ -52,6 +71,15 @@ def dump_store_to_postgresql(
         force_encode: force password encoding to percent encoding
         selected_tables: list of tables to send
         fk_id: foreign key id to add to all table on all rows
+        max_workers: maximum number of tables sent at the same time, each over its own connection
+        staged: load each table in a staging table, then replace or append to the target table in one transaction
+        unlogged: create staging tables as UNLOGGED, faster to load but not crash safe until published
+        upsert_keys: columns identifying rows, merge each table in the target one instead of replacing or appending
+        skip_unchanged: leave untouched the rows of an upsert whose content did not change
+        defer_constraints: create the foreign keys of all tables in a single transaction once every table is sent
+        not_valid: create deferred foreign keys as NOT VALID, then validate them without blocking writes
+        partition_by_run: send each table as the partition of fk_id in a table LIST-partitioned on csm_run_id,
+            replacing the previous partition of fk_id, replace, upsert and constraint options are then ignored
     """
     _c = Configuration(
         {
@@ -69,7 +97,88 @@ def dump_store_to_postgresql(
         }
     )
 
-    dump_store_to_postgresql_from_conf(configuration=_c, replace=replace, selected_tables=selected_tables, fk_id=fk_id)
+    dump_store_to_postgresql_from_conf(
+        configuration=_c,
+        replace=replace,
+        selected_tables=selected_tables,
+        fk_id=fk_id,
+        max_workers=max_workers,
+        staged=staged,
+        unlogged=unlogged,
+        upsert_keys=upsert_keys,
+        skip_unchanged=skip_unchanged,
+        defer_constraints=defer_constraints,
+        not_valid=not_valid,
+        partition_by_run=partition_by_run,
+    )
+
+
+def _append_fk_column(data: pa.RecordBatchReader, fk_id: str) -> pa.RecordBatchReader:
+    """Add a csm_run_id column holding fk_id to every batch of a reader"""
+    schema = data.schema.append(pa.field("csm_run_id", pa.string()))
+    fk_scalar = pa.scalar(fk_id, pa.string())
+    return pa.RecordBatchReader.from_batches(
+        schema,
+        (
+            pa.RecordBatch.from_arrays(batch.columns + [pa.repeat(fk_scalar, batch.num_rows)], schema=schema)
+            for batch in data
+        ),
+    )
+
+
+def _send_table(
+    _s: Store,
+    _psql: PostgresUtils,
+    table_name: str,
+    replace: bool,
+    fk_id: Optional[str],
+    partitioned: bool = False,
+    **send_options,
+) -> int:
+    """
+    Send a table of the store to PostgreSQL.
+
+    Args:
+        _s: Store holding the table
+        _psql: PostgreSQL access, calls made from a worker thread use the connection of that thread
+        table_name: name of the table in the store
+        replace: Whether to replace existing tables
+        fk_id: foreign key id to add to all rows
+        partitioned: send the table as the partition of fk_id, see PostgresUtils.send_pyarrow_table_to_partition
+        send_options: options of PostgresUtils.send_pyarrow_table_to_postgresql, or of
+            PostgresUtils.send_pyarrow_table_to_partition when partitioned
+
+    Returns:
+        Number of rows sent
+    """
+    _s_time = perf_counter()
+    target_table_name = f"{_psql.table_prefix}{table_name}"
+    LOGGER.info(T("coal.services.database.table_entry").format(table=target_table_name))
+    data = non_empty_reader(_s.iter_batches(table_name))
+    if data is None:
+        LOGGER.info(T("coal.services.database.table_no_rows").format(table=target_table_name))
+        return 0
+    if fk_id:
+        data = _append_fk_column(data, fk_id)
+    _dl_time = perf_counter()
+    if partitioned:
+        rows = _psql.send_pyarrow_table_to_partition(data, target_table_name, "csm_run_id", fk_id, **send_options)
+    else:
+        rows = _psql.send_pyarrow_table_to_postgresql(data, target_table_name, replace, **send_options)
+
+    _up_time = perf_counter()
+    LOGGER.info(T("coal.services.database.table_row_count").format(table=target_table_name, count=rows))
+    LOGGER.debug(
+        T("coal.common.timing.operation_completed").format(
+            operation=f"Load {table_name} from datastore", time=f"{_dl_time - _s_time:0.3}"
+        )
+    )
+    LOGGER.debug(
+        T("coal.common.timing.operation_completed").format(
+            operation=f"Send {target_table_name} to postgresql", time=f"{_up_time - _dl_time:0.3}"
+        )
+    )
+    return rows
 
 
 def dump_store_to_postgresql_from_conf(
@@ -77,6 +186,14 @@ def dump_store_to_postgresql_from_conf(
     replace: bool = True,
     selected_tables: list[str] = [],
     fk_id: str = None,
+    max_workers: int = 1,
+    staged: bool = False,
+    unlogged: bool = False,
+    upsert_keys: Optional[list[str]] = None,
+    skip_unchanged: bool = False,
+    defer_constraints: bool = False,
+    not_valid: bool = False,
+    partition_by_run: bool = False,
 ) -> None:
     """
     Dump Store data to a PostgreSQL database.
@@ -86,6 +203,15 @@ def dump_store_to_postgresql_from_conf(
         replace: Whether to replace existing tables
         selected_tables: list of tables to send
         fk_id: foreign key id to add to all table on all rows
+        max_workers: maximum number of tables sent at the same time, each over its own connection
+        staged: load each table in a staging table, then replace or append to the target table in one transaction
+        unlogged: create staging tables as UNLOGGED, faster to load but not crash safe until published
+        upsert_keys: columns identifying rows, merge each table in the target one instead of replacing or appending
+        skip_unchanged: leave untouched the rows of an upsert whose content did not change
+        defer_constraints: create the foreign keys of all tables in a single transaction once every table is sent
+        not_valid: create deferred foreign keys as NOT VALID, then validate them without blocking writes
+        partition_by_run: send each table as the partition of fk_id in a table LIST-partitioned on csm_run_id,
+            replacing the previous partition of fk_id, replace, upsert and constraint options are then ignored
     """
     _psql = PostgresUtils(configuration)
     _s = Store(configuration=configuration)
@@ -97,39 +223,48 @@ def dump_store_to_postgresql_from_conf(
         LOGGER.info(T("coal.services.database.sending_data").format(table=f"{_psql.db_name}.{_psql.db_schema}"))
         total_rows = 0
         _process_start = perf_counter()
-        for table_name in tables:
-            _s_time = perf_counter()
-            target_table_name = f"{_psql.table_prefix}{table_name}"
-            LOGGER.info(T("coal.services.database.table_entry").format(table=target_table_name))
-            data = _s.get_table(table_name)
-            if not len(data):
-                LOGGER.info(T("coal.services.database.no_rows"))
-                continue
-            if fk_id:
-                data = data.append_column("csm_run_id", [[fk_id] * data.num_rows])
-            _dl_time = perf_counter()
-            rows = _psql.send_pyarrow_table_to_postgresql(
-                data,
-                target_table_name,
-                replace,
-            )
-            if fk_id and _psql.is_metadata_exists():
-                metadata_table = f"{_psql.metadata_table_name}"
-                _psql.add_fk_constraint(target_table_name, "csm_run_id", metadata_table, "last_csm_run_id")
-
-            total_rows += rows
-            _up_time = perf_counter()
-            LOGGER.info(T("coal.services.database.row_count").format(count=rows))
-            LOGGER.debug(
-                T("coal.common.timing.operation_completed").format(
-                    operation="Load from datastore", time=f"{_dl_time - _s_time:0.3}"
+        # Connections are opened once per worker thread and shared by every table it sends
+        with _psql:
+            partitioned = partition_by_run and bool(fk_id)
+            # Partitions get dropped with their run instead of relying on foreign keys
+            metadata_exists = bool(fk_id) and not partitioned and _psql.is_metadata_exists()
+            if partitioned:
+                send_options = dict(partitioned=True, staged=staged, unlogged=unlogged)
+            else:
+                prepare_table = None
+                if metadata_exists and not defer_constraints:
+                    prepare_table = partial(
+                        _psql.add_fk_constraint,
+                        from_col="csm_run_id",
+                        to_table=_psql.metadata_table_name,
+                        to_col="last_csm_run_id",
+                    )
+                send_options = dict(
+                    staged=staged,
+                    unlogged=unlogged,
+                    prepare_table=prepare_table,
+                    upsert_keys=upsert_keys,
+                    skip_unchanged=skip_unchanged,
                 )
-            )
-            LOGGER.debug(
-                T("coal.common.timing.operation_completed").format(
-                    operation="Send to postgresql", time=f"{_up_time - _dl_time:0.3}"
+            sent_tables = []
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(_send_table, _s, _psql, table_name, replace, fk_id, **send_options): table_name
+                    for table_name in tables
+                }
+                for future in as_completed(futures):
+                    rows = future.result()
+                    total_rows += rows
+                    if rows:
+                        sent_tables.append(f"{_psql.table_prefix}{futures[future]}")
+            if metadata_exists and defer_constraints and sent_tables:
+                _psql.add_fk_constraints(
+                    sorted(sent_tables),
+                    "csm_run_id",
+                    _psql.metadata_table_name,
+                    "last_csm_run_id",
+                    not_valid=not_valid,
                 )
-            )
         _process_end = perf_counter()
         LOGGER.info(
             T("coal.services.database.rows_fetched").format(
@@ -140,3 +275,181 @@ def dump_store_to_postgresql_from_conf(
         )
     else:
         LOGGER.info(T("coal.services.database.store_empty"))
+
+
+def _load_query(
+    _s: Store,
+    _psql: PostgresUtils,
+    sql_query: str,
+    table_name: str,
+    replace: bool,
+    spool_path: Optional[pathlib.Path] = None,
+) -> int:
+    """
+    Stream the result of a query into a table of the store.
+
+    Args:
+        _s: Store to write to
+        _psql: PostgreSQL access, calls made from a worker thread use the connection of that thread
+        sql_query: query to run
+        table_name: name of the table in the store
+        replace: Whether to replace the content of the store table
+        spool_path: File to write the result to instead of the store, see spool_reader
+
+    Returns:
+        Number of rows loaded
+    """
+    _s_time = perf_counter()
+    rows = 0
+
+    def _count_rows(reader: pa.RecordBatchReader):
+        nonlocal rows
+        for batch in reader:
+            rows += batch.num_rows
+            yield batch
+
+    with _psql.connect() as conn:
+        with conn.cursor() as curs:
+            curs.execute(sql_query)
+            reader = curs.fetch_record_batch()
+            if spool_path is not None:
+                rows = spool_reader(reader, spool_path)
+            else:
+                _s.add_table(table_name, pa.RecordBatchReader.from_batches(reader.schema, _count_rows(reader)), replace)
+    LOGGER.info(
+        T("coal.services.database.rows_fetched").format(
+            table=table_name, count=rows, time=f"{perf_counter() - _s_time:0.3}"
+        )
+    )
+    return rows
+
+
+def load_from_postgresql(
+    store_folder: str,
+    postgres_host: str,
+    postgres_port: int,
+    postgres_db: str,
+    postgres_schema: str,
+    postgres_user: str,
+    postgres_password: str,
+    table_prefix: str = "Cosmotech_",
+    replace: bool = True,
+    force_encode: bool = False,
+    selected_tables: list[str] = [],
+    sql_query: Optional[str] = None,
+    query_table_name: str = "query_result",
+    max_workers: int = 1,
+) -> None:
+    """
+    Load PostgreSQL data into the Store.
+
+    Args:
+        store_folder: Folder containing the Store
+        postgres_host: PostgreSQL host
+        postgres_port: PostgreSQL port
+        postgres_db: PostgreSQL database name
+        postgres_schema: PostgreSQL schema
+        postgres_user: PostgreSQL username
+        postgres_password: PostgreSQL password
+        table_prefix: Table prefix, only the tables starting with it are loaded, in store tables named without it
+        replace: Whether to replace existing store tables
+        force_encode: force password encoding to percent encoding
+        selected_tables: list of tables to load, named without the prefix
+        sql_query: query whose result is loaded instead of the tables
+        query_table_name: name of the store table holding the result of sql_query
+        max_workers: maximum number of tables fetched at the same time, each over its own connection
+    """
+    _c = Configuration(
+        {
+            "coal": {"store": store_folder},
+            "postgres": {
+                "host": postgres_host,
+                "port": postgres_port,
+                "db_name": postgres_db,
+                "db_schema": postgres_schema,
+                "user_name": postgres_user,
+                "user_password": postgres_password,
+                "password_encoding": force_encode,
+                "table_prefix": table_prefix,
+            },
+        }
+    )
+
+    load_from_postgresql_from_conf(
+        configuration=_c,
+        replace=replace,
+        selected_tables=selected_tables,
+        sql_query=sql_query,
+        query_table_name=query_table_name,
+        max_workers=max_workers,
+    )
+
+
+def load_from_postgresql_from_conf(
+    configuration: Configuration,
+    replace: bool = True,
+    selected_tables: list[str] = [],
+    sql_query: Optional[str] = None,
+    query_table_name: str = "query_result",
+    max_workers: int = 1,
+) -> None:
+    """
+    Load PostgreSQL data into the Store.
+
+    Query results are streamed batch by batch from the database to the store. With several workers, tables are
+    fetched over several connections at once and spooled to Arrow files in the store folder, then the store writes
+    them one at a time: a connection is released as soon as its table is fetched instead of waiting for the store.
+
+    Args:
+        configuration: coal Configuration
+        replace: Whether to replace existing store tables
+        selected_tables: list of tables to load, named without the prefix
+        sql_query: query whose result is loaded instead of the tables
+        query_table_name: name of the store table holding the result of sql_query
+        max_workers: maximum number of tables fetched at the same time, each over its own connection
+    """
+    _psql = PostgresUtils(configuration)
+    _s = Store(configuration=configuration)
+
+    _process_start = perf_counter()
+    # Connections are opened once per worker thread and shared by every table it fetches
+    with _psql:
+        if sql_query:
+            queries = {query_table_name: sql_query}
+        else:
+            prefix = _psql.table_prefix
+            tables = {
+                table[len(prefix) :]: table
+                for table in _psql.list_tables()
+                if table.startswith(prefix) and table != _psql.metadata_table_name
+            }
+            if selected_tables:
+                selected = {table.lower() for table in selected_tables}
+                tables = {name: table for name, table in tables.items() if name in selected}
+            queries = {name: f"SELECT * FROM {_psql.db_schema}.{_quote(table)}" for name, table in tables.items()}
+        LOGGER.info(T("coal.services.database.tables_to_fetch").format(tables=list(queries)))
+        total_rows = 0
+        if max_workers == 1:
+            for table_name, query in queries.items():
+                total_rows += _load_query(_s, _psql, query, table_name, replace)
+        else:
+            with tempfile.TemporaryDirectory(dir=_s.store_location) as spool_folder:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = dict()
+                    for index, (table_name, query) in enumerate(queries.items()):
+                        spool_path = pathlib.Path(spool_folder) / f"{index}.arrow"
+                        future = executor.submit(_load_query, _s, _psql, query, table_name, replace, spool_path)
+                        futures[future] = (table_name, spool_path)
+                    for future in as_completed(futures):
+                        table_name, spool_path = futures[future]
+                        total_rows += future.result()
+                        with read_spool(spool_path) as reader:
+                            _s.add_table(table_name, reader, replace)
+    _process_end = perf_counter()
+    LOGGER.info(
+        T("coal.services.database.rows_fetched").format(
+            table="all tables",
+            count=total_rows,
+            time=f"{_process_end - _process_start:0.3}",
+        )
+    )
@@ -5,11 +5,17 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
-from typing import Optional
+import hashlib
+import re
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional, Union
 from urllib.parse import quote
+from uuid import uuid4
 
 import adbc_driver_manager
 import pyarrow as pa
+import pyarrow.compute as pc
 from adbc_driver_postgresql import dbapi
 from cosmotech.orchestrator.utils.translate import T
 from pyarrow import Table
@@ -19,9 +25,71 @@ from cosmotech.coal.utils.logger import LOGGER
 
 
 class PostgresUtils:
+    """
+    Access to the PostgreSQL database described by the postgres configuration.
+
+    Used as a context manager, each thread opens a single connection on first use and reuses it for every call it
+    makes until the end of the with block. Outside of it each call opens its own connection.
+    """
+
+    # Suffix of the tables the staged mode of send_pyarrow_table_to_postgresql loads data into
+    STAGING_SUFFIX = "_staging"
+    # Longer identifiers get truncated by PostgreSQL
+    MAX_IDENTIFIER_BYTES = 63
 
     def __init__(self, configuration: Configuration):
         self._configuration = configuration.postgres
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: list[dbapi.Connection] = []
+        self._scopes = 0
+        self._schemas: dict[tuple[str, str], Optional[pa.Schema]] = dict()
+
+    def __enter__(self):
+        self._scopes += 1
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._scopes -= 1
+        if not self._scopes:
+            self.close()
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+            self._local = threading.local()
+            self._schemas.clear()
+
+    @contextmanager
+    def connect(self):
+        """
+        Yield a connection in autocommit mode, the one of the current thread when used inside the context manager.
+
+        Outside of it, calls nested in a connect block of the same thread get its connection: a prepare_table callback
+        run inside a transaction of the block would otherwise wait on the locks of this transaction from another one.
+        """
+        if not self._scopes:
+            connection = getattr(self._local, "active_connection", None)
+            if connection is not None:
+                yield connection
+                return
+            with dbapi.connect(self.full_uri, autocommit=True) as conn:
+                self._local.active_connection = conn
+                try:
+                    yield conn
+                finally:
+                    self._local.active_connection = None
+            return
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            LOGGER.debug(T("coal.services.postgresql.connecting"))
+            connection = dbapi.connect(self.full_uri, autocommit=True)
+            with self._lock:
+                self._local.connection = connection
+                self._connections.append(connection)
+        yield connection
 
     @property
     def table_prefix(self):
@@ -79,25 +147,34 @@ class PostgresUtils:
     def metadata_table_name(self) -> str:
         return f"{self.table_prefix}RunnerMetadata".lower()
 
-    def get_postgresql_table_schema(self, target_table_name: str) -> Optional[pa.Schema]:
+    def get_postgresql_table_schema(self, target_table_name: str, refresh: bool = False) -> Optional[pa.Schema]:
         """
         Get the schema of an existing PostgreSQL table using SQL queries.
 
+        Schemas are cached until the table is written to in a way changing its schema, see invalidate_schema_cache.
+
         Args:
             target_table_name: Name of the table
+            refresh: Ignore the cached schema of the table
 
         Returns:
             PyArrow Schema if table exists, None otherwise
         """
+        key = (self.db_schema, target_table_name)
+        with self._lock:
+            if not refresh and key in self._schemas:
+                return self._schemas[key]
+
         LOGGER.debug(
             T("coal.services.postgresql.getting_schema").format(
                 postgres_schema=self.db_schema, target_table_name=target_table_name
             )
         )
 
-        with dbapi.connect(self.full_uri) as conn:
+        schema = None
+        with self.connect() as conn:
             try:
-                return conn.adbc_get_table_schema(
+                schema = conn.adbc_get_table_schema(
                     target_table_name,
                     db_schema_filter=self.db_schema,
                 )
@@ -107,20 +184,76 @@ class PostgresUtils:
                         postgres_schema=self.db_schema, target_table_name=target_table_name
                     )
                 )
-            return None
+        with self._lock:
+            self._schemas[key] = schema
+        return schema
+
+    def invalidate_schema_cache(self, target_table_name: Optional[str] = None):
+        """
+        Forget cached table schemas.
+
+        Args:
+            target_table_name: Name of the table to forget, defaults to every table
+        """
+        with self._lock:
+            if target_table_name is None:
+                self._schemas.clear()
+            else:
+                self._schemas.pop((self.db_schema, target_table_name), None)
 
     def send_pyarrow_table_to_postgresql(
         self,
-        data: Table,
+        data: Union[Table, pa.RecordBatchReader],
         target_table_name: str,
         replace: bool,
+        staged: bool = False,
+        unlogged: bool = False,
+        prepare_table: Optional[Callable[[str], None]] = None,
+        upsert_keys: Optional[list[str]] = None,
+        skip_unchanged: bool = False,
     ) -> int:
+        """
+        Ingest data into a PostgreSQL table.
+
+        In staged mode the data is first loaded in a staging table, then published in a single transaction: the
+        staging table replaces the target table, or its rows get appended to it. Readers see either the previous
+        content of the table or the whole new one, and a failed load leaves the target table untouched.
+
+        Giving upsert_keys makes it an upsert: the data is staged then merged in the target table, rows whose keys
+        are already in the table update it and the others get inserted. A unique index on the key columns is created
+        if needed.
+
+        Args:
+            data: PyArrow table, or reader to stream the data batch by batch
+            target_table_name: Name of the table
+            replace: Whether to replace the table instead of appending to it
+            staged: Load the data in a staging table published once complete
+            unlogged: Create the staging table as UNLOGGED, skipping the write-ahead log while loading
+            prepare_table: Called with the name of the table to complete with constraints or indexes before the data
+                gets published: the staging table when it replaces the target table, else the target table
+            upsert_keys: Columns identifying rows of the table, replace and staged are ignored when given
+            skip_unchanged: Leave untouched the rows of an upsert whose content did not change
+
+        Returns:
+            Number of rows inserted
+        """
         LOGGER.debug(
             T("coal.services.postgresql.preparing_send").format(
                 postgres_schema=self.db_schema, target_table_name=target_table_name
             )
         )
-        LOGGER.debug(T("coal.services.postgresql.input_rows").format(rows=len(data)))
+        if isinstance(data, Table):
+            LOGGER.debug(T("coal.services.postgresql.input_rows").format(rows=len(data)))
+
+        if upsert_keys:
+            missing_keys = [key for key in upsert_keys if key not in data.schema.names]
+            if missing_keys:
+                raise ValueError(
+                    T("coal.services.postgresql.missing_upsert_keys").format(
+                        target_table_name=target_table_name, columns=missing_keys
+                    )
+                )
+            replace = False
 
         # Get existing schema if table exists
         existing_schema = self.get_postgresql_table_schema(target_table_name)
@@ -129,7 +262,10 @@ class PostgresUtils:
             LOGGER.debug(T("coal.services.postgresql.found_existing_table").format(schema=existing_schema))
             if not replace:
                 LOGGER.debug(T("coal.services.postgresql.adapting_data"))
-                data = adapt_table_to_schema(data, existing_schema)
+                if isinstance(data, pa.RecordBatchReader):
+                    data = adapt_reader_to_schema(data, existing_schema)
+                else:
+                    data = adapt_table_to_schema(data, existing_schema)
             else:
                 LOGGER.debug(T("coal.services.postgresql.replace_mode"))
         else:
@@ -138,16 +274,312 @@ class PostgresUtils:
         # Proceed with ingestion
         total = 0
 
-        LOGGER.debug(T("coal.services.postgresql.connecting"))
-        with dbapi.connect(self.full_uri, autocommit=True) as conn:
-            with conn.cursor() as curs:
-                mode = "replace" if replace else "create_append"
-                LOGGER.debug(T("coal.services.postgresql.ingesting_data").format(mode=mode))
-                total += curs.adbc_ingest(target_table_name, data, mode, db_schema_name=self.db_schema)
+        if upsert_keys:
+            total += self._send_upsert(
+                data,
+                target_table_name,
+                existing_schema is not None,
+                upsert_keys,
+                skip_unchanged,
+                unlogged,
+                prepare_table,
+            )
+        elif staged:
+            total += self._send_staged(
+                data, target_table_name, replace or existing_schema is None, unlogged, prepare_table
+            )
+        else:
+            with self.connect() as conn:
+                with conn.cursor() as curs:
+                    mode = "replace" if replace else "create_append"
+                    LOGGER.debug(T("coal.services.postgresql.ingesting_data").format(mode=mode))
+                    total += curs.adbc_ingest(target_table_name, data, mode, db_schema_name=self.db_schema)
+            if prepare_table is not None:
+                prepare_table(target_table_name)
+
+        if replace or existing_schema is None:
+            # The table got created with the schema of the data
+            self.invalidate_schema_cache(target_table_name)
 
         LOGGER.debug(T("coal.services.postgresql.ingestion_success").format(rows=total))
         return total
 
+    @classmethod
+    def partition_table_name(cls, target_table_name: str, partition_value: str) -> str:
+        """
+        Name of the partition of a table holding the rows of a value, see send_pyarrow_table_to_partition.
+
+        Values too long to fit in the name are replaced by a hash of them.
+        """
+        name = f"{target_table_name}_{re.sub(r'[^a-z0-9_]', '_', partition_value.lower())}"
+        if len(name.encode()) > cls.MAX_IDENTIFIER_BYTES:
+            name = f"{target_table_name}_{hashlib.sha256(partition_value.encode()).hexdigest()[:16]}"
+        if len(name.encode()) > cls.MAX_IDENTIFIER_BYTES:
+            raise ValueError(
+                T("coal.services.postgresql.partition_name_too_long").format(
+                    target_table_name=target_table_name, max_bytes=cls.MAX_IDENTIFIER_BYTES
+                )
+            )
+        return name
+
+    def is_partitioned(self, target_table_name: str) -> bool:
+        """Check a table of the schema is a partitioned table, False if missing"""
+        with self.connect() as conn:
+            with conn.cursor() as curs:
+                curs.execute(
+                    """
+                    SELECT c.relkind = 'p' FROM pg_class c
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE n.nspname = $1 AND c.relname = $2;
+                    """,
+                    (self.db_schema, target_table_name),
+                )
+                rows = curs.fetchall()
+        return bool(rows) and bool(rows[0][0])
+
+    def send_pyarrow_table_to_partition(
+        self,
+        data: Union[Table, pa.RecordBatchReader],
+        target_table_name: str,
+        partition_column: str,
+        partition_value: str,
+        staged: bool = False,
+        unlogged: bool = False,
+    ) -> int:
+        """
+        Ingest data into the partition of a table LIST-partitioned on a column.
+
+        The data, whose partition column has to hold partition_value only, replaces the partition of the value. It is
+        loaded in a table of its own then attached to the target table, created as partitioned from the schema of the
+        data if missing. Dropping the partition with drop_partitions then removes all the rows at once.
+
+        Args:
+            data: PyArrow table, or reader to stream the data batch by batch
+            target_table_name: Name of the partitioned table
+            partition_column: Column the table is partitioned on
+            partition_value: Value of the partition column in the data
+            staged: Load the partition in a staging table first, see send_pyarrow_table_to_postgresql
+            unlogged: Create the staging table as UNLOGGED
+
+        Returns:
+            Number of rows inserted
+        """
+        partition_table_name = self.partition_table_name(target_table_name, partition_value)
+        target_table = f"{self.db_schema}.{target_table_name}"
+        partition_table = f"{self.db_schema}.{partition_table_name}"
+
+        # Partitions need the columns of the partitioned table
+        existing_schema = self.get_postgresql_table_schema(target_table_name)
+        if existing_schema is not None:
+            if not self.is_partitioned(target_table_name):
+                raise ValueError(
+                    T("coal.services.postgresql.table_not_partitioned").format(
+                        target_table=target_table, partition_column=partition_column
+                    )
+                )
+            LOGGER.debug(T("coal.services.postgresql.adapting_data"))
+            if isinstance(data, pa.RecordBatchReader):
+                data = adapt_reader_to_schema(data, existing_schema)
+            else:
+                data = adapt_table_to_schema(data, existing_schema)
+
+        total = self.send_pyarrow_table_to_postgresql(
+            data, partition_table_name, True, staged=staged, unlogged=unlogged
+        )
+        LOGGER.debug(
+            T("coal.services.postgresql.attaching_partition").format(
+                partition_table=partition_table, target_table=target_table
+            )
+        )
+        with self.connect() as conn:
+            _execute(conn, "BEGIN")
+            try:
+                _execute(
+                    conn,
+                    f"CREATE TABLE IF NOT EXISTS {target_table} (LIKE {partition_table}) "
+                    f"PARTITION BY LIST ({_quote(partition_column)})",
+                )
+                _execute(
+                    conn,
+                    f"ALTER TABLE {target_table} ATTACH PARTITION {partition_table} "
+                    f"FOR VALUES IN ({_literal(partition_value)})",
+                )
+                _execute(conn, "COMMIT")
+            except BaseException:
+                _execute(conn, "ROLLBACK")
+                _execute(conn, f"DROP TABLE IF EXISTS {partition_table}")
+                raise
+        if existing_schema is None:
+            self.invalidate_schema_cache(target_table_name)
+        return total
+
+    def drop_partitions(self, partition_value: str) -> list[str]:
+        """
+        Detach and drop the partitions holding a value in every LIST-partitioned table of the schema.
+
+        Args:
+            partition_value: Value of the partitions to drop
+
+        Returns:
+            Names of the dropped partitions
+        """
+        with self.connect() as conn:
+            with conn.cursor() as curs:
+                curs.execute(
+                    """
+                    SELECT p.relname, c.relname FROM pg_inherits i
+                    JOIN pg_class c ON c.oid = i.inhrelid
+                    JOIN pg_class p ON p.oid = i.inhparent
+                    JOIN pg_namespace n ON n.oid = p.relnamespace
+                    WHERE n.nspname = $1 AND pg_get_expr(c.relpartbound, c.oid) = $2;
+                    """,
+                    (self.db_schema, f"FOR VALUES IN ({_literal(partition_value)})"),
+                )
+                partitions = curs.fetchall()
+            LOGGER.debug(
+                T("coal.services.postgresql.dropping_partitions").format(
+                    partitions=[partition for _, partition in partitions]
+                )
+            )
+            _execute(conn, "BEGIN")
+            try:
+                for parent, partition in partitions:
+                    _execute(
+                        conn, f"ALTER TABLE {self.db_schema}.{parent} DETACH PARTITION {self.db_schema}.{partition}"
+                    )
+                    _execute(conn, f"DROP TABLE {self.db_schema}.{partition}")
+                _execute(conn, "COMMIT")
+            except BaseException:
+                _execute(conn, "ROLLBACK")
+                raise
+        return [partition for _, partition in partitions]
+
+    def _staging_table_name(self, target_table_name: str) -> str:
+        """Name of a new staging table for the target table, unique so concurrent loads of a table don't collide"""
+        suffix = f"{self.STAGING_SUFFIX}_{uuid4().hex[:12]}"
+        prefix = target_table_name.encode()[: self.MAX_IDENTIFIER_BYTES - len(suffix)].decode(errors="ignore")
+        return f"{prefix}{suffix}"
+
+    def _load_staging_table(
+        self,
+        conn: dbapi.Connection,
+        data: Union[Table, pa.RecordBatchReader],
+        staging_table_name: str,
+        unlogged: bool,
+    ) -> int:
+        """Load data in a new staging table, see _staging_table_name"""
+        staging_table = f"{self.db_schema}.{staging_table_name}"
+        LOGGER.debug(T("coal.services.postgresql.staging_data").format(staging_table=staging_table))
+        # Create the table without rows so it can be made unlogged before the load
+        with conn.cursor() as curs:
+            curs.adbc_ingest(staging_table_name, data.schema.empty_table(), "create", db_schema_name=self.db_schema)
+        if unlogged:
+            _execute(conn, f"ALTER TABLE {staging_table} SET UNLOGGED")
+        with conn.cursor() as curs:
+            return curs.adbc_ingest(staging_table_name, data, "append", db_schema_name=self.db_schema)
+
+    def _send_staged(
+        self,
+        data: Union[Table, pa.RecordBatchReader],
+        target_table_name: str,
+        replace: bool,
+        unlogged: bool,
+        prepare_table: Optional[Callable[[str], None]],
+    ) -> int:
+        """Load data in a staging table then publish it in a single transaction, see send_pyarrow_table_to_postgresql"""
+        staging_table_name = self._staging_table_name(target_table_name)
+        target_table = f"{self.db_schema}.{target_table_name}"
+        staging_table = f"{self.db_schema}.{staging_table_name}"
+        with self.connect() as conn:
+            try:
+                total = self._load_staging_table(conn, data, staging_table_name, unlogged)
+                if replace:
+                    if unlogged:
+                        # The published table has to survive a crash of the server
+                        _execute(conn, f"ALTER TABLE {staging_table} SET LOGGED")
+                    if prepare_table is not None:
+                        prepare_table(staging_table_name)
+                LOGGER.debug(T("coal.services.postgresql.publishing_data").format(target_table=target_table))
+                _execute(conn, "BEGIN")
+                try:
+                    if replace:
+                        _execute(conn, f"DROP TABLE IF EXISTS {target_table}")
+                        _execute(conn, f"ALTER TABLE {staging_table} RENAME TO {target_table_name}")
+                    else:
+                        _execute(conn, f"INSERT INTO {target_table} SELECT * FROM {staging_table}")
+                        _execute(conn, f"DROP TABLE {staging_table}")
+                        if prepare_table is not None:
+                            prepare_table(target_table_name)
+                    _execute(conn, "COMMIT")
+                except BaseException:
+                    _execute(conn, "ROLLBACK")
+                    raise
+            except BaseException:
+                _execute(conn, f"DROP TABLE IF EXISTS {staging_table}")
+                raise
+        return total
+
+    def _send_upsert(
+        self,
+        data: Union[Table, pa.RecordBatchReader],
+        target_table_name: str,
+        table_exists: bool,
+        upsert_keys: list[str],
+        skip_unchanged: bool,
+        unlogged: bool,
+        prepare_table: Optional[Callable[[str], None]],
+    ) -> int:
+        """Load data in a staging table then merge it in the target table, see send_pyarrow_table_to_postgresql"""
+        staging_table_name = self._staging_table_name(target_table_name)
+        target_table = f"{self.db_schema}.{target_table_name}"
+        staging_table = f"{self.db_schema}.{staging_table_name}"
+        columns = [_quote(name) for name in data.schema.names]
+        keys = [_quote(key) for key in upsert_keys]
+        updated_columns = [column for column in columns if column not in keys]
+        key_index = _quote("_".join([target_table_name, *upsert_keys, "key"]))
+        sql_upsert = (
+            f"INSERT INTO {target_table} AS target ({', '.join(columns)}) "
+            f"SELECT {', '.join(columns)} FROM {staging_table} "
+            f"ON CONFLICT ({', '.join(keys)}) "
+        )
+        if not updated_columns:
+            sql_upsert += "DO NOTHING"
+        else:
+            sql_upsert += f"DO UPDATE SET {', '.join(f'{column} = EXCLUDED.{column}' for column in updated_columns)}"
+            if skip_unchanged:
+                # Rows left as they are do not produce new row versions to write and vacuum
+                sql_upsert += (
+                    f" WHERE ROW({', '.join(f'target.{column}' for column in updated_columns)})"
+                    f" IS DISTINCT FROM ROW({', '.join(f'EXCLUDED.{column}' for column in updated_columns)})"
+                )
+        with self.connect() as conn:
+            try:
+                total = self._load_staging_table(conn, data, staging_table_name, unlogged)
+                LOGGER.debug(T("coal.services.postgresql.merging_data").format(target_table=target_table))
+                _execute(conn, "BEGIN")
+                try:
+                    if not table_exists:
+                        with conn.cursor() as curs:
+                            curs.adbc_ingest(
+                                target_table_name, data.schema.empty_table(), "create", db_schema_name=self.db_schema
+                            )
+                    # ON CONFLICT needs a unique index on the key columns
+                    _execute(
+                        conn, f"CREATE UNIQUE INDEX IF NOT EXISTS {key_index} ON {target_table} ({', '.join(keys)})"
+                    )
+                    _execute(conn, sql_upsert)
+                    _execute(conn, f"DROP TABLE {staging_table}")
+                    if prepare_table is not None:
+                        prepare_table(target_table_name)
+                    _execute(conn, "COMMIT")
+                except BaseException:
+                    _execute(conn, "ROLLBACK")
+                    raise
+            except BaseException:
+                _execute(conn, f"DROP TABLE IF EXISTS {staging_table}")
+                raise
+        return total
+
     def add_fk_constraint(
         self,
         from_table: str,
@@ -155,25 +587,98 @@ class PostgresUtils:
         to_table: str,
         to_col: str,
     ) -> None:
-        # Connect to PostgreSQL and add a foreign key constraint
-        with dbapi.connect(self.full_uri, autocommit=False) as conn:
+        # Replace the foreign key constraint, a single ALTER TABLE applies both actions atomically
+        with self.connect() as conn:
             with conn.cursor() as curs:
-                sql_drop_fk = f"""
-                    ALTER TABLE {self.db_schema}.{from_table}
-                    DROP CONSTRAINT IF EXISTS metadata;
-                """
-                sql_add_fk = f"""
+                sql_replace_fk = f"""
                     ALTER TABLE {self.db_schema}.{from_table}
+                    DROP CONSTRAINT IF EXISTS metadata,
                     ADD CONSTRAINT metadata FOREIGN KEY ({from_col})
                     REFERENCES {self.db_schema}.{to_table}({to_col})
                     ON DELETE CASCADE;
                 """
-                curs.execute(sql_drop_fk)
-                curs.execute(sql_add_fk)
-                conn.commit()
+                curs.execute(sql_replace_fk)
+
+    def add_fk_constraints(
+        self,
+        from_tables: list[str],
+        from_col: str,
+        to_table: str,
+        to_col: str,
+        not_valid: bool = False,
+    ) -> None:
+        """
+        Add the foreign key constraint of add_fk_constraint to many tables in a single transaction.
 
-    def is_metadata_exists(self) -> None:
-        with dbapi.connect(self.full_uri, autocommit=True) as conn:
+        Tables already having the constraint keep it instead of checking all their rows again. The foreign key
+        column gets indexed, so deleting a referenced row does not scan the whole tables to cascade.
+
+        Args:
+            from_tables: Names of the tables to constrain
+            from_col: Foreign key column of the tables
+            to_table: Name of the referenced table
+            to_col: Referenced column
+            not_valid: Create the constraints without checking the existing rows, then validate them once committed,
+                which only blocks schema changes of the tables instead of their writes
+        """
+        with self.connect() as conn:
+            with conn.cursor() as curs:
+                curs.execute(
+                    """
+                    SELECT c.relname FROM pg_constraint k
+                    JOIN pg_class c ON c.oid = k.conrelid
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE k.conname = 'metadata' AND k.contype = 'f' AND n.nspname = $1;
+                    """,
+                    (self.db_schema,),
+                )
+                constrained_tables = {row[0] for row in curs.fetchall()}
+            new_tables = [table for table in from_tables if table not in constrained_tables]
+            LOGGER.debug(T("coal.services.postgresql.adding_constraints").format(tables=new_tables))
+            _execute(conn, "BEGIN")
+            try:
+                for table in from_tables:
+                    _execute(
+                        conn,
+                        f"CREATE INDEX IF NOT EXISTS {table}_{from_col}_idx ON {self.db_schema}.{table} ({from_col})",
+                    )
+                for table in new_tables:
+                    _execute(
+                        conn,
+                        f"ALTER TABLE {self.db_schema}.{table} ADD CONSTRAINT metadata FOREIGN KEY ({from_col}) "
+                        f"REFERENCES {self.db_schema}.{to_table}({to_col}) ON DELETE CASCADE"
+                        + (" NOT VALID" if not_valid else ""),
+                    )
+                _execute(conn, "COMMIT")
+            except BaseException:
+                _execute(conn, "ROLLBACK")
+                raise
+            if not_valid:
+                for table in new_tables:
+                    _execute(conn, f"ALTER TABLE {self.db_schema}.{table} VALIDATE CONSTRAINT metadata")
+
+    def list_tables(self) -> list[str]:
+        """
+        List the tables and views of the schema, leaving out the partitions read along with their table.
+
+        Returns:
+            Names of the tables
+        """
+        with self.connect() as conn:
+            with conn.cursor() as curs:
+                curs.execute(
+                    """
+                    SELECT c.relname FROM pg_class c
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE n.nspname = $1 AND c.relkind IN ('r', 'p', 'v', 'm') AND NOT c.relispartition
+                    ORDER BY c.relname;
+                    """,
+                    (self.db_schema,),
+                )
+                return [row[0] for row in curs.fetchall()]
+
+    def is_metadata_exists(self) -> bool:
+        with self.connect() as conn:
             try:
                 conn.adbc_get_table_schema(
                     self.metadata_table_name,
@@ -184,22 +689,118 @@ class PostgresUtils:
                 return False
 
 
-def adapt_table_to_schema(data: pa.Table, target_schema: pa.Schema) -> pa.Table:
+def _quote(identifier: str) -> str:
+    return '"{}"'.format(identifier.replace('"', '""'))
+
+
+def _literal(value: str) -> str:
+    return "'{}'".format(value.replace("'", "''"))
+
+
+def _execute(conn: dbapi.Connection, statement: str):
+    with conn.cursor() as curs:
+        curs.execute(statement)
+
+
+# Text Arrow may be able to parse as a date or a timestamp
+_TIMESTAMP_TEXT = (
+    r"^[0-9]{4}-[0-9]{2}-[0-9]{2}([T ][0-9]{2}(:[0-9]{2}(:[0-9]{2}(\.[0-9]+)?)?)?)?(Z|[+-][0-9]{2}(:?[0-9]{2})?)?$"
+)
+
+
+def _parsable_text_pattern(target_type: pa.DataType) -> Optional[str]:
+    """Regular expression matching the text Arrow may be able to parse as a value of a type, None if unknown"""
+    if pa.types.is_integer(target_type):
+        # Longer numbers do not fit in the type
+        digits = len(str(2**target_type.bit_width))
+        return rf"^[+-]?(0*[0-9]{{1,{digits}}}|0[xX][0-9a-fA-F]{{1,{target_type.bit_width // 4}}})$"
+    if pa.types.is_floating(target_type):
+        return r"(?i)^[+-]?(([0-9]+\.?[0-9]*|\.[0-9]+)(e[+-]?[0-9]+)?|inf(inity)?|nan)$"
+    if pa.types.is_boolean(target_type):
+        return r"(?i)^(true|false|1|0)$"
+    if pa.types.is_date(target_type) or pa.types.is_timestamp(target_type):
+        return _TIMESTAMP_TEXT
+    return None
+
+
+def _cast_column(
+    column: Union[pa.Array, pa.ChunkedArray], target_type: pa.DataType, null_failed_rows: bool
+) -> Union[pa.Array, pa.ChunkedArray]:
     """
-    Adapt a PyArrow table to match a target schema with detailed logging.
+    Cast a column to a type, replacing the values that cannot be cast with nulls.
+
+    Args:
+        column: column to cast
+        target_type: type to cast to
+        null_failed_rows: replace with nulls only the values that cannot be cast, else the whole column
+
+    Returns:
+        The cast column
     """
-    LOGGER.debug(T("coal.services.postgresql.schema_adaptation_start").format(rows=len(data)))
-    LOGGER.debug(T("coal.services.postgresql.original_schema").format(schema=data.schema))
-    LOGGER.debug(T("coal.services.postgresql.target_schema").format(schema=target_schema))
+    try:
+        return pc.cast(column, target_type)
+    except pa.ArrowInvalid:
+        if not null_failed_rows:
+            return pa.nulls(len(column), type=target_type)
+    try:
+        # Unsafe casts overflow or truncate the values they cannot represent instead of failing,
+        # those are the values that do not survive the way back to the original type
+        cast = pc.cast(column, target_type, safe=False)
+        valid = pc.equal(pc.cast(cast, column.type, safe=False), column)
+        if pa.types.is_signed_integer(column.type) and pa.types.is_unsigned_integer(target_type):
+            # Negative values wrap around and come back unchanged
+            valid = pc.and_(valid, pc.greater_equal(column, 0))
+        return pc.if_else(valid, cast, pa.scalar(None, type=target_type))
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        # Values that cannot be parsed, such as text in a numeric column
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            return _cast_text(column, target_type)
+        return _cast_or_null(column, target_type)
+
+
+def _cast_text(column: Union[pa.Array, pa.ChunkedArray], target_type: pa.DataType) -> Union[pa.Array, pa.ChunkedArray]:
+    """
+    Cast text to a type, replacing the values that cannot be parsed with nulls.
 
+    Text that cannot be parsed is found with a regular expression and replaced by nulls beforehand, leaving few
+    values, if any, for _cast_or_null to find.
+    """
+    null = pa.scalar(None, type=column.type)
+    pattern = _parsable_text_pattern(target_type)
+    if pattern is not None:
+        column = pc.if_else(pc.match_substring_regex(column, pattern), column, null)
+    if not pa.types.is_integer(target_type):
+        return _cast_or_null(column, target_type)
+    # Numbers of up to 18 digits fit in int64: parse them as such, then null the ones out of the range of the type
+    short = pc.match_substring_regex(column, r"^[+-]?0*[0-9]{1,18}$")
+    numbers = _cast_column(pc.cast(pc.if_else(short, column, null), pa.int64()), target_type, True)
+    return pc.coalesce(numbers, _cast_or_null(pc.if_else(short, null, column), target_type))
+
+
+def _cast_or_null(
+    column: Union[pa.Array, pa.ChunkedArray], target_type: pa.DataType
+) -> Union[pa.Array, pa.ChunkedArray]:
+    """Cast a column, replacing the values that cannot be cast with nulls by casting halves of it until they do"""
+    if isinstance(column, pa.ChunkedArray):
+        return pa.chunked_array([_cast_or_null(chunk, target_type) for chunk in column.chunks], type=target_type)
+    try:
+        return pc.cast(column, target_type)
+    except pa.ArrowInvalid:
+        if len(column) == 1:
+            return pa.nulls(1, type=target_type)
+    middle = len(column) // 2
+    return pa.concat_arrays(
+        [_cast_or_null(column.slice(0, middle), target_type), _cast_or_null(column.slice(middle), target_type)]
+    )
+
+
+def _adapt_data(
+    data: Union[pa.Table, pa.RecordBatch], target_schema: pa.Schema, null_failed_rows: bool
+) -> tuple[Union[pa.Table, pa.RecordBatch], dict[str, list[str]]]:
+    """Cast, add and drop columns of a table or a batch to match a schema, returning the adaptations made"""
     target_fields = {field.name: field.type for field in target_schema}
     new_columns = []
-
-    # Track adaptations for summary
-    added_columns = []
-    dropped_columns = []
-    type_conversions = []
-    failed_conversions = []
+    adaptations = {"added": [], "type_conversions": [], "failed_conversions": []}
 
     # Process each field in target schema
     for field_name, target_type in target_fields.items():
@@ -216,47 +817,110 @@ def adapt_table_to_schema(data: pa.Table, target_schema: pa.Schema) -> pa.Table:
                         target_type=target_type,
                     )
                 )
-                try:
-                    new_col = pa.compute.cast(col, target_type)
-                    new_columns.append(new_col)
-                    type_conversions.append(f"{field_name}: {original_type} -> {target_type}")
-                except pa.ArrowInvalid as e:
+                new_col = _cast_column(col, target_type, null_failed_rows)
+                failed_rows = new_col.null_count - col.null_count
+                if failed_rows:
                     LOGGER.warning(
-                        T("coal.services.postgresql.cast_failed").format(
+                        T("coal.services.postgresql.cast_failed_rows").format(
+                            rows=failed_rows,
                             field_name=field_name,
                             original_type=original_type,
                             target_type=target_type,
-                            error=str(e),
                         )
                     )
-                    new_columns.append(pa.nulls(len(data), type=target_type))
-                    failed_conversions.append(f"{field_name}: {original_type} -> {target_type}")
+                    adaptations["failed_conversions"].append(
+                        f"{field_name}: {original_type} -> {target_type} ({failed_rows} rows)"
+                    )
+                else:
+                    adaptations["type_conversions"].append(f"{field_name}: {original_type} -> {target_type}")
+                new_columns.append(new_col)
             else:
                 new_columns.append(col)
         else:
             # Column doesn't exist - add nulls
             LOGGER.debug(T("coal.services.postgresql.adding_missing_column").format(field_name=field_name))
-            new_columns.append(pa.nulls(len(data), type=target_type))
-            added_columns.append(field_name)
+            new_columns.append(pa.nulls(data.num_rows, type=target_type))
+            adaptations["added"].append(field_name)
+
+    adaptations["dropped"] = [name for name in data.column_names if name not in target_fields]
+    return type(data).from_arrays(new_columns, schema=target_schema), adaptations
+
+
+def adapt_table_to_schema(data: pa.Table, target_schema: pa.Schema, null_failed_rows: bool = True) -> pa.Table:
+    """
+    Adapt a PyArrow table to match a target schema with detailed logging.
+
+    Args:
+        data: table to adapt
+        target_schema: schema to match, missing columns are added filled with nulls and extra ones dropped
+        null_failed_rows: replace with nulls only the values that cannot be cast, else the whole column
+
+    Returns:
+        The adapted table
+    """
+    LOGGER.debug(T("coal.services.postgresql.schema_adaptation_start").format(rows=len(data)))
+    LOGGER.debug(T("coal.services.postgresql.original_schema").format(schema=data.schema))
+    LOGGER.debug(T("coal.services.postgresql.target_schema").format(schema=target_schema))
+
+    adapted_table, adaptations = _adapt_data(data, target_schema, null_failed_rows)
 
     # Log columns that will be dropped
-    dropped_columns = [name for name in data.column_names if name not in target_fields]
+    dropped_columns = adaptations["dropped"]
     if dropped_columns:
         LOGGER.debug(T("coal.services.postgresql.dropping_columns").format(columns=dropped_columns))
 
-    # Create new table
-    adapted_table = pa.Table.from_arrays(new_columns, schema=target_schema)
-
     # Log summary of adaptations
     LOGGER.debug(T("coal.services.postgresql.adaptation_summary"))
-    if added_columns:
-        LOGGER.debug(T("coal.services.postgresql.added_columns").format(columns=added_columns))
+    if adaptations["added"]:
+        LOGGER.debug(T("coal.services.postgresql.added_columns").format(columns=adaptations["added"]))
     if dropped_columns:
         LOGGER.debug(T("coal.services.postgresql.dropped_columns").format(columns=dropped_columns))
-    if type_conversions:
-        LOGGER.debug(T("coal.services.postgresql.successful_conversions").format(conversions=type_conversions))
-    if failed_conversions:
-        LOGGER.debug(T("coal.services.postgresql.failed_conversions").format(conversions=failed_conversions))
+    if adaptations["type_conversions"]:
+        LOGGER.debug(
+            T("coal.services.postgresql.successful_conversions").format(conversions=adaptations["type_conversions"])
+        )
+    if adaptations["failed_conversions"]:
+        LOGGER.debug(
+            T("coal.services.postgresql.failed_conversions").format(conversions=adaptations["failed_conversions"])
+        )
 
     LOGGER.debug(T("coal.services.postgresql.final_schema").format(schema=adapted_table.schema))
     return adapted_table
+
+
+def adapt_batch_to_schema(
+    batch: pa.RecordBatch, target_schema: pa.Schema, null_failed_rows: bool = True
+) -> pa.RecordBatch:
+    """
+    Adapt a PyArrow record batch to match a target schema, see adapt_table_to_schema.
+
+    Args:
+        batch: batch to adapt
+        target_schema: schema to match, missing columns are added filled with nulls and extra ones dropped
+        null_failed_rows: replace with nulls only the values that cannot be cast, else the whole column
+
+    Returns:
+        The adapted batch
+    """
+    return _adapt_data(batch, target_schema, null_failed_rows)[0]
+
+
+def adapt_reader_to_schema(
+    reader: pa.RecordBatchReader, target_schema: pa.Schema, null_failed_rows: bool = True
+) -> pa.RecordBatchReader:
+    """
+    Adapt the batches of a reader to match a target schema as they get read, see adapt_table_to_schema.
+
+    Args:
+        reader: reader to adapt
+        target_schema: schema to match, missing columns are added filled with nulls and extra ones dropped
+        null_failed_rows: replace with nulls only the values that cannot be cast, else the whole column
+
+    Returns:
+        A reader over the adapted batches
+    """
+    LOGGER.debug(T("coal.services.postgresql.original_schema").format(schema=reader.schema))
+    LOGGER.debug(T("coal.services.postgresql.target_schema").format(schema=target_schema))
+    return pa.RecordBatchReader.from_batches(
+        target_schema, (adapt_batch_to_schema(batch, target_schema, null_failed_rows) for batch in reader)
+    )
@@ -12,40 +12,155 @@ This module provides functions for interacting with SingleStore databases
 for store operations.
 """
 
-import csv
 import pathlib
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Optional
 
+import pyarrow as pa
 import singlestoredb as s2
 from cosmotech.orchestrator.utils.translate import T
+from singlestoredb.utils.results import _description_to_arrow_schema
 
-from cosmotech.coal.store.csv import store_csv_file
-from cosmotech.coal.store.store import Store
+from cosmotech.coal.store.backend.backend_interface import quote_identifier
+from cosmotech.coal.store.store import Store, read_spool, spool_reader
+from cosmotech.coal.utils.configuration import Configuration
 from cosmotech.coal.utils.logger import LOGGER
 
 
-def _get_data(table_name: str, output_directory: str, cursor) -> None:
+def _connect(
+    single_store_host: str,
+    single_store_port: int,
+    single_store_db: str,
+    single_store_user: str,
+    single_store_password: str,
+) -> s2.connection.Connection:
+    """Open a connection returning results as Arrow tables, streamed from the server as they get fetched"""
+    return s2.connect(
+        host=single_store_host,
+        port=single_store_port,
+        database=single_store_db,
+        user=single_store_user,
+        password=single_store_password,
+        results_type="arrow",
+        buffered=False,
+    )
+
+
+def _fetch_batches(
+    query: str, cursor, batch_rows: int, parameters: Optional[tuple] = None
+) -> Optional[pa.RecordBatchReader]:
     """
-    Run a SQL query to fetch all data from a table and write them in csv files.
+    Run a SQL query and stream its result in chunks of rows.
+
+    Args:
+        query: SQL query to run
+        cursor: SingleStore cursor returning Arrow tables
+        batch_rows: Maximum number of rows per chunk
+        parameters: Values of the %s placeholders of the query
+
+    Returns:
+        A reader over the query result, None if the query returned no rows
+    """
+    cursor.execute(query, parameters)
+    first_chunk = cursor.fetchmany(batch_rows)
+    if not first_chunk:
+        return None
+
+    def _batches():
+        chunk = first_chunk
+        while chunk:
+            yield from chunk.to_batches()
+            chunk = cursor.fetchmany(batch_rows)
+
+    return pa.RecordBatchReader.from_batches(first_chunk.schema, _batches())
+
+
+def _result_schema(cursor) -> pa.Schema:
+    """Schema of the result of the last query run by the cursor, typed like the Arrow tables of its rows"""
+    return _description_to_arrow_schema(cursor.description)["schema"]
+
+
+def _get_watermark(store: Store, table_name: str, watermark_column: str) -> Optional[Any]:
+    """Highest value of the watermark column among the rows of the table already in the store"""
+    if not store.table_exists(table_name):
+        return None
+    result = store.execute_query(
+        f"select max({quote_identifier(watermark_column)}) as watermark from {quote_identifier(table_name.lower())}"
+    )
+    return result.column("watermark")[0].as_py()
+
+
+def _get_data(
+    table_name: str,
+    store: Store,
+    cursor,
+    batch_rows: int,
+    replace: bool = False,
+    watermark_column: Optional[str] = None,
+    spool_path: Optional[pathlib.Path] = None,
+) -> int:
+    """
+    Fetch data from a table and write it in a table of the store.
+
+    A table without rows leaves the store untouched when appending, and empties the store table when replacing.
+    With a watermark column only the rows whose value in this column is above the highest one already in the store
+    are fetched, then appended to the store table.
 
     Args:
         table_name: Table name
-        output_directory: Output directory
-        cursor: SingleStore cursor
+        store: Store to write to
+        cursor: SingleStore cursor returning Arrow tables
+        batch_rows: Maximum number of rows fetched at once
+        replace: Whether to replace the content of the store table, ignored with a watermark column
+        watermark_column: Column increasing with the rows added to the table
+        spool_path: File to write the rows to instead of the store, see spool_reader
+
+    Returns:
+        Number of rows fetched
     """
     start_time = time.perf_counter()
-    cursor.execute(f"SELECT * FROM {table_name}")
-    rows = cursor.fetchall()
+    query = f"SELECT * FROM {table_name}"
+    parameters = None
+    if watermark_column:
+        replace = False
+        watermark = _get_watermark(store, table_name, watermark_column)
+        if watermark is not None:
+            LOGGER.info(
+                T("coal.services.database.incremental_fetch").format(
+                    table=table_name, column=watermark_column, watermark=watermark
+                )
+            )
+            quoted_column = watermark_column.replace("`", "``")
+            query += f" WHERE `{quoted_column}` > %s"
+            parameters = (watermark,)
+    data = _fetch_batches(query, cursor, batch_rows, parameters)
+    if data is None:
+        LOGGER.info(T("coal.services.database.table_no_rows").format(table=table_name))
+        if not replace:
+            return 0
+        # Rows of a previous load must not survive a replace
+        data = pa.RecordBatchReader.from_batches(_result_schema(cursor), [])
+    rows = 0
+
+    def _count_rows(reader: pa.RecordBatchReader):
+        nonlocal rows
+        for batch in reader:
+            rows += batch.num_rows
+            yield batch
+
+    if spool_path is not None:
+        rows = spool_reader(data, spool_path)
+    else:
+        store.add_table(table_name, pa.RecordBatchReader.from_batches(data.schema, _count_rows(data)), replace)
     end_time = time.perf_counter()
     LOGGER.info(
         T("coal.services.database.rows_fetched").format(
-            table=table_name, count=len(rows), time=round(end_time - start_time, 2)
+            table=table_name, count=rows, time=round(end_time - start_time, 2)
         )
     )
-    with open(f"{output_directory}/{table_name}.csv", "w", newline="") as csv_stock:
-        w = csv.DictWriter(csv_stock, rows[0].keys())
-        w.writeheader()
-        w.writerows(rows)
+    return rows
 
 
 def load_from_singlestore(
@@ -56,10 +171,23 @@ def load_from_singlestore(
     single_store_password: str,
     store_folder: str,
     single_store_tables: str = "",
+    max_workers: int = 1,
+    batch_rows: int = Store.DEFAULT_BATCH_ROWS,
+    replace: bool = False,
+    watermark_columns: Optional[dict[str, str]] = None,
 ) -> None:
     """
     Load data from SingleStore and store it in the Store.
 
+    Tables are streamed from SingleStore to the store in chunks of Arrow record batches, keeping the column types
+    of the database. With several workers, tables are fetched over several connections at once and spooled to
+    Arrow files in the store folder, then the store writes them one at a time: a connection is released as soon as
+    its table is fetched instead of waiting for the store.
+
+    Tables given a watermark column are loaded incrementally: the highest value of the column in the store table
+    is the watermark, only the rows above it are fetched and appended. The watermark column has to increase with
+    each row added, like an auto-incremented id or an insertion timestamp.
+
     Args:
         single_store_host: SingleStore host
         single_store_port: SingleStore port
@@ -68,34 +196,56 @@ def load_from_singlestore(
         single_store_password: SingleStore password
         store_folder: Store folder
         single_store_tables: Comma-separated list of tables to load
+        max_workers: Maximum number of tables fetched at the same time, each over its own connection
+        batch_rows: Maximum number of rows fetched at once
+        replace: Whether to replace the content of the store tables instead of appending to it
+        watermark_columns: Watermark column of the tables to load incrementally, by table name
     """
-    single_store_working_dir = store_folder + "/singlestore"
-    if not pathlib.Path.exists(single_store_working_dir):
-        pathlib.Path.mkdir(single_store_working_dir)
+    connection_parameters = (
+        single_store_host,
+        single_store_port,
+        single_store_db,
+        single_store_user,
+        single_store_password,
+    )
+    store = Store(configuration=Configuration({"coal": {"store": store_folder}}))
+    watermark_columns = watermark_columns or dict()
 
     start_full = time.perf_counter()
 
-    conn = s2.connect(
-        host=single_store_host,
-        port=single_store_port,
-        database=single_store_db,
-        user=single_store_user,
-        password=single_store_password,
-        results_type="dicts",
-    )
-    with conn:
-        with conn.cursor() as cur:
-            if single_store_tables == "":
+    if single_store_tables == "":
+        with _connect(*connection_parameters) as conn:
+            with conn.cursor() as cur:
                 cur.execute("SHOW TABLES")
-                table_names = cur.fetchall()
-            else:
-                table_names = single_store_tables.split(",")
-            LOGGER.info(T("coal.services.database.tables_to_fetch").format(tables=table_names))
-            for name in table_names:
-                _get_data(name, single_store_working_dir, cur)
+                tables = cur.fetchall()
+        table_names = tables.column(0).to_pylist() if tables else []
+    else:
+        table_names = single_store_tables.split(",")
+    LOGGER.info(T("coal.services.database.tables_to_fetch").format(tables=table_names))
+
+    def _load_table(table_name: str, spool_path: Optional[pathlib.Path] = None) -> int:
+        with _connect(*connection_parameters) as conn:
+            with conn.cursor() as cur:
+                return _get_data(
+                    table_name, store, cur, batch_rows, replace, watermark_columns.get(table_name), spool_path
+                )
+
+    if max_workers == 1:
+        for table_name in table_names:
+            _load_table(table_name)
+    else:
+        with tempfile.TemporaryDirectory(dir=store.store_location) as spool_folder:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = dict()
+                for index, table_name in enumerate(table_names):
+                    spool_path = pathlib.Path(spool_folder) / f"{index}.arrow"
+                    futures[executor.submit(_load_table, table_name, spool_path)] = (table_name, spool_path)
+                for future in as_completed(futures):
+                    table_name, spool_path = futures[future]
+                    future.result()
+                    # Tables without rows to append are not spooled
+                    if spool_path.exists():
+                        with read_spool(spool_path) as reader:
+                            store.add_table(table_name, reader, replace and table_name not in watermark_columns)
     end_full = time.perf_counter()
     LOGGER.info(T("coal.services.database.full_dataset").format(time=round(end_full - start_full, 2)))
-
-    for csv_path in pathlib.Path(single_store_working_dir).glob("*.csv"):
-        LOGGER.info(T("coal.services.azure_storage.found_file").format(file=csv_path.name))
-        store_csv_file(csv_path.name[:-4], csv_path, store=Store(False, store_folder))
@@ -16,6 +16,7 @@ including loading and converting data.
 from cosmotech.coal.store.csv import (
     convert_store_table_to_csv,
     store_csv_file,
+    store_csv_folder,
 )
 
 # Re-export functions from the native_python module
@@ -0,0 +1,16 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+Store backend module.
+
+This module provides the database engines a Store can keep its tables in.
+"""
+
+from cosmotech.coal.store.backend.backend_interface import BackendInterface
+from cosmotech.coal.store.backend.duckdb_backend import DuckdbBackend
+from cosmotech.coal.store.backend.sqlite_backend import SqliteBackend
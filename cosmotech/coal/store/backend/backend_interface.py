@@ -0,0 +1,129 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+import pathlib
+from abc import ABC, abstractmethod
+from typing import Optional, Union
+
+import pyarrow
+
+from cosmotech.coal.utils.configuration import Configuration
+
+
+def quote_identifier(identifier: str) -> str:
+    return '"{}"'.format(identifier.replace('"', '""'))
+
+
+class BackendInterface(ABC):
+    """
+    Database engine holding the tables of a Store.
+
+    The Store takes care of table name casing, existence checks and column validation before calling a backend,
+    table and column names given to a backend are the ones of the database.
+    """
+
+    # Name of the database file in the store folder
+    database_file_name: str = None
+
+    def __init__(self, store_location: pathlib.Path, configuration: Configuration):
+        self.database_path = store_location / self.database_file_name
+        # Number of queries that had to be run a second time
+        self.query_retries = 0
+
+    @abstractmethod
+    def close(self):
+        """Release the connections to the database"""
+
+    @abstractmethod
+    def reset(self):
+        """Remove the database files"""
+
+    @abstractmethod
+    def database_file(self) -> pathlib.Path:
+        """Get the database file, holding every committed write"""
+
+    @abstractmethod
+    def list_tables(self) -> list[str]:
+        """List the tables of the database"""
+
+    def table_exists(self, table_name: str) -> bool:
+        return table_name in self.list_tables()
+
+    @abstractmethod
+    def get_table_schema(self, table_name: str) -> pyarrow.Schema:
+        """Get the Arrow schema of a table"""
+
+    def table_columns(self, table_name: str) -> list[tuple[str, str]]:
+        """Get the name and declared type of each column of a table"""
+        table_columns = self.execute_query("select name, type from pragma_table_info(?)", parameters=[table_name])
+        return list(zip(table_columns["name"].to_pylist(), table_columns["type"].to_pylist()))
+
+    @abstractmethod
+    def add_table(
+        self,
+        table_name: str,
+        data: Union[pyarrow.Table, pyarrow.RecordBatchReader],
+        replace: bool = False,
+    ) -> int:
+        """
+        Write data in a table in a single transaction, creating the table if needed.
+
+        Returns:
+            The number of rows written
+        """
+
+    @abstractmethod
+    def read_table(
+        self,
+        table_name: str,
+        columns: list[tuple[str, str]],
+        where: Optional[str] = None,
+        parameters: Optional[list] = None,
+    ) -> pyarrow.Table:
+        """
+        Read columns of a table.
+
+        Args:
+            table_name: name of the table to read
+            columns: name and declared type of the columns to read
+            where: SQL condition the rows must match, using "?" placeholders for its values
+            parameters: values of the placeholders of the where condition
+        """
+
+    @abstractmethod
+    def iter_table(
+        self,
+        table_name: str,
+        columns: list[tuple[str, str]],
+        where: Optional[str] = None,
+        parameters: Optional[list] = None,
+        batch_rows: int = 65536,
+    ) -> pyarrow.RecordBatchReader:
+        """Stream columns of a table, see read_table"""
+
+    @abstractmethod
+    def execute(self, statement: str):
+        """Run a statement returning no data"""
+
+    @abstractmethod
+    def execute_query(self, sql_query: str, parameters: Optional[list] = None) -> pyarrow.Table:
+        """Run a query and get its whole result"""
+
+    @abstractmethod
+    def execute_query_reader(
+        self, sql_query: str, parameters: Optional[list] = None, batch_rows: int = 65536
+    ) -> pyarrow.RecordBatchReader:
+        """Run a query and stream its result in batches of at most batch_rows rows"""
+
+    @abstractmethod
+    def list_indexes(self, table_name: Optional[str] = None) -> list[dict]:
+        """
+        List the indexes created in the database, leaving out the ones created for constraints.
+
+        Returns:
+            The name, table, indexed columns and uniqueness of each index, ordered by table and name
+        """
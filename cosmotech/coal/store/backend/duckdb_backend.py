@@ -0,0 +1,200 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+import pathlib
+import re
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Optional, Union
+
+import duckdb
+import pyarrow
+
+from cosmotech.coal.store.backend.backend_interface import (
+    BackendInterface,
+    quote_identifier,
+)
+from cosmotech.coal.utils.configuration import Configuration
+
+# Items of the expressions list of duckdb_indexes(): bare names or single quoted SQL expressions
+_INDEX_EXPRESSION = re.compile(r"'((?:[^']|'')*)'|([^,\s\[\]]+)")
+
+
+def _index_columns(expressions: str) -> list[str]:
+    columns = list()
+    for quoted, bare in _INDEX_EXPRESSION.findall(expressions):
+        column = quoted.replace("''", "'") if quoted else bare
+        if column.startswith('"') and column.endswith('"'):
+            column = column[1:-1].replace('""', '"')
+        columns.append(column)
+    return columns
+
+
+class DuckdbBackend(BackendInterface):
+    """
+    DuckDB database, a columnar engine running queries with vectorized and multi-threaded execution.
+
+    A single connection to the database is opened on first use and kept until closed, calls from multiple threads
+    are serialized on it while readers get their own cursor.
+    """
+
+    database_file_name = "db.duckdb"
+    # Backends of the process, DuckDB shares a single cached database instance between the connections to a file
+    _backends: "weakref.WeakSet[DuckdbBackend]" = weakref.WeakSet()
+    _backends_lock = threading.Lock()
+
+    def __init__(self, store_location: pathlib.Path, configuration: Configuration):
+        super().__init__(store_location, configuration)
+        self._database = str(self.database_path)
+        self._lock = threading.RLock()
+        self._connection: Optional[duckdb.DuckDBPyConnection] = None
+        # Readers not consumed yet by cursor, an open reader keeps the database instance alive
+        self._readers: dict[duckdb.DuckDBPyConnection, pyarrow.RecordBatchReader] = dict()
+        with self._backends_lock:
+            self._backends.add(self)
+
+    @contextmanager
+    def _connect(self):
+        """Yield the shared connection, opening it if needed"""
+        with self._lock:
+            if self._connection is None:
+                self._connection = duckdb.connect(self._database)
+            yield self._connection
+
+    def close(self):
+        with self._lock:
+            for cursor, reader in self._readers.items():
+                reader.close()
+                cursor.close()
+            self._readers.clear()
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = None
+
+    def reset(self):
+        with self._lock:
+            # The cached instance is only dropped once every connection to the database is closed, a connection
+            # left open would keep serving the tables of the removed file to the next ones
+            with self._backends_lock:
+                backends = [backend for backend in self._backends if backend._database == self._database]
+            for backend in backends:
+                backend.close()
+            for path in (self.database_path, pathlib.Path(f"{self._database}.wal")):
+                if path.exists():
+                    path.unlink()
+
+    def database_file(self) -> pathlib.Path:
+        # Move the write-ahead log content into the database file
+        self.execute("checkpoint")
+        return self.database_path
+
+    def list_tables(self) -> list[str]:
+        return self.execute_query("select table_name from duckdb_tables()").column("table_name").to_pylist()
+
+    def get_table_schema(self, table_name: str) -> pyarrow.Schema:
+        return self.execute_query(f"select * from {quote_identifier(table_name)} limit 0").schema
+
+    def add_table(
+        self,
+        table_name: str,
+        data: Union[pyarrow.Table, pyarrow.RecordBatchReader],
+        replace: bool = False,
+    ) -> int:
+        table = quote_identifier(table_name)
+        with self._connect() as conn:
+            conn.execute("begin")
+            try:
+                conn.register("_coal_store_data", data)
+                if replace:
+                    statement = f"create or replace table {table} as select * from _coal_store_data"
+                elif table_name in self.list_tables():
+                    statement = f"insert into {table} by name select * from _coal_store_data"
+                else:
+                    statement = f"create table {table} as select * from _coal_store_data"
+                (rows,) = conn.execute(statement).fetchone()
+                conn.execute("commit")
+            except BaseException:
+                conn.execute("rollback")
+                raise
+            finally:
+                conn.unregister("_coal_store_data")
+        return rows
+
+    @staticmethod
+    def _table_query(table_name: str, columns: list[tuple[str, str]], where: Optional[str] = None) -> str:
+        query = f'select {", ".join(quote_identifier(name) for name, _ in columns)} from {quote_identifier(table_name)}'
+        if where is not None:
+            query += f" where {where}"
+        return query
+
+    def read_table(
+        self,
+        table_name: str,
+        columns: list[tuple[str, str]],
+        where: Optional[str] = None,
+        parameters: Optional[list] = None,
+    ) -> pyarrow.Table:
+        return self.execute_query(self._table_query(table_name, columns, where), parameters)
+
+    def iter_table(
+        self,
+        table_name: str,
+        columns: list[tuple[str, str]],
+        where: Optional[str] = None,
+        parameters: Optional[list] = None,
+        batch_rows: int = 65536,
+    ) -> pyarrow.RecordBatchReader:
+        return self.execute_query_reader(self._table_query(table_name, columns, where), parameters, batch_rows)
+
+    def execute(self, statement: str):
+        with self._connect() as conn:
+            conn.execute(statement)
+
+    def execute_query(self, sql_query: str, parameters: Optional[list] = None) -> pyarrow.Table:
+        with self._connect() as conn:
+            return conn.execute(sql_query, parameters).to_arrow_table()
+
+    def execute_query_reader(
+        self, sql_query: str, parameters: Optional[list] = None, batch_rows: int = 65536
+    ) -> pyarrow.RecordBatchReader:
+        # The reader uses its own cursor so it can be consumed while the shared connection keeps serving queries
+        with self._connect() as conn:
+            cursor = conn.cursor()
+        try:
+            reader = cursor.execute(sql_query, parameters).to_arrow_reader(batch_rows)
+        except Exception:
+            cursor.close()
+            raise
+        with self._lock:
+            self._readers[cursor] = reader
+
+        def _batches():
+            try:
+                yield from reader
+            finally:
+                with self._lock:
+                    self._readers.pop(cursor, None)
+                cursor.close()
+
+        return pyarrow.RecordBatchReader.from_batches(reader.schema, _batches())
+
+    def list_indexes(self, table_name: Optional[str] = None) -> list[dict]:
+        indexes = self.execute_query(
+            "select index_name, table_name, is_unique, expressions from duckdb_indexes() "
+            "where not is_primary and (? is null or table_name = ?) order by table_name, index_name",
+            parameters=[table_name] * 2,
+        ).to_pylist()
+        return [
+            {
+                "name": index["index_name"],
+                "table": index["table_name"],
+                "columns": _index_columns(index["expressions"]),
+                "unique": index["is_unique"],
+            }
+            for index in indexes
+        ]
@@ -0,0 +1,419 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+import os
+import pathlib
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from typing import Optional, Union
+
+import pyarrow
+from adbc_driver_sqlite import dbapi
+from cosmotech.orchestrator.utils.translate import T
+
+from cosmotech.coal.store.backend.backend_interface import (
+    BackendInterface,
+    quote_identifier,
+)
+from cosmotech.coal.utils.configuration import Configuration
+from cosmotech.coal.utils.logger import LOGGER
+
+
+def _type_literal(declared_type: str) -> Optional[str]:
+    """
+    Literal of a value with the type the sqlite driver returns for a column of the given declared type.
+
+    Columns without declared type or with a NUMERIC affinity (NUMERIC, DECIMAL, BOOLEAN, DATE, TIMESTAMP...) keep
+    values of any storage class, None is returned for them: their literal depends on the values they hold.
+    """
+    # Follows the sqlite type affinity rules
+    declared_type = declared_type.upper()
+    if "INT" in declared_type:
+        return "0"
+    if any(name in declared_type for name in ("CHAR", "CLOB", "TEXT")):
+        return "''"
+    if "BLOB" in declared_type:
+        return "x''"
+    if any(name in declared_type for name in ("REAL", "FLOA", "DOUB")):
+        return "0.0"
+    return None
+
+
+# Literals of the storage classes of values, by order of precedence: a column holding text and numbers is read as text
+_STORAGE_CLASS_LITERALS = (("text", "''"), ("real", "0.0"), ("integer", "0"), ("blob", "x''"))
+
+
+class SqliteBackend(BackendInterface):
+    """
+    SQLite database accessed through the ADBC driver.
+
+    A single connection to the database is opened on first use and kept until closed, calls from multiple threads
+    are serialized on it.
+    """
+
+    database_file_name = "db.sqlite"
+    # SQLite pragma profiles selectable with the coal.store_pragmas configuration
+    PRAGMA_PROFILES = {
+        # SQLite defaults: rollback journal and full sync
+        "default": {},
+        # Load then read pipelines, a crash during the run may corrupt the store
+        "bulk_load": {
+            "journal_mode": "WAL",
+            "synchronous": "OFF",
+            "cache_size": -262144,
+            "mmap_size": 1073741824,
+            "temp_store": "MEMORY",
+        },
+        # Store kept between runs, committed writes survive a crash
+        "safe": {
+            "journal_mode": "WAL",
+            "synchronous": "FULL",
+        },
+    }
+    # Number of rows per batch used by execute_query, the sqlite driver infers column types from the first batch
+    QUERY_BATCH_ROWS = 1024
+
+    def __init__(self, store_location: pathlib.Path, configuration: Configuration):
+        super().__init__(store_location, configuration)
+        self._database = str(self.database_path)
+        self._lock = threading.RLock()
+        self._connection = None
+        self._connection_inode = None
+        self._table_catalog: Optional[dict[str, None]] = None
+        self._pragmas = self._get_pragmas(configuration)
+
+    @classmethod
+    def _get_pragmas(cls, configuration: Configuration) -> dict:
+        """Pragmas from coal.store_pragmas: either the name of a profile or a table of pragma values"""
+        pragmas = configuration.safe_get("coal.store_pragmas", "default")
+        if isinstance(pragmas, dict):
+            pragmas = dict(pragmas)
+        elif pragmas in cls.PRAGMA_PROFILES:
+            pragmas = cls.PRAGMA_PROFILES[pragmas]
+        else:
+            raise ValueError(
+                T("coal.store.store.unknown_pragma_profile").format(
+                    profile=pragmas, profiles=", ".join(cls.PRAGMA_PROFILES)
+                )
+            )
+        invalid_pragmas = [pragma for pragma in pragmas if not pragma.isidentifier()]
+        if invalid_pragmas:
+            raise ValueError(T("coal.store.store.invalid_pragmas").format(pragmas=invalid_pragmas))
+        return pragmas
+
+    def _open_connection(self) -> dbapi.Connection:
+        conn = dbapi.connect(self._database, autocommit=True)
+        if self._pragmas:
+            with conn.cursor() as curs:
+                for pragma, value in self._pragmas.items():
+                    curs.execute(f"pragma {pragma} = {value}")
+        return conn
+
+    def _database_inode(self) -> Optional[int]:
+        try:
+            return os.stat(self._database).st_ino
+        except OSError:
+            return None
+
+    def _drop_stale_connection(self):
+        """Close the connection (and forget the catalog) if the database file was removed or replaced"""
+        if self._connection is not None and self._connection_inode != self._database_inode():
+            self.close()
+
+    @contextmanager
+    def _connect(self):
+        """Yield the shared connection, opening it if needed"""
+        with self._lock:
+            self._drop_stale_connection()
+            if self._connection is None:
+                self._connection = self._open_connection()
+                self._connection_inode = self._database_inode()
+            yield self._connection
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = None
+            self._connection_inode = None
+            self._table_catalog = None
+
+    def reset(self):
+        with self._lock:
+            self.close()
+            # Write-ahead log files would be replayed in the next database
+            for path in (
+                self.database_path,
+                pathlib.Path(f"{self._database}-wal"),
+                pathlib.Path(f"{self._database}-shm"),
+            ):
+                if path.exists():
+                    path.unlink()
+
+    def database_file(self) -> pathlib.Path:
+        with self._lock:
+            # Closing the last connection moves the write-ahead log content into the database file
+            self.close()
+        return self.database_path
+
+    def list_tables(self) -> list[str]:
+        with self._connect() as conn:
+            if self._table_catalog is None:
+                objects = conn.adbc_get_objects(depth="tables").read_all()
+                tables = objects["catalog_db_schemas"][0][0]["db_schema_tables"]
+                self._table_catalog = {table["table_name"].as_py(): None for table in tables}
+            return list(self._table_catalog)
+
+    def table_exists(self, table_name: str) -> bool:
+        with self._lock:
+            self._drop_stale_connection()
+            if self._table_catalog is not None and table_name in self._table_catalog:
+                return True
+            # The catalog may be outdated if another Store wrote in the same database, refresh it before saying no
+            self._table_catalog = None
+            return table_name in self.list_tables()
+
+    def get_table_schema(self, table_name: str) -> pyarrow.Schema:
+        with self._connect() as conn:
+            return conn.adbc_get_table_schema(table_name)
+
+    def add_table(
+        self,
+        table_name: str,
+        data: Union[pyarrow.Table, pyarrow.RecordBatchReader],
+        replace: bool = False,
+    ) -> int:
+        with self._connect() as conn:
+            with conn.cursor() as curs:
+                curs.execute("begin")
+            try:
+                with conn.cursor() as curs:
+                    rows = curs.adbc_ingest(table_name, data, "replace" if replace else "create_append")
+            except BaseException:
+                with conn.cursor() as curs:
+                    curs.execute("rollback")
+                raise
+            with conn.cursor() as curs:
+                curs.execute("commit")
+            if self._table_catalog is not None:
+                self._table_catalog[table_name] = None
+        return rows
+
+    def _column_literals(
+        self,
+        table_name: str,
+        columns: list[tuple[str, str]],
+        where: Optional[str] = None,
+        parameters: Optional[list] = None,
+    ) -> list[str]:
+        """
+        Get a literal typed like the values of each column, see _typed_table_query.
+
+        The literal comes from the declared type of the column when it fixes the storage class of its values, else
+        from the storage classes of the values the column holds among the rows matching the where condition.
+        """
+        literals = [_type_literal(declared_type) for _, declared_type in columns]
+        untyped = [name for (name, _), literal in zip(columns, literals) if literal is None]
+        if untyped:
+            checks = ", ".join(
+                f"max(typeof({quote_identifier(name)}) = '{storage_class}') as {quote_identifier(f'{i}_{j}')}"
+                for i, name in enumerate(untyped)
+                for j, (storage_class, _) in enumerate(_STORAGE_CLASS_LITERALS)
+            )
+            query = f"select {checks} from {quote_identifier(table_name)}"
+            if where is not None:
+                query += f" where {where}"
+            found = self.execute_query(query, parameters).to_pylist()[0]
+            stored_literals = {
+                name: next(
+                    (literal for j, (_, literal) in enumerate(_STORAGE_CLASS_LITERALS) if found[f"{i}_{j}"]), "NULL"
+                )
+                for i, name in enumerate(untyped)
+            }
+            literals = [stored_literals.get(name, literal) for (name, _), literal in zip(columns, literals)]
+        return literals
+
+    @staticmethod
+    def _typed_table_query(
+        table_name: str, columns: list[tuple[str, str]], literals: list[str], where: Optional[str] = None
+    ) -> str:
+        """
+        Build a query returning the content of a table preceded by a row of typed literals.
+
+        The sqlite driver infers the type of each column from the first batch of the result, a column with only
+        NULL values in it gets typed as integer and makes the query fail on the first REAL or TEXT value found
+        later. Starting the result with a row of values typed like the column values avoids this.
+
+        Args:
+            table_name: name of the table to read
+            columns: name and declared type of the columns to read
+            literals: literal typed like the values of each column, see _column_literals
+            where: SQL condition the rows must match
+
+        Returns:
+            A query whose first row has to be dropped from the result
+        """
+        names = [quote_identifier(name) for name, _ in columns]
+        typed_literals = ", ".join(f"{literal} as {name}" for name, literal in zip(names, literals))
+        query = f'select {typed_literals} union all select {", ".join(names)} from {quote_identifier(table_name)}'
+        if where is not None:
+            query += f" where {where}"
+        return query
+
+    def read_table(
+        self,
+        table_name: str,
+        columns: list[tuple[str, str]],
+        where: Optional[str] = None,
+        parameters: Optional[list] = None,
+    ) -> pyarrow.Table:
+        literals = self._column_literals(table_name, columns, where, parameters)
+        # First row is the typing row added by _typed_table_query
+        return self.execute_query(self._typed_table_query(table_name, columns, literals, where), parameters).slice(1)
+
+    def iter_table(
+        self,
+        table_name: str,
+        columns: list[tuple[str, str]],
+        where: Optional[str] = None,
+        parameters: Optional[list] = None,
+        batch_rows: int = 65536,
+    ) -> pyarrow.RecordBatchReader:
+        literals = self._column_literals(table_name, columns, where, parameters)
+        # Typing row sets the column types, no later value can mismatch them
+        reader = self._stream_query(
+            self._typed_table_query(table_name, columns, literals, where),
+            parameters,
+            batch_rows=batch_rows,
+            retype_null_columns=False,
+        )
+
+        def _batches():
+            batches = iter(reader)
+            # First row is the typing row added by _typed_table_query
+            yield next(batches).slice(1)
+            yield from batches
+
+        return pyarrow.RecordBatchReader.from_batches(reader.schema, _batches())
+
+    def execute(self, statement: str):
+        with self._connect() as conn:
+            with conn.cursor() as curs:
+                curs.execute(statement)
+
+    @staticmethod
+    def _fetch_table(conn, sql_query: str, parameters: list, batch_rows: int) -> pyarrow.Table:
+        with conn.cursor() as curs:
+            curs.adbc_statement.set_options(**{"adbc.sqlite.query.batch_rows": str(batch_rows)})
+            curs.execute(sql_query, parameters)
+            return curs.fetch_arrow_table()
+
+    def _count_result_rows(self, sql_query: str, parameters: Optional[list] = None) -> int:
+        """Count the rows of a query result with the sqlite3 module, which reads each value with its own type"""
+        with closing(sqlite3.connect(self._database)) as conn:
+            return sum(1 for _ in conn.execute(sql_query, parameters or ()))
+
+    def _fetch_whole_result(self, conn, sql_query: str, parameters: Optional[list] = None) -> pyarrow.Table:
+        """
+        Run a query again in a single batch holding all its rows.
+
+        The sqlite driver infers the column types from every value of the first batch, a query whose later values
+        did not match the types inferred from its first batch gets the right types this way.
+        """
+        self.query_retries += 1
+        return self._fetch_table(conn, sql_query, parameters, max(self._count_result_rows(sql_query, parameters), 1))
+
+    def execute_query(self, sql_query: str, parameters: Optional[list] = None) -> pyarrow.Table:
+        with self._connect() as conn:
+            if not sql_query.lstrip().lower().startswith("select"):
+                # Statement may create or drop tables
+                self._table_catalog = None
+            try:
+                return self._fetch_table(conn, sql_query, parameters, self.QUERY_BATCH_ROWS)
+            except OSError as error:
+                # A value did not match the column type inferred from the first batch
+                if "type mismatch" not in str(error).lower():
+                    raise
+                LOGGER.info(T("coal.store.store.query_retry").format(batch_rows=self.QUERY_BATCH_ROWS, error=error))
+                return self._fetch_whole_result(conn, sql_query, parameters)
+
+    def _stream_query(
+        self, sql_query: str, parameters: Optional[list], batch_rows: int, retype_null_columns: bool = True
+    ) -> pyarrow.RecordBatchReader:
+        """
+        Stream a query result on a connection of its own, closed once the reader is exhausted or released.
+
+        With retype_null_columns, a query whose full first batch has columns holding only NULL values is run again in
+        a single batch: the sqlite driver typed these columns as integer and their next values may not match.
+        """
+        # The reader uses its own connection so it can be consumed while the shared one keeps serving other reads
+        conn = self._open_connection()
+        curs = conn.cursor()
+        try:
+            curs.adbc_statement.set_options(**{"adbc.sqlite.query.batch_rows": str(batch_rows)})
+            curs.execute(sql_query, parameters)
+            reader = curs.fetch_record_batch()
+            first_batch = next(iter(reader), None)
+        except Exception:
+            curs.close()
+            conn.close()
+            raise
+
+        null_columns = []
+        if retype_null_columns and first_batch is not None and first_batch.num_rows == batch_rows:
+            null_columns = [
+                name
+                for name, column in zip(first_batch.schema.names, first_batch.columns)
+                if column.null_count == len(column)
+            ]
+        if null_columns:
+            curs.close()
+            conn.close()
+            LOGGER.info(T("coal.store.store.query_null_columns").format(batch_rows=batch_rows, columns=null_columns))
+            with self._connect() as shared_conn:
+                result = self._fetch_whole_result(shared_conn, sql_query, parameters)
+            return pyarrow.RecordBatchReader.from_batches(result.schema, result.to_batches(max_chunksize=batch_rows))
+
+        def _batches():
+            try:
+                if first_batch is not None:
+                    yield first_batch
+                yield from reader
+            finally:
+                curs.close()
+                conn.close()
+
+        return pyarrow.RecordBatchReader.from_batches(reader.schema, _batches())
+
+    def execute_query_reader(
+        self, sql_query: str, parameters: Optional[list] = None, batch_rows: int = 65536
+    ) -> pyarrow.RecordBatchReader:
+        return self._stream_query(sql_query, parameters, batch_rows)
+
+    def list_indexes(self, table_name: Optional[str] = None) -> list[dict]:
+        # Origin "c" leaves out the indexes SQLite creates for its constraints
+        indexes = self.execute_query(
+            'select t.name as table_name, il.name as index_name, il."unique" as is_unique, ii.name as column_name '
+            "from sqlite_master as t, pragma_index_list(t.name) as il, pragma_index_info(il.name) as ii "
+            "where t.type = 'table' and il.origin = 'c' and (? is null or t.name = ?) "
+            "order by t.name, il.name, ii.seqno",
+            parameters=[table_name] * 2,
+        ).to_pylist()
+        result = dict()
+        for row in indexes:
+            index = result.setdefault(
+                row["index_name"],
+                {
+                    "name": row["index_name"],
+                    "table": row["table_name"],
+                    "columns": [],
+                    "unique": bool(row["is_unique"]),
+                },
+            )
+            index["columns"].append(row["column_name"])
+        return list(result.values())
@@ -6,10 +6,14 @@
 # specifically authorized by written means by Cosmo Tech.
 
 import pathlib
+from typing import BinaryIO, Optional, Union
 
+import pyarrow as pa
 import pyarrow.csv as pc
+from cosmotech.orchestrator.utils.translate import T
 
-from cosmotech.coal.store.store import Store
+from cosmotech.coal.store.store import Store, read_files
+from cosmotech.coal.utils.logger import LOGGER
 
 
 def store_csv_file(
@@ -17,17 +21,82 @@ def store_csv_file(
     csv_path: pathlib.Path,
     replace_existsing_file: bool = False,
     store: Store | None = None,
+    block_size: Optional[int] = None,
 ):
+    """
+    Store a CSV file in a table of the store.
+
+    With a block_size the file is streamed into the store one block at a time instead of being read as a whole,
+    keeping memory bounded by the block size. Column types are then inferred from the first block only.
+
+    Args:
+        table_name: name of the table to write to
+        csv_path: CSV file to store
+        replace_existsing_file: replace the content of the table instead of appending to it
+        store: store to write to
+        block_size: number of bytes of the file parsed at once when streaming it
+    """
     if store is None:
-        store = Store()
+        with Store() as store:
+            return store_csv_file(table_name, csv_path, replace_existsing_file, store, block_size)
     if not csv_path.exists():
         raise FileNotFoundError(f"File {csv_path} does not exists")
 
+    if block_size is None:
+        data = _read_csv_file(csv_path)
+    else:
+        data = _open_csv_file(csv_path, block_size)
+    store.add_table(table_name=table_name, data=data, replace=replace_existsing_file)
+
+
+def _read_csv_file(csv_path: pathlib.Path) -> pa.Table:
     data = pc.read_csv(csv_path)
     _c = data.column_names
-    data = data.rename_columns([Store.sanitize_column(_column) for _column in _c])
+    return data.rename_columns([Store.sanitize_column(_column) for _column in _c])
 
-    store.add_table(table_name=table_name, data=data, replace=replace_existsing_file)
+
+def _open_csv_file(csv_path: pathlib.Path, block_size: int) -> pa.RecordBatchReader:
+    reader = pc.open_csv(csv_path, read_options=pc.ReadOptions(block_size=block_size))
+    schema = pa.schema([_field.with_name(Store.sanitize_column(_field.name)) for _field in reader.schema])
+    return pa.RecordBatchReader.from_batches(
+        schema, (pa.RecordBatch.from_arrays(_batch.columns, schema=schema) for _batch in reader)
+    )
+
+
+def store_csv_folder(
+    csv_folder: pathlib.Path,
+    replace_existsing_file: bool = False,
+    store: Store | None = None,
+    workers: Optional[int] = None,
+    block_size: Optional[int] = None,
+):
+    """
+    Store every CSV file of a folder in a table named after the file.
+
+    Files are parsed concurrently, Arrow's CSV reader releasing the GIL, while the tables are written one at a
+    time in the store as their file gets parsed, see read_files. With a block_size the files are instead streamed
+    one after the other, see store_csv_file.
+
+    Args:
+        csv_folder: folder containing the CSV files
+        replace_existsing_file: replace existing tables instead of appending to them
+        store: store to write to
+        workers: maximum number of files parsed at the same time, defaults to the ThreadPoolExecutor default
+        block_size: number of bytes of a file parsed at once when streaming it
+    """
+    if store is None:
+        with Store() as store:
+            return store_csv_folder(csv_folder, replace_existsing_file, store, workers, block_size)
+    csv_paths = sorted(pathlib.Path(csv_folder).glob("*.csv"))
+    if block_size is not None:
+        for csv_path in csv_paths:
+            LOGGER.info(T("coal.services.azure_storage.found_file").format(file=csv_path.name))
+            store_csv_file(csv_path.name[:-4], csv_path, replace_existsing_file, store, block_size)
+        return
+    for csv_path in csv_paths:
+        LOGGER.info(T("coal.services.azure_storage.found_file").format(file=csv_path.name))
+    for csv_path, data in read_files(_read_csv_file, csv_paths, workers):
+        store.add_table(table_name=csv_path.name[:-4], data=data, replace=replace_existsing_file)
 
 
 def convert_store_table_to_csv(
@@ -35,9 +104,15 @@ def convert_store_table_to_csv(
     csv_path: pathlib.Path,
     replace_existsing_file: bool = False,
     store: Store | None = None,
+    columns: Optional[list[str]] = None,
+    where: Optional[str] = None,
+    parameters: Optional[list] = None,
 ):
     if store is None:
-        store = Store()
+        with Store() as store:
+            return convert_store_table_to_csv(
+                table_name, csv_path, replace_existsing_file, store, columns, where, parameters
+            )
     if csv_path.name.endswith(".csv") and csv_path.exists() and not replace_existsing_file:
         raise FileExistsError(f"File {csv_path} already exists")
     if not csv_path.name.endswith(".csv"):
@@ -45,4 +120,22 @@ def convert_store_table_to_csv(
     folder = csv_path.parent
     folder.mkdir(parents=True, exist_ok=True)
 
-    pc.write_csv(store.get_table(table_name), csv_path)
+    write_csv_stream(store.iter_batches(table_name, columns=columns, where=where, parameters=parameters), csv_path)
+
+
+def write_csv_stream(
+    reader: pa.RecordBatchReader,
+    sink: Union[pathlib.Path, BinaryIO],
+    include_header: bool = True,
+):
+    """
+    Write the batches of a reader as CSV one at a time.
+
+    Args:
+        reader: batches to write
+        sink: path or binary file object to write to
+        include_header: write the column names as first line
+    """
+    with pc.CSVWriter(sink, reader.schema, write_options=pc.WriteOptions(include_header=include_header)) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
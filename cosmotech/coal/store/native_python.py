@@ -5,6 +5,8 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
+from typing import Optional
+
 import pyarrow as pa
 
 from cosmotech.coal.store.store import Store
@@ -17,13 +19,21 @@ def store_pylist(
     store: Store | None = None,
 ):
     if store is None:
-        store = Store()
+        with Store() as store:
+            return store_pylist(table_name, data, replace_existsing_file, store)
     data = pa.Table.from_pylist(data)
 
     store.add_table(table_name=table_name, data=data, replace=replace_existsing_file)
 
 
-def convert_table_as_pylist(table_name: str, store: Store | None = None):
+def convert_table_as_pylist(
+    table_name: str,
+    store: Store | None = None,
+    columns: Optional[list[str]] = None,
+    where: Optional[str] = None,
+    parameters: Optional[list] = None,
+):
     if store is None:
-        store = Store()
-    return store.get_table(table_name).to_pylist()
+        with Store() as store:
+            return convert_table_as_pylist(table_name, store, columns, where, parameters)
+    return store.get_table(table_name, columns=columns, where=where, parameters=parameters).to_pylist()
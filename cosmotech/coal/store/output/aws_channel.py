@@ -1,15 +1,16 @@
-from io import BytesIO
+import os
+import tempfile
 from typing import Optional
 
-import pyarrow.csv as pc
-import pyarrow.parquet as pq
 from cosmotech.orchestrator.utils.translate import T
 
 from cosmotech.coal.aws import S3
 from cosmotech.coal.store.output.channel_interface import (
     ChannelInterface,
 )
-from cosmotech.coal.store.store import Store
+from cosmotech.coal.store.csv import write_csv_stream
+from cosmotech.coal.store.parquet import write_parquet_stream
+from cosmotech.coal.store.store import Store, non_empty_reader
 from cosmotech.coal.utils.configuration import Dotdict
 from cosmotech.coal.utils.logger import LOGGER
 
@@ -36,7 +37,7 @@ class AwsChannel(ChannelInterface):
             raise ValueError(T("coal.common.errors.data_invalid_output_type").format(output_type=self._s3.output_type))
 
         if self._s3.output_type == "sqlite":
-            _file_path = _s._database_path
+            _file_path = _s.database_file()
             self._s3.upload_file(_file_path)
         else:
             tables = list(_s.list_tables())
@@ -44,27 +45,27 @@ class AwsChannel(ChannelInterface):
                 tables = [t for t in tables if t in filter]
 
             for table_name in tables:
-                _data_stream = BytesIO()
                 _file_name = None
-                _data = _s.get_table(table_name)
-                if not len(_data):
+                _data = non_empty_reader(_s.iter_batches(table_name))
+                if _data is None:
                     LOGGER.info(T("coal.common.data_transfer.table_empty").format(table_name=table_name))
                     continue
-                if self._s3.output_type == "csv":
-                    _file_name = table_name + ".csv"
-                    pc.write_csv(_data, _data_stream)
-                elif self._s3.output_type == "parquet":
-                    _file_name = table_name + ".parquet"
-                    pq.write_table(_data, _data_stream)
-                LOGGER.info(
-                    T("coal.common.data_transfer.sending_table").format(
-                        table_name=table_name, output_type=self._s3.output_type
+                with tempfile.TemporaryFile(dir=os.environ.get("CSM_TEMP_ABSOLUTE_PATH")) as _data_stream:
+                    if self._s3.output_type == "csv":
+                        _file_name = table_name + ".csv"
+                        write_csv_stream(_data, _data_stream)
+                    elif self._s3.output_type == "parquet":
+                        _file_name = table_name + ".parquet"
+                        write_parquet_stream(_data, _data_stream)
+                    LOGGER.info(
+                        T("coal.common.data_transfer.sending_table").format(
+                            table_name=table_name, output_type=self._s3.output_type
+                        )
+                    )
+                    self._s3.upload_data_stream(
+                        data_stream=_data_stream,
+                        file_name=_file_name,
                     )
-                )
-                self._s3.upload_data_stream(
-                    data_stream=_data_stream,
-                    file_name=_file_name,
-                )
 
     def delete(self):
         self._s3.delete_objects()
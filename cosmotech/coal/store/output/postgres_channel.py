@@ -1,10 +1,12 @@
 from typing import Optional
 
 from cosmotech.coal.postgresql.runner import (
+    get_runner_run_id_from_postgresql,
     remove_runner_metadata_from_postgresql,
     send_runner_metadata_to_postgresql,
 )
 from cosmotech.coal.postgresql.store import dump_store_to_postgresql_from_conf
+from cosmotech.coal.postgresql.utils import PostgresUtils
 from cosmotech.coal.store.output.channel_interface import ChannelInterface
 
 
@@ -23,15 +25,29 @@ class PostgresChannel(ChannelInterface):
     }
     requirement_string = required_keys
 
+    @property
+    def partition_by_run(self) -> bool:
+        return self.configuration.safe_get("postgres.partition_by_run", False)
+
     def send(self, filter: Optional[list[str]] = None) -> bool:
+        previous_run_id = get_runner_run_id_from_postgresql(self.configuration) if self.partition_by_run else None
         run_id = send_runner_metadata_to_postgresql(self.configuration)
+        if previous_run_id and previous_run_id != run_id:
+            # The partitions of the replaced run are not linked to the metadata to be cascade deleted
+            PostgresUtils(self.configuration).drop_partitions(previous_run_id)
         dump_store_to_postgresql_from_conf(
             configuration=self.configuration,
             selected_tables=filter,
             fk_id=run_id,
             replace=False,
+            defer_constraints=self.configuration.safe_get("postgres.defer_constraints", False),
+            not_valid=self.configuration.safe_get("postgres.not_valid_constraints", False),
+            partition_by_run=self.partition_by_run,
         )
 
     def delete(self):
         # removing metadata will trigger cascade delete on real data
-        remove_runner_metadata_from_postgresql(self.configuration)
+        run_id = remove_runner_metadata_from_postgresql(self.configuration)
+        if self.partition_by_run:
+            # partitioned data is dropped as a whole instead
+            PostgresUtils(self.configuration).drop_partitions(run_id)
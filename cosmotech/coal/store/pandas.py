@@ -5,6 +5,8 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
+from typing import Optional
+
 import pandas as pd
 import pyarrow
 
@@ -18,13 +20,21 @@ def store_dataframe(
     store: Store | None = None,
 ):
     if store is None:
-        store = Store()
+        with Store() as store:
+            return store_dataframe(table_name, dataframe, replace_existsing_file, store)
     data = pyarrow.Table.from_pandas(dataframe)
 
     store.add_table(table_name=table_name, data=data, replace=replace_existsing_file)
 
 
-def convert_store_table_to_dataframe(table_name: str, store: Store | None = None) -> pd.DataFrame:
+def convert_store_table_to_dataframe(
+    table_name: str,
+    store: Store | None = None,
+    columns: Optional[list[str]] = None,
+    where: Optional[str] = None,
+    parameters: Optional[list] = None,
+) -> pd.DataFrame:
     if store is None:
-        store = Store()
-    return store.get_table(table_name).to_pandas()
+        with Store() as store:
+            return convert_store_table_to_dataframe(table_name, store, columns, where, parameters)
+    return store.get_table(table_name, columns=columns, where=where, parameters=parameters).to_pandas()
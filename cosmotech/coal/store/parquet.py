@@ -6,11 +6,14 @@
 # specifically authorized by written means by Cosmo Tech.
 
 import pathlib
+from typing import BinaryIO, Optional, Union
 
 import pyarrow as pa
 import pyarrow.parquet as pq
+from cosmotech.orchestrator.utils.translate import T
 
-from cosmotech.coal.store.store import Store
+from cosmotech.coal.store.store import Store, read_files
+from cosmotech.coal.utils.logger import LOGGER
 
 
 def store_parquet_file(
@@ -18,17 +21,86 @@ def store_parquet_file(
     parquet_path: pathlib.Path,
     replace_existsing_file: bool = False,
     store: Store | None = None,
+    batch_size: Optional[int] = None,
 ):
+    """
+    Store a Parquet file in a table of the store.
+
+    With a batch_size the file is streamed into the store one batch at a time, decoding a row group at a time,
+    instead of being read as a whole.
+
+    Args:
+        table_name: name of the table to write to
+        parquet_path: Parquet file to store
+        replace_existsing_file: replace the content of the table instead of appending to it
+        store: store to write to
+        batch_size: maximum number of rows per batch when streaming the file
+    """
     if store is None:
-        store = Store()
+        with Store() as store:
+            return store_parquet_file(table_name, parquet_path, replace_existsing_file, store, batch_size)
     if not parquet_path.exists():
         raise FileNotFoundError(f"File {parquet_path} does not exists")
 
+    if batch_size is None:
+        data = _read_parquet_file(parquet_path)
+    else:
+        data = _open_parquet_file(parquet_path, batch_size)
+    store.add_table(table_name=table_name, data=data, replace=replace_existsing_file)
+
+
+def _read_parquet_file(parquet_path: pathlib.Path) -> pa.Table:
     data: pa.Table = pq.ParquetFile(parquet_path).read()
     _c = data.column_names
-    data = data.rename_columns([Store.sanitize_column(_column) for _column in _c])
+    return data.rename_columns([Store.sanitize_column(_column) for _column in _c])
 
-    store.add_table(table_name=table_name, data=data, replace=replace_existsing_file)
+
+def _open_parquet_file(parquet_path: pathlib.Path, batch_size: int) -> pa.RecordBatchReader:
+    parquet_file = pq.ParquetFile(parquet_path)
+    schema = pa.schema([_field.with_name(Store.sanitize_column(_field.name)) for _field in parquet_file.schema_arrow])
+    return pa.RecordBatchReader.from_batches(
+        schema,
+        (
+            pa.RecordBatch.from_arrays(_batch.columns, schema=schema)
+            for _batch in parquet_file.iter_batches(batch_size=batch_size)
+        ),
+    )
+
+
+def store_parquet_folder(
+    parquet_folder: pathlib.Path,
+    replace_existsing_file: bool = False,
+    store: Store | None = None,
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None,
+):
+    """
+    Store every Parquet file of a folder in a table named after the file.
+
+    Files are decoded concurrently while the tables are written one at a time in the store as their file gets
+    decoded, see read_files. With a batch_size the files are instead streamed one after the other, see
+    store_parquet_file.
+
+    Args:
+        parquet_folder: folder containing the Parquet files
+        replace_existsing_file: replace existing tables instead of appending to them
+        store: store to write to
+        workers: maximum number of files decoded at the same time, defaults to the ThreadPoolExecutor default
+        batch_size: maximum number of rows per batch when streaming a file
+    """
+    if store is None:
+        with Store() as store:
+            return store_parquet_folder(parquet_folder, replace_existsing_file, store, workers, batch_size)
+    parquet_paths = sorted(pathlib.Path(parquet_folder).glob("*.parquet"))
+    if batch_size is not None:
+        for parquet_path in parquet_paths:
+            LOGGER.info(T("coal.services.azure_storage.found_file").format(file=parquet_path.name))
+            store_parquet_file(parquet_path.name[:-8], parquet_path, replace_existsing_file, store, batch_size)
+        return
+    for parquet_path in parquet_paths:
+        LOGGER.info(T("coal.services.azure_storage.found_file").format(file=parquet_path.name))
+    for parquet_path, data in read_files(_read_parquet_file, parquet_paths, workers):
+        store.add_table(table_name=parquet_path.name[:-8], data=data, replace=replace_existsing_file)
 
 
 def convert_store_table_to_parquet(
@@ -36,9 +108,42 @@ def convert_store_table_to_parquet(
     parquet_path: pathlib.Path,
     replace_existsing_file: bool = False,
     store: Store | None = None,
+    row_group_size: int = Store.DEFAULT_BATCH_ROWS,
+    compression: str = "snappy",
+    use_dictionary: Union[bool, list[str]] = True,
+    columns: Optional[list[str]] = None,
+    where: Optional[str] = None,
+    parameters: Optional[list] = None,
 ):
+    """
+    Write a table of the store as a Parquet file, one row group at a time.
+
+    Args:
+        table_name: name of the table to export
+        parquet_path: Parquet file or folder to write to
+        replace_existsing_file: replace the Parquet file if it exists
+        store: store to read from
+        row_group_size: maximum number of rows per row group
+        compression: compression codec of the file
+        use_dictionary: dictionary encode every column, or only the listed ones
+        columns: columns to export, defaults to every column of the table
+        where: SQL condition the exported rows must match, using "?" placeholders for its values
+        parameters: values of the placeholders of the where condition
+    """
     if store is None:
-        store = Store()
+        with Store() as store:
+            return convert_store_table_to_parquet(
+                table_name,
+                parquet_path,
+                replace_existsing_file,
+                store,
+                row_group_size,
+                compression,
+                use_dictionary,
+                columns,
+                where,
+                parameters,
+            )
     if parquet_path.name.endswith(".parquet") and parquet_path.exists() and not replace_existsing_file:
         raise FileExistsError(f"File {parquet_path} already exists")
     if not parquet_path.name.endswith(".parquet"):
@@ -46,4 +151,34 @@ def convert_store_table_to_parquet(
     folder = parquet_path.parent
     folder.mkdir(parents=True, exist_ok=True)
 
-    pq.write_table(store.get_table(table_name), parquet_path)
+    write_parquet_stream(
+        store.iter_batches(table_name, batch_rows=row_group_size, columns=columns, where=where, parameters=parameters),
+        parquet_path,
+        row_group_size=row_group_size,
+        compression=compression,
+        use_dictionary=use_dictionary,
+    )
+
+
+def write_parquet_stream(
+    reader: pa.RecordBatchReader,
+    sink: Union[pathlib.Path, BinaryIO],
+    row_group_size: Optional[int] = None,
+    compression: str = "snappy",
+    use_dictionary: Union[bool, list[str]] = True,
+):
+    """
+    Write the batches of a reader as Parquet one at a time.
+
+    Each batch is written as one or more row groups, batches larger than row_group_size getting split.
+
+    Args:
+        reader: batches to write
+        sink: path or binary file object to write to
+        row_group_size: maximum number of rows per row group
+        compression: compression codec of the file
+        use_dictionary: dictionary encode every column, or only the listed ones
+    """
+    with pq.ParquetWriter(sink, reader.schema, compression=compression, use_dictionary=use_dictionary) as writer:
+        for batch in reader:
+            writer.write_batch(batch, row_group_size=row_group_size)
@@ -5,6 +5,8 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
+from typing import Optional
+
 import pyarrow as pa
 
 from cosmotech.coal.store.store import Store
@@ -17,11 +19,19 @@ def store_table(
     store: Store | None = None,
 ):
     if store is None:
-        store = Store()
+        with Store() as store:
+            return store_table(table_name, data, replace_existsing_file, store)
     store.add_table(table_name=table_name, data=data, replace=replace_existsing_file)
 
 
-def convert_store_table_to_dataframe(table_name: str, store: Store | None = None) -> pa.Table:
+def convert_store_table_to_dataframe(
+    table_name: str,
+    store: Store | None = None,
+    columns: Optional[list[str]] = None,
+    where: Optional[str] = None,
+    parameters: Optional[list] = None,
+) -> pa.Table:
     if store is None:
-        store = Store()
-    return store.get_table(table_name)
+        with Store() as store:
+            return convert_store_table_to_dataframe(table_name, store, columns, where, parameters)
+    return store.get_table(table_name, columns=columns, where=where, parameters=parameters)
@@ -5,13 +5,24 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
+import itertools
+import os
 import pathlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from functools import wraps
+from typing import Callable, Iterator, Optional, Union
 
 import pyarrow
-from adbc_driver_sqlite import dbapi
+import pyarrow.ipc
 from cosmotech.orchestrator.utils.translate import T
 
+from cosmotech.coal.store.backend import (
+    BackendInterface,
+    DuckdbBackend,
+    SqliteBackend,
+)
+from cosmotech.coal.store.backend.backend_interface import quote_identifier
 from cosmotech.coal.utils.configuration import Configuration
 from cosmotech.coal.utils.logger import LOGGER
 
@@ -29,7 +40,111 @@ def table_name_to_lower(func):
     return wrapper
 
 
+def non_empty_reader(reader: pyarrow.RecordBatchReader) -> Optional[pyarrow.RecordBatchReader]:
+    """
+    Look ahead in a reader to check it contains data.
+
+    Args:
+        reader: reader to check
+
+    Returns:
+        None if the reader holds no rows, else a reader yielding the same batches
+    """
+    for batch in reader:
+        if batch.num_rows:
+            return pyarrow.RecordBatchReader.from_batches(reader.schema, itertools.chain([batch], reader))
+    return None
+
+
+def spool_reader(reader: pyarrow.RecordBatchReader, spool_path: pathlib.Path) -> int:
+    """
+    Write the batches of a reader in an Arrow IPC stream file, to be added to the store later with read_spool.
+
+    Readers streamed from remote databases can be spooled at the same time, each over its own connection, while the
+    store writes the tables one at a time.
+
+    Args:
+        reader: reader to write
+        spool_path: path of the file to write
+
+    Returns:
+        Number of rows written
+    """
+    rows = 0
+    with pyarrow.OSFile(str(spool_path), "wb") as sink, pyarrow.ipc.new_stream(sink, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+@contextmanager
+def read_spool(spool_path: pathlib.Path) -> Iterator[pyarrow.RecordBatchReader]:
+    """
+    Read a file written by spool_reader, the file is removed once done.
+
+    Args:
+        spool_path: path of the file to read
+
+    Yields:
+        A reader over the batches of the file
+    """
+    try:
+        with pyarrow.memory_map(str(spool_path)) as source:
+            yield pyarrow.ipc.open_stream(source)
+    finally:
+        spool_path.unlink(missing_ok=True)
+
+
+def read_files(
+    read_file: Callable[[pathlib.Path], pyarrow.Table], paths: list[pathlib.Path], workers: Optional[int] = None
+) -> Iterator[tuple[pathlib.Path, pyarrow.Table]]:
+    """
+    Read files concurrently, yielding their table as they get read.
+
+    A new file is only read once the table of a previous one is yielded: at most `workers` tables wait for the
+    caller, keeping memory bounded whatever the number of files.
+
+    Args:
+        read_file: function reading a file as a table
+        paths: files to read
+        workers: maximum number of files read at the same time, defaults to the ThreadPoolExecutor default
+
+    Yields:
+        Each path with the table read from it, in completion order
+    """
+    if workers is None:
+        workers = min(32, (os.cpu_count() or 1) + 4)
+    paths = iter(paths)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(read_file, path): path for path in itertools.islice(paths, workers)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                # Keep the workers busy while the caller consumes the table
+                for next_path in itertools.islice(paths, 1):
+                    pending[executor.submit(read_file, next_path)] = next_path
+                yield path, future.result()
+
+
 class Store:
+    """
+    Datastore keeping tables in a database file of the store folder.
+
+    The database engine is selected with the coal.store_backend configuration, see available_backends. The Store
+    keeps its connection open between calls, it can be used as a context manager to close it once done.
+    """
+
+    # Number of rows per batch returned by the streaming readers
+    DEFAULT_BATCH_ROWS = 65536
+    # Columns identifying entities and relationships in datasets, indexed by add_table on request
+    ID_COLUMNS = ("id", "source", "target")
+    available_backends: dict[str, type[BackendInterface]] = {
+        "sqlite": SqliteBackend,
+        "duckdb": DuckdbBackend,
+    }
+
     @staticmethod
     def sanitize_column(column_name: str) -> str:
         return column_name.replace(" ", "_")
@@ -38,57 +153,246 @@ class Store:
         store_location = configuration.safe_get("coal.store", ".")
         self.store_location = pathlib.Path(store_location) / ".coal/store"
         self.store_location.mkdir(parents=True, exist_ok=True)
-        self._tables = dict()
-        self._database_path = self.store_location / "db.sqlite"
+        self.store_backend = configuration.safe_get("coal.store_backend", "sqlite")
+        if self.store_backend not in self.available_backends:
+            raise ValueError(
+                T("coal.store.store.unknown_backend").format(
+                    backend=self.store_backend, backends=", ".join(self.available_backends)
+                )
+            )
+        self._backend: BackendInterface = self.available_backends[self.store_backend](
+            self.store_location, configuration
+        )
+        self._database_path = self._backend.database_path
         if reset:
             self.reset()
-        self._database = str(self._database_path)
+
+    @property
+    def query_retries(self) -> int:
+        """Number of queries that had to be run a second time because of a column type mismatch"""
+        return self._backend.query_retries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._backend.close()
 
     def reset(self):
-        if self._database_path.exists():
-            self._database_path.unlink()
+        self._backend.reset()
+
+    def database_file(self) -> pathlib.Path:
+        """
+        Get the database file of the store, to be copied or uploaded as a whole.
+
+        Returns:
+            The path of the database file, holding every write made so far
+        """
+        return self._backend.database_file()
 
     @table_name_to_lower
-    def get_table(self, table_name: str) -> pyarrow.Table:
+    def get_table(
+        self,
+        table_name: str,
+        columns: Optional[list[str]] = None,
+        where: Optional[str] = None,
+        parameters: Optional[list] = None,
+    ) -> pyarrow.Table:
+        """
+        Read the content of a table.
+
+        Args:
+            table_name: name of the table to read
+            columns: columns to read, defaults to every column of the table
+            where: SQL condition the rows must match, using "?" placeholders for its values
+            parameters: values of the placeholders of the where condition
+
+        Returns:
+            The table content
+        """
         if not self.table_exists(table_name):
             raise ValueError(T("coal.errors.data.no_table").format(table_name=table_name))
-        return self.execute_query(f'select * from "{table_name}"')
+        return self._backend.read_table(table_name, self._table_columns(table_name, columns), where, parameters)
+
+    @table_name_to_lower
+    def iter_batches(
+        self,
+        table_name: str,
+        batch_rows: int = DEFAULT_BATCH_ROWS,
+        columns: Optional[list[str]] = None,
+        where: Optional[str] = None,
+        parameters: Optional[list] = None,
+    ) -> pyarrow.RecordBatchReader:
+        """
+        Stream the content of a table without loading it whole in memory.
+
+        Args:
+            table_name: name of the table to read
+            batch_rows: maximum number of rows per batch
+            columns: columns to read, defaults to every column of the table
+            where: SQL condition the rows must match, using "?" placeholders for its values
+            parameters: values of the placeholders of the where condition
+
+        Returns:
+            A reader over the table content
+        """
+        if not self.table_exists(table_name):
+            raise ValueError(T("coal.errors.data.no_table").format(table_name=table_name))
+        return self._backend.iter_table(
+            table_name, self._table_columns(table_name, columns), where, parameters, batch_rows=batch_rows
+        )
+
+    def _table_columns(self, table_name: str, columns: Optional[list[str]] = None) -> list[tuple[str, str]]:
+        """
+        Get the name and declared type of columns of a table.
+
+        Args:
+            table_name: name of the table
+            columns: columns to look for (case insensitive), defaults to every column of the table
+
+        Returns:
+            The name and declared type of the columns, in the requested order
+        """
+        declared_types = {
+            name.lower(): (name, declared_type) for name, declared_type in self._backend.table_columns(table_name)
+        }
+        if columns is None:
+            return list(declared_types.values())
+        unknown_columns = [column for column in columns if column.lower() not in declared_types]
+        if unknown_columns:
+            raise ValueError(
+                T("coal.store.store.unknown_columns").format(table_name=table_name, columns=unknown_columns)
+            )
+        return [declared_types[column.lower()] for column in columns]
 
     @table_name_to_lower
     def table_exists(self, table_name) -> bool:
-        return table_name in self.list_tables()
+        return self._backend.table_exists(table_name)
 
     @table_name_to_lower
     def get_table_schema(self, table_name: str) -> pyarrow.Schema:
         if not self.table_exists(table_name):
             raise ValueError(T("coal.errors.data.no_table").format(table_name=table_name))
-        with dbapi.connect(self._database) as conn:
-            return conn.adbc_get_table_schema(table_name)
+        return self._backend.get_table_schema(table_name)
 
     @table_name_to_lower
-    def add_table(self, table_name: str, data=pyarrow.Table, replace: bool = False):
-        with dbapi.connect(self._database, autocommit=True) as conn:
-            with conn.cursor() as curs:
-                rows = curs.adbc_ingest(table_name, data, "replace" if replace else "create_append")
-                LOGGER.debug(T("coal.common.data_transfer.rows_inserted").format(rows=rows, table_name=table_name))
+    def add_table(
+        self,
+        table_name: str,
+        data: Union[pyarrow.Table, pyarrow.RecordBatchReader],
+        replace: bool = False,
+        index_id_columns: bool = False,
+    ):
+        """
+        Write data in a table of the store.
+
+        The data is written in a single transaction: a reader failing mid-stream leaves the store untouched.
+
+        Args:
+            table_name: name of the table to write to
+            data: table or reader whose batches get appended one at a time
+            replace: replace the content of the table instead of appending to it
+            index_id_columns: index the columns of the table listed in ID_COLUMNS, see create_id_indexes
+        """
+        rows = self._backend.add_table(table_name, data, replace)
+        LOGGER.debug(T("coal.common.data_transfer.rows_inserted").format(rows=rows, table_name=table_name))
+        if index_id_columns:
+            self.create_id_indexes(table_name)
+
+    @table_name_to_lower
+    def create_index(
+        self,
+        table_name: str,
+        columns: list[str],
+        unique: bool = False,
+        index_name: Optional[str] = None,
+    ) -> str:
+        """
+        Index columns of a table, nothing is done if an index with the same name exists.
+
+        Args:
+            table_name: name of the table to index
+            columns: columns to index together
+            unique: forbid rows having the same values in the indexed columns
+            index_name: name of the index, defaults to one made from the table and column names
+
+        Returns:
+            The name of the index
+        """
+        if not self.table_exists(table_name):
+            raise ValueError(T("coal.errors.data.no_table").format(table_name=table_name))
+        column_names = [name for name, _ in self._table_columns(table_name, columns)]
+        if index_name is None:
+            index_name = "_".join([table_name, *column_names, "idx"])
+        self._backend.execute(
+            f"create {'unique ' if unique else ''}index if not exists {quote_identifier(index_name)} "
+            f"on {quote_identifier(table_name)} ({', '.join(quote_identifier(name) for name in column_names)})"
+        )
+        LOGGER.debug(T("coal.store.store.index_created").format(index_name=index_name, table_name=table_name))
+        return index_name
+
+    @table_name_to_lower
+    def create_id_indexes(self, table_name: str) -> list[str]:
+        """
+        Index each column of a table listed in ID_COLUMNS, used to join entities and relationships.
+
+        Args:
+            table_name: name of the table to index
+
+        Returns:
+            The names of the indexes
+        """
+        return [
+            self.create_index(table_name, [name])
+            for name, _ in self._table_columns(table_name)
+            if name.lower() in self.ID_COLUMNS
+        ]
+
+    def list_indexes(self, table_name: Optional[str] = None) -> list[dict]:
+        """
+        List the indexes created in the store, leaving out the ones the database creates for its constraints.
+
+        Args:
+            table_name: only list the indexes of this table
+
+        Returns:
+            The name, table, indexed columns and uniqueness of each index
+        """
+        return self._backend.list_indexes(table_name and table_name.lower())
+
+    def drop_index(self, index_name: str):
+        """
+        Drop an index, nothing is done if it does not exist.
+
+        Args:
+            index_name: name of the index to drop
+        """
+        self._backend.execute(f"drop index if exists {quote_identifier(index_name)}")
 
     def execute_query(self, sql_query: str, parameters: list = None) -> pyarrow.Table:
-        batch_size = 1024
-        batch_size_increment = 1024
-        while True:
-            try:
-                with dbapi.connect(self._database, autocommit=True) as conn:
-                    with conn.cursor() as curs:
-                        curs.adbc_statement.set_options(**{"adbc.sqlite.query.batch_rows": str(batch_size)})
-                        curs.execute(sql_query, parameters)
-                        return curs.fetch_arrow_table()
-            except OSError:
-                batch_size += batch_size_increment
+        return self._backend.execute_query(sql_query, parameters)
+
+    def execute_query_reader(
+        self, sql_query: str, parameters: list = None, batch_rows: int = DEFAULT_BATCH_ROWS
+    ) -> pyarrow.RecordBatchReader:
+        """
+        Run a query and stream its result.
+
+        The reader can be consumed while the Store keeps serving other reads, the resources it holds are released
+        once the reader is exhausted or released.
+
+        Args:
+            sql_query: query to run
+            parameters: query parameters
+            batch_rows: maximum number of rows per batch
+
+        Returns:
+            A reader over the query result
+        """
+        return self._backend.execute_query_reader(sql_query, parameters, batch_rows)
 
     def list_tables(self) -> list[str]:
-        with dbapi.connect(self._database) as conn:
-            objects = conn.adbc_get_objects(depth="all").read_all()
-            tables = objects["catalog_db_schemas"][0][0]["db_schema_tables"]
-        for table in tables:
-            table_name: pyarrow.StringScalar = table["table_name"]
-            yield table_name.as_py()
+        yield from self._backend.list_tables()
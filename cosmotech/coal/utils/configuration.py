@@ -127,6 +127,10 @@ class Configuration(Dotdict):
                 "user_password": "POSTGRES_USER_PASSWORD",
                 "password_encoding": "CSM_PSQL_FORCE_PASSWORD_ENCODING",
             },
+            "coal": {
+                "store_backend": "CSM_STORE_BACKEND",
+                "store_pragmas": "CSM_STORE_PRAGMAS",
+            },
             "single_store": {
                 "db": "SINGLE_STORE_DB",
                 "host": "SINGLE_STORE_HOST",
@@ -167,7 +171,7 @@ class Configuration(Dotdict):
 
         # add coal.store default value if ont define
         if self.safe_get("coal.store") is None:
-            self.merge({"coal": {"store": "$cosmotech.parameters_absolute_path"}})
+            self.merge(Dotdict({"coal": {"store": "$cosmotech.parameters_absolute_path"}}))
 
     # convert value to env
     def _env_swap_recusion(self, dic):
@@ -62,6 +62,35 @@ from cosmotech.csm_data.utils.decorators import translate_help, web_help
     show_envvar=True,
     required=True,
 )
+@click.option(
+    "--data-format",
+    envvar="CSM_DATA_ADX_DATA_FORMAT",
+    show_envvar=True,
+    type=click.Choice(["csv", "parquet"]),
+    default="csv",
+    show_default=True,
+    help=T("csm_data.commands.storage.adx_send_data.parameters.data_format"),
+)
+@click.option(
+    "--chunk-size",
+    envvar="CSM_DATA_ADX_CHUNK_SIZE",
+    show_envvar=True,
+    type=click.IntRange(min=1),
+    default=1024,
+    show_default=True,
+    metavar="MB",
+    help=T("csm_data.commands.storage.adx_send_data.parameters.chunk_size"),
+)
+@click.option(
+    "--max-workers",
+    envvar="CSM_DATA_ADX_MAX_WORKERS",
+    show_envvar=True,
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    metavar="N",
+    help=T("csm_data.commands.storage.adx_send_data.parameters.max_workers"),
+)
 def adx_send_data(
     adx_uri: str,
     adx_ingest_uri: str,
@@ -69,6 +98,9 @@ def adx_send_data(
     wait: bool,
     store_folder: str,
     tag: str = None,
+    data_format: str = "csv",
+    chunk_size: int = 1024,
+    max_workers: int = 1,
 ):
     """
     Send data from the store to Azure Data Explorer.
@@ -82,6 +114,9 @@ def adx_send_data(
         wait=wait,
         tag=tag,
         store_location=store_folder,
+        data_format=data_format,
+        chunk_bytes=chunk_size * 1024 * 1024,
+        max_workers=max_workers,
     )
 
     if not success:
@@ -0,0 +1,72 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+from cosmotech.orchestrator.utils.translate import T
+
+from cosmotech.csm_data.utils.click import click
+from cosmotech.csm_data.utils.decorators import translate_help, web_help
+
+
+@click.command()
+@web_help("csm-data/store/create-index")
+@translate_help("csm_data.commands.store.create_index.description")
+@click.option(
+    "--store-folder",
+    envvar="CSM_PARAMETERS_ABSOLUTE_PATH",
+    help=T("csm_data.commands.store.create_index.parameters.store_folder"),
+    metavar="PATH",
+    type=str,
+    show_envvar=True,
+    required=True,
+)
+@click.option(
+    "--table",
+    "table_name",
+    help=T("csm_data.commands.store.create_index.parameters.table"),
+    metavar="TABLE",
+    type=str,
+    default=None,
+)
+@click.option(
+    "--columns",
+    help=T("csm_data.commands.store.create_index.parameters.columns"),
+    metavar="COLUMN[,COLUMN...]",
+    type=str,
+    default=None,
+)
+@click.option(
+    "--unique/--no-unique",
+    help=T("csm_data.commands.store.create_index.parameters.unique"),
+    is_flag=True,
+    type=bool,
+    default=False,
+)
+def create_index(store_folder, table_name, columns, unique):
+    # Import the modules and functions at the start of the command
+    from cosmotech.coal.store.store import Store
+    from cosmotech.coal.utils.configuration import Configuration
+    from cosmotech.coal.utils.logger import LOGGER
+
+    if columns is not None and table_name is None:
+        raise click.UsageError(T("csm_data.commands.store.create_index.errors.missing_table"))
+
+    _conf = Configuration()
+    _conf.coal.store = store_folder
+
+    store = Store(False, _conf)
+    if columns is not None:
+        store.create_index(table_name, columns.split(","), unique=unique)
+    else:
+        for _table_name in [table_name] if table_name is not None else list(store.list_tables()):
+            store.create_id_indexes(_table_name)
+
+    for index in store.list_indexes(table_name):
+        LOGGER.info(
+            T("coal.store.store.index_entry").format(
+                index_name=index["name"], table_name=index["table"], columns=", ".join(index["columns"])
+            )
+        )
@@ -91,6 +91,41 @@ from cosmotech.csm_data.utils.decorators import translate_help, web_help
     is_flag=True,
     show_default=True,
 )
+@click.option(
+    "--max-workers",
+    help=T("csm_data.commands.store.dump_to_postgresql.parameters.max_workers"),
+    metavar="N",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "--staged/--direct",
+    "staged",
+    help=T("csm_data.commands.store.dump_to_postgresql.parameters.staged"),
+    default=False,
+    is_flag=True,
+    show_default=True,
+)
+@click.option(
+    "--unlogged",
+    help=T("csm_data.commands.store.dump_to_postgresql.parameters.unlogged"),
+    default=False,
+    is_flag=True,
+)
+@click.option(
+    "--upsert-keys",
+    help=T("csm_data.commands.store.dump_to_postgresql.parameters.upsert_keys"),
+    metavar="COLUMN[,COLUMN...]",
+    type=str,
+    default=None,
+)
+@click.option(
+    "--skip-unchanged",
+    help=T("csm_data.commands.store.dump_to_postgresql.parameters.skip_unchanged"),
+    default=False,
+    is_flag=True,
+)
 def dump_to_postgresql(
     store_folder,
     table_prefix: str,
@@ -102,6 +137,11 @@ def dump_to_postgresql(
     postgres_password,
     replace: bool,
     force_encode: bool,
+    max_workers: int,
+    staged: bool,
+    unlogged: bool,
+    upsert_keys: str,
+    skip_unchanged: bool,
 ):
     # Import the function at the start of the command
     from cosmotech.coal.postgresql import dump_store_to_postgresql
@@ -117,4 +157,9 @@ def dump_to_postgresql(
         postgres_password=postgres_password,
         replace=replace,
         force_encode=force_encode,
+        max_workers=max_workers,
+        staged=staged,
+        unlogged=unlogged,
+        upsert_keys=upsert_keys.split(",") if upsert_keys else None,
+        skip_unchanged=skip_unchanged,
     )
@@ -113,17 +113,17 @@ def dump_to_s3(
     ssl_cert_bundle: Optional[str] = None,
 ):
     # Import the modules and functions at the start of the command
-    from io import BytesIO
-
-    import pyarrow.csv as pc
-    import pyarrow.parquet as pq
+    import os
+    import tempfile
 
     from cosmotech.coal.aws import S3
-    from cosmotech.coal.store.store import Store
+    from cosmotech.coal.store.csv import write_csv_stream
+    from cosmotech.coal.store.parquet import write_parquet_stream
+    from cosmotech.coal.store.store import Store, non_empty_reader
     from cosmotech.coal.utils.configuration import Configuration
     from cosmotech.coal.utils.logger import LOGGER
 
-    _s = Store(store_location=store_folder)
+    _s = Store(configuration=Configuration({"coal": {"store": store_folder}}))
 
     if output_type not in VALID_TYPES:
         LOGGER.error(T("coal.common.errors.data_invalid_output_type").format(output_type=output_type))
@@ -140,8 +140,8 @@ def dump_to_s3(
     _s3 = S3(_configuration)
 
     if output_type == "sqlite":
-        _file_path = _s._database_path
-        _file_name = "db.sqlite"
+        _file_path = _s.database_file()
+        _file_name = _file_path.name
         _uploaded_file_name = file_prefix + _file_name
         LOGGER.info(
             T("coal.common.data_transfer.file_sent").format(file_path=_file_path, uploaded_name=_uploaded_file_name)
@@ -150,22 +150,22 @@ def dump_to_s3(
     else:
         tables = list(_s.list_tables())
         for table_name in tables:
-            _data_stream = BytesIO()
             _file_name = None
-            _data = _s.get_table(table_name)
-            if not len(_data):
+            _data = non_empty_reader(_s.iter_batches(table_name))
+            if _data is None:
                 LOGGER.info(T("coal.common.data_transfer.table_empty").format(table_name=table_name))
                 continue
-            if output_type == "csv":
-                _file_name = table_name + ".csv"
-                pc.write_csv(_data, _data_stream)
-            elif output_type == "parquet":
-                _file_name = table_name + ".parquet"
-                pq.write_table(_data, _data_stream)
-            LOGGER.info(
-                T("coal.common.data_transfer.sending_table").format(table_name=table_name, output_type=output_type)
-            )
-            _s3.upload_data_stream(
-                data_stream=_data_stream,
-                file_name=_file_name,
-            )
+            with tempfile.TemporaryFile(dir=os.environ.get("CSM_TEMP_ABSOLUTE_PATH")) as _data_stream:
+                if output_type == "csv":
+                    _file_name = table_name + ".csv"
+                    write_csv_stream(_data, _data_stream)
+                elif output_type == "parquet":
+                    _file_name = table_name + ".parquet"
+                    write_parquet_stream(_data, _data_stream)
+                LOGGER.info(
+                    T("coal.common.data_transfer.sending_table").format(table_name=table_name, output_type=output_type)
+                )
+                _s3.upload_data_stream(
+                    data_stream=_data_stream,
+                    file_name=_file_name,
+                )
@@ -31,19 +31,28 @@ from cosmotech.csm_data.utils.decorators import translate_help, web_help
     show_envvar=True,
     required=True,
 )
-def load_csv_folder(store_folder, csv_folder):
+@click.option(
+    "--workers",
+    help=T("csm_data.commands.store.load_csv_folder.parameters.workers"),
+    metavar="N",
+    type=click.IntRange(min=1),
+    default=None,
+)
+@click.option(
+    "--block-size",
+    help=T("csm_data.commands.store.load_csv_folder.parameters.block_size"),
+    metavar="BYTES",
+    type=click.IntRange(min=1),
+    default=None,
+)
+def load_csv_folder(store_folder, csv_folder, workers, block_size):
     # Import the modules and functions at the start of the command
-    import pathlib
-
-    from cosmotech.coal.store.csv import store_csv_file
+    from cosmotech.coal.store.csv import store_csv_folder
     from cosmotech.coal.store.store import Store
     from cosmotech.coal.utils.configuration import Configuration
-    from cosmotech.coal.utils.logger import LOGGER
 
     _conf = Configuration()
     _conf.coal.store = store_folder
 
     store = Store(False, _conf)
-    for csv_path in pathlib.Path(csv_folder).glob("*.csv"):
-        LOGGER.info(T("coal.services.azure_storage.found_file").format(file=csv_path.name))
-        store_csv_file(csv_path.name[:-4], csv_path, store=store)
+    store_csv_folder(csv_folder, store=store, workers=workers, block_size=block_size)
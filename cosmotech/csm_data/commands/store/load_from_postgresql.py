@@ -0,0 +1,159 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+from cosmotech.orchestrator.utils.translate import T
+
+from cosmotech.csm_data.utils.click import click
+from cosmotech.csm_data.utils.decorators import translate_help, web_help
+
+
+@click.command()
+@web_help("csm-data/store/load-from-postgresql")
+@translate_help("csm_data.commands.store.load_from_postgresql.description")
+@click.option(
+    "--store-folder",
+    envvar="CSM_PARAMETERS_ABSOLUTE_PATH",
+    help=T("csm_data.commands.store.load_from_postgresql.parameters.store_folder"),
+    metavar="PATH",
+    type=str,
+    show_envvar=True,
+    required=True,
+)
+@click.option(
+    "--table-prefix",
+    help=T("csm_data.commands.store.load_from_postgresql.parameters.table_prefix"),
+    metavar="PREFIX",
+    type=str,
+    default="Cosmotech_",
+)
+@click.option(
+    "--postgres-host",
+    help=T("csm_data.commands.store.load_from_postgresql.parameters.postgres_host"),
+    envvar="POSTGRES_HOST_URI",
+    show_envvar=True,
+    required=True,
+)
+@click.option(
+    "--postgres-port",
+    help=T("csm_data.commands.store.load_from_postgresql.parameters.postgres_port"),
+    envvar="POSTGRES_HOST_PORT",
+    show_envvar=True,
+    required=False,
+    default=5432,
+)
+@click.option(
+    "--postgres-db",
+    help=T("csm_data.commands.store.load_from_postgresql.parameters.postgres_db"),
+    envvar="POSTGRES_DB_NAME",
+    show_envvar=True,
+    required=True,
+)
+@click.option(
+    "--postgres-schema",
+    help=T("csm_data.commands.store.load_from_postgresql.parameters.postgres_schema"),
+    envvar="POSTGRES_DB_SCHEMA",
+    show_envvar=True,
+    required=True,
+)
+@click.option(
+    "--postgres-user",
+    help=T("csm_data.commands.store.load_from_postgresql.parameters.postgres_user"),
+    envvar="POSTGRES_USER_NAME",
+    show_envvar=True,
+    required=True,
+)
+@click.option(
+    "--postgres-password",
+    help=T("csm_data.commands.store.load_from_postgresql.parameters.postgres_password"),
+    envvar="POSTGRES_USER_PASSWORD",
+    show_envvar=True,
+    required=True,
+)
+@click.option(
+    "--tables",
+    help=T("csm_data.commands.store.load_from_postgresql.parameters.tables"),
+    metavar="TABLE[,TABLE...]",
+    type=str,
+    default=None,
+)
+@click.option(
+    "--sql-query",
+    help=T("csm_data.commands.store.load_from_postgresql.parameters.sql_query"),
+    metavar="QUERY",
+    type=str,
+    default=None,
+)
+@click.option(
+    "--query-table",
+    "query_table_name",
+    help=T("csm_data.commands.store.load_from_postgresql.parameters.query_table"),
+    metavar="TABLE",
+    type=str,
+    default="query_result",
+    show_default=True,
+)
+@click.option(
+    "--replace/--append",
+    "replace",
+    help=T("csm_data.commands.store.load_from_postgresql.parameters.replace"),
+    default=True,
+    is_flag=True,
+    show_default=True,
+)
+@click.option(
+    "--encode-password/--no-encode-password",
+    "force_encode",
+    help=T("csm_data.commands.store.load_from_postgresql.parameters.encode_password"),
+    envvar="CSM_PSQL_FORCE_PASSWORD_ENCODING",
+    show_envvar=True,
+    default=True,
+    is_flag=True,
+    show_default=True,
+)
+@click.option(
+    "--max-workers",
+    help=T("csm_data.commands.store.load_from_postgresql.parameters.max_workers"),
+    metavar="N",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+)
+def load_from_postgresql(
+    store_folder,
+    table_prefix: str,
+    postgres_host,
+    postgres_port,
+    postgres_db,
+    postgres_schema,
+    postgres_user,
+    postgres_password,
+    tables: str,
+    sql_query: str,
+    query_table_name: str,
+    replace: bool,
+    force_encode: bool,
+    max_workers: int,
+):
+    # Import the function at the start of the command
+    from cosmotech.coal.postgresql import load_from_postgresql
+
+    load_from_postgresql(
+        store_folder=store_folder,
+        table_prefix=table_prefix,
+        postgres_host=postgres_host,
+        postgres_port=postgres_port,
+        postgres_db=postgres_db,
+        postgres_schema=postgres_schema,
+        postgres_user=postgres_user,
+        postgres_password=postgres_password,
+        replace=replace,
+        force_encode=force_encode,
+        selected_tables=tables.split(",") if tables else [],
+        sql_query=sql_query,
+        query_table_name=query_table_name,
+        max_workers=max_workers,
+    )
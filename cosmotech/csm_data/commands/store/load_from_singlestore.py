@@ -11,6 +11,18 @@ from cosmotech.csm_data.utils.click import click
 from cosmotech.csm_data.utils.decorators import translate_help, web_help
 
 
+def _parse_watermarks(ctx, param, value: tuple[str]) -> dict[str, str]:
+    watermark_columns = dict()
+    for watermark in value:
+        table, _, column = watermark.partition("=")
+        if not table or not column:
+            raise click.BadParameter(
+                T("csm_data.commands.store.load_from_singlestore.errors.invalid_watermark").format(watermark=watermark)
+            )
+        watermark_columns[table] = column
+    return watermark_columns
+
+
 @click.command()
 @web_help("csm-data/store/load-from-singlestore")
 @translate_help("csm_data.commands.store.load_from_singlestore.description")
@@ -74,6 +86,39 @@ from cosmotech.csm_data.utils.decorators import translate_help, web_help
     show_envvar=True,
     required=True,
 )
+@click.option(
+    "--max-workers",
+    help=T("csm_data.commands.store.load_from_singlestore.parameters.max_workers"),
+    metavar="N",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "--batch-rows",
+    help=T("csm_data.commands.store.load_from_singlestore.parameters.batch_rows"),
+    metavar="N",
+    type=click.IntRange(min=1),
+    default=65536,
+    show_default=True,
+)
+@click.option(
+    "--replace/--append",
+    "replace",
+    help=T("csm_data.commands.store.load_from_singlestore.parameters.replace"),
+    default=False,
+    is_flag=True,
+    show_default=True,
+)
+@click.option(
+    "--watermark",
+    "watermarks",
+    help=T("csm_data.commands.store.load_from_singlestore.parameters.watermark"),
+    metavar="TABLE=COLUMN",
+    type=str,
+    multiple=True,
+    callback=_parse_watermarks,
+)
 def load_from_singlestore_command(
     single_store_host,
     single_store_port,
@@ -81,6 +126,10 @@ def load_from_singlestore_command(
     single_store_user,
     single_store_password,
     store_folder,
+    max_workers: int,
+    batch_rows: int,
+    replace: bool,
+    watermarks: dict[str, str],
     single_store_tables: str = "",
 ):
     # Import the function at the start of the command
@@ -94,4 +143,8 @@ def load_from_singlestore_command(
         single_store_password=single_store_password,
         store_folder=store_folder,
         single_store_tables=single_store_tables,
+        max_workers=max_workers,
+        batch_rows=batch_rows,
+        replace=replace,
+        watermark_columns=watermarks,
     )
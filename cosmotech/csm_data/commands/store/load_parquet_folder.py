@@ -31,19 +31,28 @@ from cosmotech.csm_data.utils.decorators import translate_help, web_help
     show_envvar=True,
     required=True,
 )
-def load_parquet_folder(store_folder, parquet_folder):
+@click.option(
+    "--workers",
+    help=T("csm_data.commands.store.load_parquet_folder.parameters.workers"),
+    metavar="N",
+    type=click.IntRange(min=1),
+    default=None,
+)
+@click.option(
+    "--batch-size",
+    help=T("csm_data.commands.store.load_parquet_folder.parameters.batch_size"),
+    metavar="ROWS",
+    type=click.IntRange(min=1),
+    default=None,
+)
+def load_parquet_folder(store_folder, parquet_folder, workers, batch_size):
     # Import the modules and functions at the start of the command
-    import pathlib
-
-    from cosmotech.coal.store.parquet import store_parquet_file
+    from cosmotech.coal.store.parquet import store_parquet_folder
     from cosmotech.coal.store.store import Store
     from cosmotech.coal.utils.configuration import Configuration
-    from cosmotech.coal.utils.logger import LOGGER
 
     _conf = Configuration()
     _conf.coal.store = store_folder
 
     store = Store(False, _conf)
-    for parquet_path in pathlib.Path(parquet_folder).glob("*.parquet"):
-        LOGGER.info(T("coal.services.azure_storage.found_file").format(file=parquet_path.name))
-        store_parquet_file(parquet_path.name[:-8], parquet_path, store=store)
+    store_parquet_folder(parquet_folder, store=store, workers=workers, batch_size=batch_size)
@@ -5,12 +5,16 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
+from cosmotech.csm_data.commands.store.create_index import create_index
 from cosmotech.csm_data.commands.store.delete import delete
 from cosmotech.csm_data.commands.store.dump_to_azure import dump_to_azure
 from cosmotech.csm_data.commands.store.dump_to_postgresql import dump_to_postgresql
 from cosmotech.csm_data.commands.store.dump_to_s3 import dump_to_s3
 from cosmotech.csm_data.commands.store.list_tables import list_tables
 from cosmotech.csm_data.commands.store.load_csv_folder import load_csv_folder
+from cosmotech.csm_data.commands.store.load_from_postgresql import (
+    load_from_postgresql,
+)
 from cosmotech.csm_data.commands.store.load_from_singlestore import (
     load_from_singlestore_command,
 )
@@ -33,8 +37,10 @@ store.add_command(list_tables, "list-tables")
 store.add_command(load_csv_folder, "load-csv-folder")
 store.add_command(load_parquet_folder, "load-parquet-folder")
 store.add_command(load_from_singlestore_command, "load-from-singlestore")
+store.add_command(load_from_postgresql, "load-from-postgresql")
 store.add_command(dump_to_postgresql, "dump-to-postgresql")
 store.add_command(dump_to_s3, "dump-to-s3")
 store.add_command(dump_to_azure, "dump-to-azure")
 store.add_command(output, "output")
 store.add_command(delete, "delete")
+store.add_command(create_index, "create-index")
@@ -5,17 +5,24 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
+import shutil
+
 import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 
-from cosmotech.coal.store.store import Store
+from cosmotech.coal.store.csv import convert_store_table_to_csv
+from cosmotech.coal.store.parquet import convert_store_table_to_parquet, store_parquet_file
+from cosmotech.coal.store.store import Store, non_empty_reader
+from cosmotech.coal.utils.configuration import Configuration
 
 
-@pytest.fixture(scope="function")
-def store():
-    store = Store(reset=True)
+@pytest.fixture(scope="function", params=list(Store.available_backends))
+def store(request):
+    store = Store(reset=True, configuration=Configuration({"coal": {"store_backend": request.param}}))
     yield store
     store.reset()
+    store.close()
 
 
 class TestIntegrationStore:
@@ -100,3 +107,248 @@ class TestIntegrationStore:
         assert result.num_rows == 1
         assert result.column("id").to_pylist() == [2]
         assert result.column("name").to_pylist() == ["b"]
+
+    def test_iter_batches(self, store):
+        """Test iter_batches streams the table in batches of the requested size"""
+
+        # Arrange
+        table_name = "items"
+        table = pa.Table.from_arrays([pa.array(range(10))], names=["id"])
+        store.add_table(table_name, table)
+
+        # Act
+        batches = list(store.iter_batches(table_name, batch_rows=4))
+
+        # Assert
+        assert all(batch.num_rows <= 4 for batch in batches)
+        assert pa.Table.from_batches(batches) == table
+
+    def test_execute_query_reader_with_parameters(self, store):
+        """Test execute_query_reader with a parameterized SQL query"""
+
+        # Arrange
+        table_name = "items"
+        table = pa.Table.from_arrays([pa.array([1, 2, 3]), pa.array(["a", "b", "c"])], names=["id", "name"])
+        store.add_table(table_name, table)
+
+        # Act
+        reader = store.execute_query_reader(f'SELECT * FROM "{table_name}" WHERE id > ?', parameters=[1])
+
+        # Assert
+        assert isinstance(reader, pa.RecordBatchReader)
+        assert reader.read_all().column("name").to_pylist() == ["b", "c"]
+
+    def test_non_empty_reader(self, store):
+        """Test non_empty_reader on empty and filled tables"""
+
+        # Arrange
+        store.add_table("empty", pa.Table.from_arrays([pa.array([], pa.int64())], names=["id"]))
+        store.add_table("filled", pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"]))
+
+        # Act
+        empty = non_empty_reader(store.iter_batches("empty"))
+        filled = non_empty_reader(store.iter_batches("filled"))
+
+        # Assert
+        assert empty is None
+        assert filled.read_all().column("id").to_pylist() == [1, 2, 3]
+
+    def test_get_table_with_null_prefixed_columns(self, store):
+        """Test get_table and iter_batches on columns starting with more NULL values than a batch holds"""
+
+        # Arrange
+        table = pa.Table.from_arrays(
+            [pa.array([None] * 3000 + [1.5] * 2000), pa.array([None] * 3000 + ["x"] * 2000)], names=["value", "label"]
+        )
+        store.add_table("sparse", table)
+
+        # Act
+        result = store.get_table("sparse")
+        batches = pa.Table.from_batches(list(store.iter_batches("sparse", batch_rows=1000)))
+
+        # Assert
+        assert result == table
+        assert batches == table
+        assert store.query_retries == 0
+
+    def test_execute_query_with_mixed_types(self, store):
+        """Test execute_query runs a query at most twice when a value does not match the inferred column type"""
+
+        # Arrange
+        if store.store_backend != "sqlite":
+            pytest.skip("Untyped columns only exist in SQLite")
+        store.execute_query("create table mixed (value)")
+        store.execute_query("insert into mixed values " + ", ".join(["(NULL)"] * 3000 + ["(1)"] * 10 + ["('a')"]))
+
+        # Act
+        result = store.execute_query("select * from mixed")
+
+        # Assert
+        assert result.num_rows == 3011
+        assert result.column("value").type == pa.string()
+        assert store.query_retries == 1
+
+    def test_iter_batches_untyped_column_with_null_prefix(self, store, tmp_path):
+        """Test streaming a column without declared type whose first batches only hold NULL values"""
+
+        # Arrange
+        if store.store_backend != "sqlite":
+            pytest.skip("Untyped columns only exist in SQLite")
+        values = [None] * 70000 + [0.5] * 30000
+        store.add_table("src", pa.Table.from_arrays([pa.array(range(100000)), pa.array(values)], names=["k", "v"]))
+        # Columns created by CTAS from an expression have no declared type
+        store.execute_query("create table agg as select k, v * 2 as w from src")
+        csv_path = tmp_path / "agg.csv"
+
+        # Act
+        batches = pa.Table.from_batches(list(store.iter_batches("agg", batch_rows=1000)))
+        convert_store_table_to_csv("agg", csv_path, store=store)
+
+        # Assert
+        assert batches.column("w").to_pylist() == [None] * 70000 + [1.0] * 30000
+        assert store.get_table("agg").column("w").type == pa.float64()
+        assert len(csv_path.read_text().splitlines()) == 100001
+
+    def test_add_table_from_reader(self, store):
+        """Test add_table appends every batch of a reader"""
+
+        # Arrange
+        table = pa.Table.from_arrays([pa.array(range(10))], names=["id"])
+        reader = pa.RecordBatchReader.from_batches(table.schema, table.to_batches(max_chunksize=3))
+
+        # Act
+        store.add_table("items", reader)
+
+        # Assert
+        assert store.get_table("items") == table
+
+    def test_add_table_from_failing_reader(self, store):
+        """Test add_table leaves the store untouched when a reader fails mid-stream"""
+
+        # Arrange
+        schema = pa.schema([("id", pa.int64())])
+
+        def batches():
+            yield pa.record_batch([pa.array([1, 2])], schema=schema)
+            raise ValueError("Invalid CSV row")
+
+        # Act
+        with pytest.raises(Exception):
+            store.add_table("items", pa.RecordBatchReader.from_batches(schema, batches()))
+
+        # Assert
+        assert not store.table_exists("items")
+
+    def test_parquet_round_trip_by_row_groups(self, store, tmp_path):
+        """Test a table exported and imported back as Parquet one row group at a time"""
+
+        # Arrange
+        table = pa.Table.from_arrays([pa.array(range(100)), pa.array([1.5, None] * 50)], names=["id", "value"])
+        store.add_table("source", table)
+        parquet_path = tmp_path / "source.parquet"
+
+        # Act
+        convert_store_table_to_parquet("source", parquet_path, store=store, row_group_size=30)
+        store_parquet_file("copy", parquet_path, store=store, batch_size=30)
+
+        # Assert
+        assert pq.ParquetFile(parquet_path).metadata.num_row_groups == 4
+        assert store.get_table("copy") == table
+
+    def test_get_table_with_columns_and_where(self, store):
+        """Test get_table and iter_batches only return the requested columns and matching rows"""
+
+        # Arrange
+        table = pa.Table.from_arrays(
+            [pa.array([1, 2, 3, 4]), pa.array(["a", "b", "c", "d"]), pa.array([0.5, 1.5, 2.5, 3.5])],
+            names=["id", "name", "value"],
+        )
+        store.add_table("items", table)
+
+        # Act
+        result = store.get_table("items", columns=["name", "id"], where="id > ? and name != ?", parameters=[1, "c"])
+        batches = store.iter_batches("items", columns=["value"], where="id <= ?", parameters=[2])
+
+        # Assert
+        assert result.to_pydict() == {"name": ["b", "d"], "id": [2, 4]}
+        assert batches.read_all().to_pydict() == {"value": [0.5, 1.5]}
+
+    def test_indexes(self, store):
+        """Test creating, listing and dropping indexes"""
+
+        # Arrange
+        store.add_table(
+            "links",
+            pa.Table.from_arrays(
+                [pa.array([1, 2]), pa.array([2, 3]), pa.array([0.5, 1.5])], names=["source", "target", "w"]
+            ),
+            index_id_columns=True,
+        )
+        store.add_table("entities", pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"]))
+
+        # Act
+        store.create_index("entities", ["id"], unique=True)
+        indexes = store.list_indexes()
+        store.drop_index("links_source_idx")
+
+        # Assert
+        assert indexes == [
+            {"name": "entities_id_idx", "table": "entities", "columns": ["id"], "unique": True},
+            {"name": "links_source_idx", "table": "links", "columns": ["source"], "unique": False},
+            {"name": "links_target_idx", "table": "links", "columns": ["target"], "unique": False},
+        ]
+        assert [index["name"] for index in store.list_indexes("links")] == ["links_target_idx"]
+
+    def test_indexes_used_by_joins(self, store):
+        """Test joins on indexed columns use the index"""
+
+        # Arrange
+        if store.store_backend != "sqlite":
+            pytest.skip("Query plan format is specific to SQLite")
+        store.add_table("links", pa.Table.from_arrays([pa.array([1, 2])], names=["source"]), index_id_columns=True)
+        store.add_table("entities", pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"]))
+
+        # Act
+        plan = store.execute_query(
+            "explain query plan select * from entities e join links l on l.source = e.id"
+        ).column("detail")
+
+        # Assert
+        assert any("USING" in detail and "INDEX" in detail for detail in plan.to_pylist())
+
+    def test_database_file(self, store, tmp_path):
+        """Test the database file holds the tables written so far and can be opened on its own"""
+
+        # Arrange
+        table = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        store.add_table("items", table)
+
+        # Act
+        database_file = store.database_file()
+        copy_location = tmp_path / ".coal/store"
+        copy_location.mkdir(parents=True)
+        shutil.copy(database_file, copy_location / database_file.name)
+        configuration = Configuration({"coal": {"store": str(tmp_path), "store_backend": store.store_backend}})
+
+        # Assert
+        with Store(configuration=configuration) as copy:
+            assert copy.get_table("items") == table
+
+    def test_reset_with_other_store_open(self, store):
+        """Test a reset store is empty even if another store of the same database is still open"""
+
+        # Arrange
+        table = pa.Table.from_arrays([pa.array(range(10000))], names=["id"])
+        store.add_table("items", table)
+        reader = store.iter_batches("items", batch_rows=100)
+        next(reader)
+        configuration = Configuration({"coal": {"store_backend": store.store_backend}})
+
+        # Act
+        with Store(reset=True, configuration=configuration) as reset_store:
+            reset_store.add_table("others", table)
+
+        # Assert
+        with Store(configuration=configuration) as reopened:
+            assert list(reopened.list_tables()) == ["others"]
+        assert list(store.list_tables()) == ["others"]
@@ -5,11 +5,13 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
+import asyncio
 import time
 from unittest.mock import MagicMock, patch
 
 import pandas as pd
 import pytest
+from azure.core.exceptions import HttpResponseError
 from azure.kusto.data import KustoClient
 from azure.kusto.ingest import IngestionProperties, QueuedIngestClient, ReportLevel
 from azure.kusto.ingest.status import (
@@ -20,11 +22,13 @@ from azure.kusto.ingest.status import (
 
 from cosmotech.coal.azure.adx.ingestion import (
     IngestionStatus,
+    IngestionStatusTracker,
     _ingest_status,
     _ingest_times,
     check_ingestion_status,
     clear_ingestion_status_queues,
     ingest_dataframe,
+    monitor_ingestion,
     send_to_adx,
 )
 
@@ -426,3 +430,145 @@ class TestIngestionFunctions:
         # Verify that the queues were not cleared
         mock_status_queues.success.pop.assert_not_called()
         mock_status_queues.failure.pop.assert_not_called()
+
+    @staticmethod
+    def _status_queue(source_ids):
+        """Mock a status queue holding one message per source id."""
+        queue = MagicMock()
+        messages = []
+        for source_id in source_ids:
+            message = MagicMock()
+            message.content = f'{{"IngestionSourceId": "{source_id}"}}'
+            messages.append(message)
+        queue.receive_messages.side_effect = lambda **kwargs: iter(list(messages))
+        queue.delete_message.side_effect = messages.remove
+        return queue
+
+    @patch("cosmotech.coal.azure.adx.ingestion.KustoIngestStatusQueues")
+    def test_tracker_poll(self, mock_status_queues_class, mock_ingest_client, mock_status_queues):
+        """Test the tracker drains the queues and only deletes the messages of its ingestions."""
+        # Arrange
+        mock_status_queues_class.return_value = mock_status_queues
+        success_queue = self._status_queue([f"id-{i}" for i in range(100)] + ["other-id"])
+        failure_queue = self._status_queue(["id-100"])
+        mock_status_queues.success._get_queues.return_value = [success_queue]
+        mock_status_queues.failure._get_queues.return_value = [failure_queue]
+        tracker = IngestionStatusTracker(mock_ingest_client, [f"id-{i}" for i in range(102)])
+
+        # Act
+        resolved = tracker.poll()
+        second_poll = tracker.poll()
+
+        # Assert
+        assert len(resolved) == 101
+        assert resolved["id-100"] == IngestionStatus.FAILURE
+        assert all(resolved[f"id-{i}"] == IngestionStatus.SUCCESS for i in range(100))
+        assert tracker.pending == ["id-101"]
+        assert second_poll == {}
+        assert success_queue.delete_message.call_count == 100
+        # Messages of other ingestions are made visible again right away
+        other_message = success_queue.update_message.call_args.args[0]
+        assert other_message.content == '{"IngestionSourceId": "other-id"}'
+        assert success_queue.update_message.call_args.kwargs == {"visibility_timeout": 0}
+        assert success_queue.update_message.call_count == 2
+        # Status queues are only looked up once
+        mock_status_queues_class.assert_called_once_with(mock_ingest_client)
+
+    @patch("cosmotech.coal.azure.adx.ingestion.KustoIngestStatusQueues")
+    def test_tracker_poll_release_failure(self, mock_status_queues_class, mock_ingest_client, mock_status_queues):
+        """Test messages of other ingestions that can no longer be released are left as they are."""
+        # Arrange
+        mock_status_queues_class.return_value = mock_status_queues
+        success_queue = self._status_queue(["other-id", "id-1"])
+        success_queue.update_message.side_effect = HttpResponseError("Pop receipt mismatch")
+        mock_status_queues.success._get_queues.return_value = [success_queue]
+        mock_status_queues.failure._get_queues.return_value = []
+        tracker = IngestionStatusTracker(mock_ingest_client, ["id-1"])
+
+        # Act
+        resolved = tracker.poll()
+
+        # Assert
+        assert resolved == {"id-1": IngestionStatus.SUCCESS}
+        success_queue.update_message.assert_called_once()
+
+    @patch("cosmotech.coal.azure.adx.ingestion.KustoIngestStatusQueues")
+    def test_tracker_timeout(self, mock_status_queues_class, mock_ingest_client, mock_status_queues):
+        """Test the tracker times out ingestions without status."""
+        # Arrange
+        mock_status_queues_class.return_value = mock_status_queues
+        mock_status_queues.success._get_queues.return_value = []
+        mock_status_queues.failure._get_queues.return_value = []
+        tracker = IngestionStatusTracker(mock_ingest_client, ["id-1"], timeout=0)
+
+        # Act
+        time.sleep(0.01)
+        resolved = tracker.poll()
+
+        # Assert
+        assert resolved == {"id-1": IngestionStatus.TIMEOUT}
+        assert tracker.pending == []
+
+    @patch("cosmotech.coal.azure.adx.ingestion.time.sleep")
+    def test_tracker_wait_backoff(self, mock_sleep, mock_ingest_client):
+        """Test the tracker backs off while no status comes in and polls again quickly once one does."""
+        # Arrange
+        tracker = IngestionStatusTracker(mock_ingest_client, ["id-1", "id-2"], min_interval=1, max_interval=4)
+        polls = iter([{}, {}, {}, {}, {"id-1": IngestionStatus.SUCCESS}, {}, {"id-2": IngestionStatus.FAILURE}])
+
+        def poll():
+            resolved = next(polls)
+            for source_id in resolved:
+                tracker._queued_times.pop(source_id)
+            tracker.statuses.update(resolved)
+            return resolved
+
+        tracker.poll = poll
+        callbacks = []
+
+        # Act
+        with patch("cosmotech.coal.azure.adx.ingestion.random.uniform", side_effect=lambda low, high: high):
+            statuses = tracker.wait(on_resolved=callbacks.append)
+
+        # Assert
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [2, 4, 4, 4, 1, 2]
+        assert callbacks == [{"id-1": IngestionStatus.SUCCESS}, {"id-2": IngestionStatus.FAILURE}]
+        assert statuses == {"id-1": IngestionStatus.SUCCESS, "id-2": IngestionStatus.FAILURE}
+
+    def test_tracker_wait_async(self, mock_ingest_client):
+        """Test the tracker can be awaited from an event loop."""
+        # Arrange
+        tracker = IngestionStatusTracker(mock_ingest_client, ["id-1"], min_interval=0.01)
+        polls = iter([{}, {"id-1": IngestionStatus.SUCCESS}])
+
+        def poll():
+            resolved = next(polls)
+            for source_id in resolved:
+                tracker._queued_times.pop(source_id)
+            tracker.statuses.update(resolved)
+            return resolved
+
+        tracker.poll = poll
+
+        # Act
+        statuses = asyncio.run(tracker.wait_async())
+
+        # Assert
+        assert statuses == {"id-1": IngestionStatus.SUCCESS}
+
+    @patch("cosmotech.coal.azure.adx.ingestion.IngestionStatusTracker")
+    def test_monitor_ingestion(self, mock_tracker_class, mock_ingest_client):
+        """Test monitor_ingestion reports failures of the tracked ingestions."""
+        # Arrange
+        mock_tracker = mock_tracker_class.return_value
+        mock_tracker.statuses = {"id-1": IngestionStatus.QUEUED, "id-2": IngestionStatus.QUEUED}
+        mock_tracker.wait.side_effect = lambda on_resolved: on_resolved(
+            {"id-1": IngestionStatus.SUCCESS, "id-2": IngestionStatus.FAILURE}
+        )
+
+        # Act
+        has_failures = monitor_ingestion(mock_ingest_client, ["id-1", "id-2"], {"id-1": "table1", "id-2": "table2"})
+
+        # Assert
+        assert has_failures is True
+        mock_tracker_class.assert_called_once_with(mock_ingest_client, ["id-1", "id-2"], timeout=900)
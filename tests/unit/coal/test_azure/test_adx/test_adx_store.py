@@ -6,11 +6,14 @@
 # specifically authorized by written means by Cosmo Tech.
 
 import os
+import threading
 from unittest.mock import ANY, MagicMock, patch
 
 import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 from azure.kusto.data import KustoClient
+from azure.kusto.data.data_format import DataFormat, IngestionMappingKind
 from azure.kusto.ingest import IngestionResult, QueuedIngestClient
 
 from cosmotech.coal.azure.adx.store import (
@@ -18,7 +21,9 @@ from cosmotech.coal.azure.adx.store import (
     send_pyarrow_table_to_adx,
     send_store_to_adx,
     send_table_data,
+    split_reader,
 )
+from cosmotech.coal.azure.adx.utils import create_column_mapping
 from cosmotech.coal.store.store import Store
 
 
@@ -61,7 +66,9 @@ class TestAdxStoreFunctions:
             # Assert
             assert source_id == "test-source-id-123"
             assert returned_table_name == table_name
-            mock_send.assert_called_once_with(mock_ingest_client, database, table_name, sample_table, operation_tag)
+            mock_send.assert_called_once_with(
+                mock_ingest_client, database, table_name, sample_table, operation_tag, "csv"
+            )
 
     def test_send_pyarrow_table_to_adx(self, mock_ingest_client, sample_table):
         """Test send_pyarrow_table_to_adx function."""
@@ -108,6 +115,25 @@ class TestAdxStoreFunctions:
         properties = call_args[0][1]
         assert properties.drop_by_tags is None
 
+    def test_send_pyarrow_table_to_adx_reader(self, mock_ingest_client, sample_table):
+        """Test send_pyarrow_table_to_adx streams a reader to the ingestion file."""
+        # Arrange
+        reader = pa.RecordBatchReader.from_batches(sample_table.schema, sample_table.to_batches(max_chunksize=1))
+        written = []
+
+        def read_file(file_path, properties):
+            with open(file_path) as f:
+                written.append(f.read())
+            return MagicMock(spec=IngestionResult)
+
+        mock_ingest_client.ingest_from_file.side_effect = read_file
+
+        # Act
+        send_pyarrow_table_to_adx(mock_ingest_client, "test-database", "test-table", reader)
+
+        # Assert
+        assert written[0].splitlines() == ['"1","Alice",1.5', '"2","Bob",2.5', '"3","Charlie",3.5']
+
     def test_send_pyarrow_table_to_adx_cleans_temp_file(self, mock_ingest_client, sample_table):
         """Test that send_pyarrow_table_to_adx cleans up temporary files."""
         # Arrange
@@ -133,6 +159,43 @@ class TestAdxStoreFunctions:
         # File should be cleaned up
         assert not os.path.exists(created_files[0])
 
+    def test_send_pyarrow_table_to_adx_parquet(self, mock_ingest_client, sample_table):
+        """Test send_pyarrow_table_to_adx streams a reader to a Parquet file mapped by column name."""
+        # Arrange
+        reader = pa.RecordBatchReader.from_batches(sample_table.schema, sample_table.to_batches(max_chunksize=1))
+        written = []
+
+        def read_file(file_path, properties):
+            written.append((file_path, pq.read_table(file_path), properties))
+            return MagicMock(spec=IngestionResult)
+
+        mock_ingest_client.ingest_from_file.side_effect = read_file
+
+        # Act
+        send_pyarrow_table_to_adx(mock_ingest_client, "test-database", "test-table", reader, data_format="parquet")
+
+        # Assert
+        file_path, table, properties = written[0]
+        assert file_path.endswith(".parquet")
+        assert table == sample_table
+        assert properties.format == DataFormat.PARQUET
+        assert properties.ingestion_mapping_type == IngestionMappingKind.PARQUET
+        assert [(m.column, m.datatype, m.properties["Path"]) for m in properties.ingestion_mapping] == [
+            ("id", "string", "$['id']"),
+            ("name", "string", "$['name']"),
+            ("value", "real", "$['value']"),
+        ]
+        assert not os.path.exists(file_path)
+
+    def test_send_pyarrow_table_to_adx_unknown_format(self, mock_ingest_client, sample_table):
+        """Test send_pyarrow_table_to_adx rejects unknown formats."""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            send_pyarrow_table_to_adx(
+                mock_ingest_client, "test-database", "test-table", sample_table, data_format="xml"
+            )
+        mock_ingest_client.ingest_from_file.assert_not_called()
+
     @patch("cosmotech.coal.azure.adx.store.Store")
     def test_process_tables(self, mock_store_class, mock_kusto_client, mock_ingest_client, sample_table):
         """Test process_tables function."""
@@ -140,7 +203,9 @@ class TestAdxStoreFunctions:
         mock_store = MagicMock(spec=Store)
         mock_store_class.return_value = mock_store
         mock_store.list_tables.return_value = ["table1", "table2"]
-        mock_store.get_table.return_value = sample_table
+        mock_store.iter_batches.side_effect = lambda _name: pa.RecordBatchReader.from_batches(
+            sample_table.schema, sample_table.to_batches()
+        )
 
         database = "test-database"
         operation_tag = "test-tag"
@@ -149,7 +214,7 @@ class TestAdxStoreFunctions:
         mock_result.source_id = "source-id-1"
 
         with (
-            patch("cosmotech.coal.azure.adx.store.check_and_create_table"),
+            patch("cosmotech.coal.azure.adx.store.create_tables"),
             patch("cosmotech.coal.azure.adx.store.send_table_data") as mock_send,
         ):
             mock_send.return_value = ("source-id-1", "table1")
@@ -164,6 +229,150 @@ class TestAdxStoreFunctions:
             assert "source-id-1" in source_ids
             assert "source-id-1" in mapping
 
+    def test_process_tables_chunks(self, mock_kusto_client, mock_ingest_client):
+        """Test process_tables sends a table in several chunks under the same tag."""
+        # Arrange
+        table = pa.table({"id": list(range(100))})
+        mock_store = MagicMock(spec=Store)
+        mock_store.list_tables.return_value = ["table1"]
+        mock_store.iter_batches.side_effect = lambda _name: pa.RecordBatchReader.from_batches(
+            table.schema, table.to_batches(max_chunksize=10)
+        )
+        sent = []
+
+        def send(ingest_client, database, table_name, data, operation_tag, data_format):
+            sent.append((data.read_all(), operation_tag))
+            return f"source-id-{len(sent)}", table_name
+
+        with (
+            patch("cosmotech.coal.azure.adx.store.create_tables"),
+            patch("cosmotech.coal.azure.adx.store.send_table_data", side_effect=send),
+        ):
+            # Act
+            source_ids, mapping = process_tables(
+                mock_store, mock_kusto_client, mock_ingest_client, "test-database", "test-tag", chunk_bytes=240
+            )
+
+        # Assert
+        assert source_ids == ["source-id-1", "source-id-2", "source-id-3", "source-id-4"]
+        assert mapping == {source_id: "table1" for source_id in source_ids}
+        assert [chunk.num_rows for chunk, _ in sent] == [30, 30, 30, 10]
+        assert pa.concat_tables(chunk for chunk, _ in sent) == table
+        assert {tag for _, tag in sent} == {"test-tag"}
+
+    def test_process_tables_creates_missing_tables(self, mock_kusto_client, mock_ingest_client, sample_table):
+        """Test process_tables checks tables against one schema snapshot and creates the missing ones at once."""
+        # Arrange
+        mock_store = MagicMock(spec=Store)
+        mock_store.list_tables.return_value = ["table1", "table2", "table3"]
+        mock_store.iter_batches.side_effect = lambda _name: pa.RecordBatchReader.from_batches(
+            sample_table.schema, sample_table.to_batches()
+        )
+        schema = MagicMock()
+        schema.table_exists.side_effect = lambda name: name == "table1"
+
+        with (
+            patch("cosmotech.coal.azure.adx.store.create_tables") as mock_create,
+            patch("cosmotech.coal.azure.adx.store.send_table_data", return_value=("source-id", "table")),
+        ):
+            # Act
+            process_tables(
+                mock_store, mock_kusto_client, mock_ingest_client, "test-database", "test-tag", schema=schema
+            )
+
+        # Assert
+        column_types = create_column_mapping(sample_table)
+        mock_create.assert_called_once_with(
+            mock_kusto_client, "test-database", {"table2": column_types, "table3": column_types}
+        )
+        schema.refresh.assert_called_once()
+
+    def test_process_tables_table_creation_failure(self, mock_kusto_client, mock_ingest_client, sample_table):
+        """Test process_tables sends nothing when the missing tables cannot be created."""
+        # Arrange
+        mock_store = MagicMock(spec=Store)
+        mock_store.list_tables.return_value = ["table1"]
+        mock_store.iter_batches.side_effect = lambda _name: pa.RecordBatchReader.from_batches(
+            sample_table.schema, sample_table.to_batches()
+        )
+        schema = MagicMock()
+        schema.table_exists.return_value = False
+
+        with (
+            patch("cosmotech.coal.azure.adx.store.create_tables", return_value=False),
+            patch("cosmotech.coal.azure.adx.store.send_table_data") as mock_send,
+        ):
+            # Act & Assert
+            with pytest.raises(RuntimeError):
+                process_tables(
+                    mock_store, mock_kusto_client, mock_ingest_client, "test-database", "test-tag", schema=schema
+                )
+            mock_send.assert_not_called()
+        schema.refresh.assert_not_called()
+
+    def test_process_tables_with_max_workers(self, mock_kusto_client, mock_ingest_client, sample_table):
+        """Test process_tables sends several tables at the same time."""
+        # Arrange
+        mock_store = MagicMock(spec=Store)
+        mock_store.list_tables.return_value = [f"table{i}" for i in range(4)]
+        mock_store.iter_batches.side_effect = lambda _name: pa.RecordBatchReader.from_batches(
+            sample_table.schema, sample_table.to_batches()
+        )
+        barrier = threading.Barrier(2, timeout=5)
+        threads = set()
+
+        def send(ingest_client, database, table_name, data, operation_tag, data_format):
+            # Only returns once two tables are sent at the same time
+            barrier.wait()
+            threads.add(threading.get_ident())
+            return f"source-{table_name}", table_name
+
+        with (
+            patch("cosmotech.coal.azure.adx.store.create_tables"),
+            patch("cosmotech.coal.azure.adx.store.send_table_data", side_effect=send),
+        ):
+            # Act
+            source_ids, mapping = process_tables(
+                mock_store, mock_kusto_client, mock_ingest_client, "test-database", "test-tag", max_workers=2
+            )
+
+        # Assert
+        assert sorted(source_ids) == [f"source-table{i}" for i in range(4)]
+        assert mapping == {f"source-table{i}": f"table{i}" for i in range(4)}
+        assert len(threads) == 2
+
+    def test_process_tables_failure(self, mock_kusto_client, mock_ingest_client, sample_table):
+        """Test process_tables raises the error of a failing table."""
+        # Arrange
+        mock_store = MagicMock(spec=Store)
+        mock_store.list_tables.return_value = ["table1", "table2", "table3"]
+        mock_store.iter_batches.side_effect = lambda _name: pa.RecordBatchReader.from_batches(
+            sample_table.schema, sample_table.to_batches()
+        )
+
+        with (
+            patch("cosmotech.coal.azure.adx.store.create_tables", side_effect=RuntimeError("boom")),
+            patch("cosmotech.coal.azure.adx.store.send_table_data") as mock_send,
+        ):
+            # Act & Assert
+            with pytest.raises(RuntimeError):
+                process_tables(mock_store, mock_kusto_client, mock_ingest_client, "test-database", "test-tag")
+            mock_send.assert_not_called()
+
+    def test_split_reader(self):
+        """Test split_reader cuts chunks between batches and keeps oversized batches whole."""
+        # Arrange
+        table = pa.table({"id": list(range(10))})
+        batches = [table.slice(0, 2), table.slice(2, 6), table.slice(8, 2)]
+        reader = pa.RecordBatchReader.from_batches(table.schema, [b.to_batches()[0] for b in batches])
+
+        # Act
+        chunks = [chunk.read_all() for chunk in split_reader(reader, chunk_bytes=32)]
+
+        # Assert
+        assert [chunk.num_rows for chunk in chunks] == [2, 6, 2]
+        assert pa.concat_tables(chunks) == table
+
     @patch("cosmotech.coal.azure.adx.store.Store")
     def test_process_tables_empty_table(self, mock_store_class, mock_kusto_client, mock_ingest_client):
         """Test process_tables skips empty tables."""
@@ -174,7 +383,9 @@ class TestAdxStoreFunctions:
 
         # Create an empty table
         empty_table = pa.table({"id": []})
-        mock_store.get_table.return_value = empty_table
+        mock_store.iter_batches.return_value = pa.RecordBatchReader.from_batches(
+            empty_table.schema, empty_table.to_batches()
+        )
 
         database = "test-database"
         operation_tag = "test-tag"
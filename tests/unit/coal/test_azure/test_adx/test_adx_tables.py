@@ -11,7 +11,13 @@ import pytest
 from azure.kusto.data import KustoClient
 from azure.kusto.data.response import KustoResponseDataSet
 
-from cosmotech.coal.azure.adx.tables import create_table, table_exists
+from cosmotech.coal.azure.adx.tables import (
+    DatabaseSchema,
+    check_and_create_table,
+    create_table,
+    create_tables,
+    table_exists,
+)
 
 
 class TestTablesFunctions:
@@ -203,3 +209,107 @@ class TestTablesFunctions:
 
         # Assert
         mock_kusto_client.execute_mgmt.assert_called_once()
+
+    @staticmethod
+    def _response(rows):
+        """Mock a response whose primary result holds the given rows."""
+        mock_response = MagicMock(spec=KustoResponseDataSet)
+        mock_response.primary_results = [MagicMock()]
+        mock_response.primary_results[0].__iter__.side_effect = lambda: iter(rows)
+        return mock_response
+
+    def test_database_schema_single_query(self, mock_kusto_client):
+        """Test DatabaseSchema answers every check from a single schema query."""
+        # Arrange
+        mock_kusto_client.execute.return_value = self._response([("table1",), ("table2",)])
+        schema = DatabaseSchema(mock_kusto_client, "test-database")
+
+        # Act
+        results = [schema.table_exists(name) for name in ("table1", "table2", "table3")]
+
+        # Assert
+        assert results == [True, True, False]
+        mock_kusto_client.execute.assert_called_once_with(
+            "test-database", ".show database ['test-database'] schema| distinct TableName"
+        )
+
+    def test_database_schema_refresh(self, mock_kusto_client):
+        """Test DatabaseSchema sees tables created before a refresh."""
+        # Arrange
+        mock_kusto_client.execute.side_effect = [self._response([]), self._response([("table1",)])]
+        schema = DatabaseSchema(mock_kusto_client, "test-database")
+
+        # Act
+        before = schema.table_exists("table1")
+        schema.refresh()
+        after = schema.table_exists("table1")
+
+        # Assert
+        assert before is False
+        assert after is True
+        assert mock_kusto_client.execute.call_count == 2
+
+    def test_check_and_create_table_with_schema(self, mock_kusto_client):
+        """Test check_and_create_table uses the snapshot and refreshes it once the table is created."""
+        # Arrange
+        import pyarrow as pa
+
+        schema = MagicMock(spec=DatabaseSchema)
+        schema.table_exists.return_value = False
+
+        # Act
+        result = check_and_create_table(
+            mock_kusto_client, "test-database", "new-table", pa.table({"id": [1]}), schema=schema
+        )
+
+        # Assert
+        assert result is True
+        schema.table_exists.assert_called_once_with("new-table")
+        schema.refresh.assert_called_once()
+        mock_kusto_client.execute.assert_called_once_with("test-database", ".create-merge table new-table(id:long)")
+
+    def test_create_tables_single_script(self, mock_kusto_client):
+        """Test create_tables sends every table creation in one database script."""
+        # Arrange
+        mock_kusto_client.execute.return_value = self._response([{"Result": "Completed"}, {"Result": "Completed"}])
+
+        # Act
+        result = create_tables(
+            mock_kusto_client, "test-database", {"table1": {"id": "long"}, "table2": {"id": "string", "v": "real"}}
+        )
+
+        # Assert
+        assert result is True
+        mock_kusto_client.execute.assert_called_once_with(
+            "test-database",
+            ".execute database script <|\n"
+            ".create-merge table table1(id:long)\n"
+            ".create-merge table table2(id:string,v:real)",
+        )
+
+    def test_create_tables_failed_command(self, mock_kusto_client):
+        """Test create_tables reports the commands of the script that failed."""
+        # Arrange
+        mock_kusto_client.execute.return_value = self._response(
+            [
+                {"Result": "Completed"},
+                {"Result": "Failed", "CommandText": ".create-merge table table2(id:string)", "Reason": "Conflict"},
+            ]
+        )
+
+        # Act
+        result = create_tables(
+            mock_kusto_client, "test-database", {"table1": {"id": "long"}, "table2": {"id": "string"}}
+        )
+
+        # Assert
+        assert result is False
+
+    def test_create_tables_nothing_to_create(self, mock_kusto_client):
+        """Test create_tables does not query the database without tables to create."""
+        # Act
+        result = create_tables(mock_kusto_client, "test-database", {})
+
+        # Assert
+        assert result is True
+        mock_kusto_client.execute.assert_not_called()
@@ -5,9 +5,15 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
+import pyarrow as pa
 import pytest
 
-from cosmotech.coal.azure.adx.utils import create_column_mapping, type_mapping
+from cosmotech.coal.azure.adx.utils import (
+    arrow_type_mapping,
+    create_column_mapping,
+    create_ingestion_mapping,
+    type_mapping,
+)
 
 
 class TestUtilsFunctions:
@@ -189,3 +195,56 @@ class TestUtilsFunctions:
         # Assert
         assert result["SimulationRun"] == "guid"
         assert result["value"] == "long"
+
+    @pytest.mark.parametrize(
+        "data_type, expected",
+        [
+            (pa.bool_(), "bool"),
+            (pa.int32(), "long"),
+            (pa.uint64(), "long"),
+            (pa.float64(), "real"),
+            (pa.decimal128(10, 2), "decimal"),
+            (pa.timestamp("us"), "datetime"),
+            (pa.date32(), "datetime"),
+            (pa.duration("s"), "timespan"),
+            (pa.list_(pa.int64()), "dynamic"),
+            (pa.string(), "string"),
+            (pa.null(), "string"),
+        ],
+    )
+    def test_arrow_type_mapping(self, data_type, expected):
+        """Test the arrow_type_mapping function."""
+        # Act
+        result = arrow_type_mapping(data_type)
+
+        # Assert
+        assert result == expected
+
+    def test_create_ingestion_mapping(self):
+        """Test the create_ingestion_mapping function maps columns by name."""
+        # Arrange
+        schema = pa.schema([("id", pa.int64()), ("name", pa.string())])
+
+        # Act
+        result = create_ingestion_mapping(schema)
+
+        # Assert
+        assert [(m.column, m.datatype, m.properties["Path"]) for m in result] == [
+            ("id", "long", "$['id']"),
+            ("name", "string", "$['name']"),
+        ]
+
+    def test_create_ingestion_mapping_special_names(self):
+        """Test the create_ingestion_mapping function quotes column names that are not identifiers."""
+        # Arrange
+        schema = pa.schema([("first name", pa.string()), ("a.b[0]", pa.int64()), ("it's", pa.bool_())])
+
+        # Act
+        result = create_ingestion_mapping(schema)
+
+        # Assert
+        assert [(m.column, m.properties["Path"]) for m in result] == [
+            ("first name", "$['first name']"),
+            ("a.b[0]", "$['a.b[0]']"),
+            ("it's", "$['it\\'s']"),
+        ]
@@ -5,7 +5,7 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
-import io
+import pathlib
 from unittest.mock import MagicMock, mock_open, patch
 
 import pyarrow as pa
@@ -58,7 +58,7 @@ class TestBlobFunctions:
 
         # Mock Store
         mock_store = MagicMock(spec=Store)
-        mock_store._database_path = "/path/to/store/db.sqlite"
+        mock_store.database_file.return_value = pathlib.Path("/path/to/store/db.sqlite")
 
         # Mock BlobServiceClient and ContainerClient
         mock_container_client = MagicMock(spec=ContainerClient)
@@ -107,15 +107,11 @@ class TestBlobFunctions:
         table2 = pa.table({"col3": [4, 5, 6], "col4": ["d", "e", "f"]})
         empty_table = pa.table({})
 
-        def get_table_side_effect(table_name):
-            if table_name == "table1":
-                return table1
-            elif table_name == "table2":
-                return table2
-            elif table_name == "empty_table":
-                return empty_table
+        def iter_batches_side_effect(table_name):
+            table = {"table1": table1, "table2": table2, "empty_table": empty_table}[table_name]
+            return pa.RecordBatchReader.from_batches(table.schema, table.to_batches())
 
-        mock_store.get_table.side_effect = get_table_side_effect
+        mock_store.iter_batches.side_effect = iter_batches_side_effect
 
         # Mock BlobServiceClient and ContainerClient
         mock_container_client = MagicMock(spec=ContainerClient)
@@ -125,16 +121,10 @@ class TestBlobFunctions:
         # Mock ClientSecretCredential
         mock_credential = MagicMock(spec=ClientSecretCredential)
 
-        # Mock BytesIO
-        mock_bytesio = MagicMock(spec=io.BytesIO)
-        mock_bytesio.read.return_value = b"csv data"
-
         with (
             patch("cosmotech.coal.azure.blob.Store", return_value=mock_store),
             patch("cosmotech.coal.azure.blob.BlobServiceClient", return_value=mock_blob_service_client),
             patch("cosmotech.coal.azure.blob.ClientSecretCredential", return_value=mock_credential),
-            patch("cosmotech.coal.azure.blob.BytesIO", return_value=mock_bytesio),
-            patch("pyarrow.csv.write_csv") as mock_write_csv,
         ):
             # Act
             dump_store_to_azure(configuration=base_azure_blob_config)
@@ -144,15 +134,11 @@ class TestBlobFunctions:
                 base_azure_blob_config.azure.container_name
             )
             assert mock_container_client.upload_blob.call_count == 2  # Only for non-empty tables
-            mock_container_client.upload_blob.assert_any_call(
-                name="prefix_table1.csv", data=mock_bytesio, length=len(b"csv data"), overwrite=True
-            )
-            mock_container_client.upload_blob.assert_any_call(
-                name="prefix_table2.csv", data=mock_bytesio, length=len(b"csv data"), overwrite=True
-            )
-            assert mock_write_csv.call_count == 2
-            mock_write_csv.assert_any_call(table1, mock_bytesio)
-            mock_write_csv.assert_any_call(table2, mock_bytesio)
+            uploaded_names = [c.kwargs["name"] for c in mock_container_client.upload_blob.call_args_list]
+            assert uploaded_names == ["prefix_table1.csv", "prefix_table2.csv"]
+            for upload_call in mock_container_client.upload_blob.call_args_list:
+                assert upload_call.kwargs["length"] > 0
+                assert upload_call.kwargs["overwrite"] is True
 
     def test_dump_store_to_azure_parquet(self, base_azure_blob_config):
         """Test the dump_store_to_azure function with Parquet output type."""
@@ -169,15 +155,11 @@ class TestBlobFunctions:
         table2 = pa.table({"col3": [4, 5, 6], "col4": ["d", "e", "f"]})
         empty_table = pa.table({})
 
-        def get_table_side_effect(table_name):
-            if table_name == "table1":
-                return table1
-            elif table_name == "table2":
-                return table2
-            elif table_name == "empty_table":
-                return empty_table
+        def iter_batches_side_effect(table_name):
+            table = {"table1": table1, "table2": table2, "empty_table": empty_table}[table_name]
+            return pa.RecordBatchReader.from_batches(table.schema, table.to_batches())
 
-        mock_store.get_table.side_effect = get_table_side_effect
+        mock_store.iter_batches.side_effect = iter_batches_side_effect
 
         # Mock BlobServiceClient and ContainerClient
         mock_container_client = MagicMock(spec=ContainerClient)
@@ -187,16 +169,10 @@ class TestBlobFunctions:
         # Mock ClientSecretCredential
         mock_credential = MagicMock(spec=ClientSecretCredential)
 
-        # Mock BytesIO
-        mock_bytesio = MagicMock(spec=io.BytesIO)
-        mock_bytesio.read.return_value = b"parquet data"
-
         with (
             patch("cosmotech.coal.azure.blob.Store", return_value=mock_store),
             patch("cosmotech.coal.azure.blob.BlobServiceClient", return_value=mock_blob_service_client),
             patch("cosmotech.coal.azure.blob.ClientSecretCredential", return_value=mock_credential),
-            patch("cosmotech.coal.azure.blob.BytesIO", return_value=mock_bytesio),
-            patch("pyarrow.parquet.write_table") as mock_write_table,
         ):
             # Act
             dump_store_to_azure(configuration=base_azure_blob_config)
@@ -206,15 +182,11 @@ class TestBlobFunctions:
                 base_azure_blob_config.azure.container_name
             )
             assert mock_container_client.upload_blob.call_count == 2  # Only for non-empty tables
-            mock_container_client.upload_blob.assert_any_call(
-                name="prefix_table1.parquet", data=mock_bytesio, length=len(b"parquet data"), overwrite=True
-            )
-            mock_container_client.upload_blob.assert_any_call(
-                name="prefix_table2.parquet", data=mock_bytesio, length=len(b"parquet data"), overwrite=True
-            )
-            assert mock_write_table.call_count == 2
-            mock_write_table.assert_any_call(table1, mock_bytesio)
-            mock_write_table.assert_any_call(table2, mock_bytesio)
+            uploaded_names = [c.kwargs["name"] for c in mock_container_client.upload_blob.call_args_list]
+            assert uploaded_names == ["prefix_table1.parquet", "prefix_table2.parquet"]
+            for upload_call in mock_container_client.upload_blob.call_args_list:
+                assert upload_call.kwargs["length"] > 0
+                assert upload_call.kwargs["overwrite"] is True
 
     def test_dump_store_to_azure_empty_tables(self, base_azure_blob_config):
         """Test the dump_store_to_azure function with empty tables."""
@@ -227,7 +199,9 @@ class TestBlobFunctions:
 
         # Create empty PyArrow tables
         empty_table = pa.table({})
-        mock_store.get_table.return_value = empty_table
+        mock_store.iter_batches.side_effect = lambda _name: pa.RecordBatchReader.from_batches(
+            empty_table.schema, empty_table.to_batches()
+        )
 
         # Mock BlobServiceClient and ContainerClient
         mock_container_client = MagicMock(spec=ContainerClient)
@@ -241,7 +215,7 @@ class TestBlobFunctions:
             patch("cosmotech.coal.azure.blob.Store", return_value=mock_store),
             patch("cosmotech.coal.azure.blob.BlobServiceClient", return_value=mock_blob_service_client),
             patch("cosmotech.coal.azure.blob.ClientSecretCredential", return_value=mock_credential),
-            patch("pyarrow.csv.write_csv") as mock_write_csv,
+            patch("cosmotech.coal.azure.blob.write_csv_stream") as mock_write_csv,
         ):
             # Act
             dump_store_to_azure(configuration=base_azure_blob_config)
@@ -8,6 +8,7 @@
 from unittest.mock import MagicMock, patch
 
 from cosmotech.coal.postgresql.runner import (
+    get_runner_run_id_from_postgresql,
     remove_runner_metadata_from_postgresql,
     send_runner_metadata_to_postgresql,
 )
@@ -168,3 +169,39 @@ class TestRunnerFunctions:
 
         # Verify the function returns the lastRunId
         assert result == "test-run-id"
+
+    @patch("cosmotech.coal.postgresql.runner.PostgresUtils")
+    @patch("cosmotech.coal.postgresql.runner.dbapi.connect")
+    def test_get_runner_run_id_from_postgresql(self, mock_connect, mock_postgres_utils_class):
+        """Test the get_runner_run_id_from_postgresql function reads the run id of the runner."""
+        # Arrange
+        mock_configuration = MagicMock()
+        mock_configuration.cosmotech.runner_id = "test-runner-id"
+        mock_postgres_utils_instance = mock_postgres_utils_class.return_value
+        mock_postgres_utils_instance.is_metadata_exists.return_value = True
+        mock_postgres_utils_instance.db_schema = "public"
+        mock_postgres_utils_instance.metadata_table_name = "test_runnermetadata"
+        mock_cursor = mock_connect.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+        mock_cursor.fetchone.return_value = ("test-run-id",)
+
+        # Act
+        result = get_runner_run_id_from_postgresql(mock_configuration)
+
+        # Assert
+        assert result == "test-run-id"
+        assert "public.test_runnermetadata" in mock_cursor.execute.call_args.args[0]
+        assert mock_cursor.execute.call_args.args[1] == ("test-runner-id",)
+
+    @patch("cosmotech.coal.postgresql.runner.PostgresUtils")
+    @patch("cosmotech.coal.postgresql.runner.dbapi.connect")
+    def test_get_runner_run_id_from_postgresql_no_metadata(self, mock_connect, mock_postgres_utils_class):
+        """Test the get_runner_run_id_from_postgresql function without metadata table."""
+        # Arrange
+        mock_postgres_utils_class.return_value.is_metadata_exists.return_value = False
+
+        # Act
+        result = get_runner_run_id_from_postgresql(MagicMock())
+
+        # Assert
+        assert result is None
+        mock_connect.assert_not_called()
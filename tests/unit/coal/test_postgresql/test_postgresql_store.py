@@ -5,11 +5,12 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
-from unittest.mock import MagicMock, call, patch
+import threading
+from unittest.mock import ANY, MagicMock, call, patch
 
 import pyarrow as pa
 
-from cosmotech.coal.postgresql.store import dump_store_to_postgresql
+from cosmotech.coal.postgresql.store import dump_store_to_postgresql, load_from_postgresql
 from cosmotech.coal.postgresql.utils import Configuration
 
 
@@ -30,9 +31,18 @@ class TestStoreFunctions:
         table1_data = pa.Table.from_arrays([pa.array([1, 2, 3]), pa.array(["a", "b", "c"])], names=["id", "name"])
         table2_data = pa.Table.from_arrays([pa.array([4, 5]), pa.array(["d", "e"])], names=["id", "value"])
         # Configure mock store to return tables
-        mock_store_instance.get_table.side_effect = lambda name: {"table1": table1_data, "table2": table2_data}[name]
+        tables = {"table1": table1_data, "table2": table2_data}
+        mock_store_instance.iter_batches.side_effect = lambda name: pa.RecordBatchReader.from_batches(
+            tables[name].schema, tables[name].to_batches()
+        )
+
+        sent = []
+
+        def send_side_effect(data, target_table_name, replace, **kwargs):
+            sent.append((data.read_all(), target_table_name, replace))
+            return len(sent[-1][0])
 
-        mock_send_to_postgresql.side_effect = [3, 2]
+        mock_send_to_postgresql.side_effect = send_side_effect
 
         # PostgreSQL connection parameters
         store_folder = "/path/to/store"
@@ -82,26 +92,15 @@ class TestStoreFunctions:
         # Check that list_tables was called
         mock_store_instance.list_tables.assert_called_once()
 
-        # Check that get_table was called for each table
-        assert mock_store_instance.get_table.call_count == 2
-        mock_store_instance.get_table.assert_has_calls([call("table1"), call("table2")])
+        # Check that each table was streamed from the store
+        assert mock_store_instance.iter_batches.call_count == 2
+        mock_store_instance.iter_batches.assert_has_calls([call("table1"), call("table2")])
 
         # Check that send_pyarrow_table_to_postgresql was called for each table with correct parameters
-        assert mock_send_to_postgresql.call_count == 2
-        mock_send_to_postgresql.assert_has_calls(
-            [
-                call(
-                    table1_data,
-                    f"test_table1",
-                    replace,
-                ),
-                call(
-                    table2_data,
-                    f"test_table2",
-                    replace,
-                ),
-            ]
-        )
+        assert sent == [
+            (table1_data, "test_table1", replace),
+            (table2_data, "test_table2", replace),
+        ]
 
     @patch("cosmotech.coal.postgresql.store.Store")
     @patch("cosmotech.coal.postgresql.utils.PostgresUtils.send_pyarrow_table_to_postgresql")
@@ -173,7 +172,9 @@ class TestStoreFunctions:
 
         # Create empty PyArrow table
         empty_table = pa.Table.from_arrays([], names=[])
-        mock_store_instance.get_table.return_value = empty_table
+        mock_store_instance.iter_batches.return_value = pa.RecordBatchReader.from_batches(
+            empty_table.schema, empty_table.to_batches()
+        )
 
         # PostgreSQL connection parameters
         store_folder = "/path/to/store"
@@ -222,8 +223,8 @@ class TestStoreFunctions:
         # Check that list_tables was called
         mock_store_instance.list_tables.assert_called_once()
 
-        # Check that get_table was called
-        mock_store_instance.get_table.assert_called_once_with("empty_table")
+        # Check that the table was read
+        mock_store_instance.iter_batches.assert_called_once_with("empty_table")
 
         # Check that send_pyarrow_table_to_postgresql was not called (empty table)
         mock_send_to_postgresql.assert_not_called()
@@ -242,7 +243,9 @@ class TestStoreFunctions:
 
         # Create mock PyArrow table
         table_data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
-        mock_store_instance.get_table.return_value = table_data
+        mock_store_instance.iter_batches.return_value = pa.RecordBatchReader.from_batches(
+            table_data.schema, table_data.to_batches()
+        )
 
         # Mock send_pyarrow_table_to_postgresql to return row count
         mock_send_to_postgresql.return_value = 3
@@ -264,7 +267,240 @@ class TestStoreFunctions:
         # Assert
         # Check that send_pyarrow_table_to_postgresql was called with default parameters
         mock_send_to_postgresql.assert_called_once_with(
-            table_data,
+            ANY,
             "cosmotech_table1",  # Default table_prefix is "Cosmotech_" but is sanitized to "cosmotech_" for psql
             True,  # Default replace is True
+            staged=False,
+            unlogged=False,
+            prepare_table=None,
+            upsert_keys=None,
+            skip_unchanged=False,
+        )
+        assert mock_send_to_postgresql.call_args.args[0].read_all() == table_data
+
+    @patch("cosmotech.coal.postgresql.store.Store")
+    @patch("cosmotech.coal.postgresql.utils.PostgresUtils.is_metadata_exists")
+    @patch("cosmotech.coal.postgresql.utils.PostgresUtils.send_pyarrow_table_to_postgresql")
+    def test_dump_store_to_postgresql_with_fk_id(self, mock_send_to_postgresql, mock_metadata_exists, mock_store_class):
+        """Test the dump_store_to_postgresql function adds the fk column to every streamed batch."""
+        # Arrange
+        mock_store_instance = MagicMock()
+        mock_store_class.return_value = mock_store_instance
+        mock_store_instance.list_tables.return_value = ["table1"]
+        table_data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        mock_store_instance.iter_batches.return_value = pa.RecordBatchReader.from_batches(
+            table_data.schema, table_data.to_batches(max_chunksize=2)
+        )
+        mock_metadata_exists.return_value = False
+
+        sent = []
+
+        def send_side_effect(data, target_table_name, replace, **kwargs):
+            sent.append(data.read_all())
+            return len(sent[-1])
+
+        mock_send_to_postgresql.side_effect = send_side_effect
+
+        # Act
+        dump_store_to_postgresql(
+            "/path/to/store", "localhost", 5432, "testdb", "public", "user", "password", fk_id="run-1"
+        )
+
+        # Assert
+        assert sent[0].column_names == ["id", "csm_run_id"]
+        assert sent[0]["csm_run_id"].to_pylist() == ["run-1"] * 3
+
+    @patch("cosmotech.coal.postgresql.store.Store")
+    @patch("cosmotech.coal.postgresql.utils.PostgresUtils.add_fk_constraints")
+    @patch("cosmotech.coal.postgresql.utils.PostgresUtils.is_metadata_exists")
+    @patch("cosmotech.coal.postgresql.utils.PostgresUtils.send_pyarrow_table_to_postgresql")
+    def test_dump_store_to_postgresql_defer_constraints(
+        self, mock_send_to_postgresql, mock_metadata_exists, mock_add_fk_constraints, mock_store_class
+    ):
+        """Test deferred constraints are added once for every sent table after the load."""
+        # Arrange
+        mock_store_instance = MagicMock()
+        mock_store_class.return_value = mock_store_instance
+        mock_store_instance.list_tables.return_value = ["table2", "table1", "empty"]
+        table_data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        empty_data = pa.Table.from_arrays([pa.array([], pa.int64())], names=["id"])
+        mock_store_instance.iter_batches.side_effect = lambda name: pa.RecordBatchReader.from_batches(
+            table_data.schema, (empty_data if name == "empty" else table_data).to_batches()
+        )
+        mock_metadata_exists.return_value = True
+        mock_send_to_postgresql.side_effect = lambda data, target_table_name, replace, **kwargs: len(data.read_all())
+
+        # Act
+        dump_store_to_postgresql(
+            "/path/to/store",
+            "localhost",
+            5432,
+            "testdb",
+            "public",
+            "user",
+            "password",
+            table_prefix="Cosmotech_",
+            fk_id="run-1",
+            defer_constraints=True,
+            not_valid=True,
+        )
+
+        # Assert
+        assert all(c.kwargs["prepare_table"] is None for c in mock_send_to_postgresql.call_args_list)
+        mock_add_fk_constraints.assert_called_once_with(
+            ["cosmotech_table1", "cosmotech_table2"],
+            "csm_run_id",
+            "cosmotech_runnermetadata",
+            "last_csm_run_id",
+            not_valid=True,
+        )
+
+    @patch("cosmotech.coal.postgresql.store.Store")
+    @patch("cosmotech.coal.postgresql.utils.PostgresUtils.is_metadata_exists")
+    @patch("cosmotech.coal.postgresql.utils.PostgresUtils.send_pyarrow_table_to_partition")
+    def test_dump_store_to_postgresql_partition_by_run(
+        self, mock_send_to_partition, mock_metadata_exists, mock_store_class
+    ):
+        """Test each table is sent as the partition of the run without foreign key."""
+        # Arrange
+        mock_store_instance = MagicMock()
+        mock_store_class.return_value = mock_store_instance
+        mock_store_instance.list_tables.return_value = ["table1"]
+        table_data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        mock_store_instance.iter_batches.return_value = pa.RecordBatchReader.from_batches(
+            table_data.schema, table_data.to_batches()
         )
+        mock_send_to_partition.return_value = 3
+
+        # Act
+        dump_store_to_postgresql(
+            "/path/to/store",
+            "localhost",
+            5432,
+            "testdb",
+            "public",
+            "user",
+            "password",
+            fk_id="run-1",
+            staged=True,
+            partition_by_run=True,
+        )
+
+        # Assert
+        mock_metadata_exists.assert_not_called()
+        mock_send_to_partition.assert_called_once_with(
+            ANY, "cosmotech_table1", "csm_run_id", "run-1", staged=True, unlogged=False
+        )
+
+    @patch("cosmotech.coal.postgresql.store.Store")
+    @patch("cosmotech.coal.postgresql.utils.PostgresUtils.send_pyarrow_table_to_postgresql")
+    def test_dump_store_to_postgresql_with_max_workers(self, mock_send_to_postgresql, mock_store_class):
+        """Test the dump_store_to_postgresql function sends tables from several worker threads."""
+        # Arrange
+        mock_store_instance = MagicMock()
+        mock_store_class.return_value = mock_store_instance
+        table_names = [f"table{i}" for i in range(8)]
+        mock_store_instance.list_tables.return_value = table_names
+        table_data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        mock_store_instance.iter_batches.side_effect = lambda name: pa.RecordBatchReader.from_batches(
+            table_data.schema, table_data.to_batches()
+        )
+        barrier = threading.Barrier(2, timeout=5)
+        threads = set()
+
+        def send_side_effect(data, target_table_name, replace, **kwargs):
+            # Only returns once two tables are sent at the same time
+            barrier.wait()
+            threads.add(threading.get_ident())
+            return data.read_all().num_rows
+
+        mock_send_to_postgresql.side_effect = send_side_effect
+
+        # Act
+        with patch("cosmotech.coal.postgresql.store.LOGGER") as mock_logger:
+            dump_store_to_postgresql(
+                "/path/to/store", "localhost", 5432, "testdb", "public", "user", "password", max_workers=2
+            )
+
+        # Assert
+        assert mock_send_to_postgresql.call_count == 8
+        assert len(threads) == 2
+        summary = mock_logger.info.call_args_list[-1].args[0]
+        assert "24" in summary
+
+    @patch("cosmotech.coal.postgresql.store.Store")
+    @patch("cosmotech.coal.postgresql.utils.PostgresUtils.list_tables")
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_load_from_postgresql(self, mock_connect, mock_list_tables, mock_store_class, tmp_path):
+        """Test the load_from_postgresql function streams the prefixed tables into the store."""
+        # Arrange
+        mock_store_instance = mock_store_class.return_value
+        mock_store_instance.store_location = tmp_path
+        mock_list_tables.return_value = ["cosmotech_runnermetadata", "cosmotech_table1", "cosmotech_table2", "other"]
+        mock_cursor = mock_connect.return_value.cursor.return_value.__enter__.return_value
+        table_data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        mock_cursor.fetch_record_batch.side_effect = lambda: pa.RecordBatchReader.from_batches(
+            table_data.schema, table_data.to_batches(max_chunksize=2)
+        )
+        loaded = {}
+        threads = set()
+
+        def add_table_side_effect(table_name, data, replace):
+            loaded[table_name] = data.read_all()
+            threads.add(threading.get_ident())
+
+        mock_store_instance.add_table.side_effect = add_table_side_effect
+
+        # Act
+        load_from_postgresql(
+            "/path/to/store",
+            "localhost",
+            5432,
+            "testdb",
+            "public",
+            "user",
+            "password",
+            selected_tables=["Table1", "table2"],
+            max_workers=2,
+        )
+
+        # Assert
+        assert sorted(c.args[0] for c in mock_cursor.execute.call_args_list) == [
+            'SELECT * FROM public."cosmotech_table1"',
+            'SELECT * FROM public."cosmotech_table2"',
+        ]
+        assert loaded == {"table1": table_data, "table2": table_data}
+        # Tables fetched by the workers are written by the calling thread and their spool files removed
+        assert threads == {threading.get_ident()}
+        assert list(tmp_path.iterdir()) == []
+
+    @patch("cosmotech.coal.postgresql.store.Store")
+    @patch("cosmotech.coal.postgresql.utils.PostgresUtils.list_tables")
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_load_from_postgresql_with_query(self, mock_connect, mock_list_tables, mock_store_class):
+        """Test the load_from_postgresql function loads the result of a custom query in a single table."""
+        # Arrange
+        mock_cursor = mock_connect.return_value.cursor.return_value.__enter__.return_value
+        table_data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        mock_cursor.fetch_record_batch.return_value = pa.RecordBatchReader.from_batches(
+            table_data.schema, table_data.to_batches()
+        )
+
+        # Act
+        load_from_postgresql(
+            "/path/to/store",
+            "localhost",
+            5432,
+            "testdb",
+            "public",
+            "user",
+            "password",
+            sql_query="SELECT 1 AS id",
+            query_table_name="result",
+            replace=False,
+        )
+
+        # Assert
+        mock_list_tables.assert_not_called()
+        mock_cursor.execute.assert_called_once_with("SELECT 1 AS id")
+        mock_store_class.return_value.add_table.assert_called_once_with("result", ANY, False)
@@ -4,7 +4,10 @@
 # Any use, reproduction, translation, broadcasting, transmission, distribution,
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
+import datetime
+import threading
 from unittest.mock import MagicMock, patch
+from uuid import UUID
 
 import adbc_driver_manager
 import pyarrow as pa
@@ -12,10 +15,15 @@ import pytest
 
 from cosmotech.coal.postgresql.utils import (
     PostgresUtils,
+    adapt_batch_to_schema,
+    adapt_reader_to_schema,
     adapt_table_to_schema,
 )
 from cosmotech.coal.utils.configuration import Configuration
 
+# Staging tables are named after the first 12 hexadecimal digits of this UUID
+STAGING_UUID = "0123456789abcdef0123456789abcdef"
+
 
 @pytest.fixture
 def base_configuration():
@@ -322,6 +330,41 @@ class TestPostgresqlFunctions:
             target_table_name, adapted_data, "create_append", db_schema_name=_psql.db_schema
         )
 
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_send_pyarrow_table_to_postgresql_reader_append(self, mock_connect, base_configuration):
+        """Test the send_pyarrow_table_to_postgresql function adapts a reader batch by batch."""
+        # Arrange
+        schema = pa.schema([pa.field("id", pa.int64()), pa.field("name", pa.string())])
+        data = pa.Table.from_arrays([pa.array([1, 2, 3]), pa.array(["a", "b", "c"])], schema=schema)
+        reader = pa.RecordBatchReader.from_batches(schema, data.to_batches(max_chunksize=2))
+
+        _psql = PostgresUtils(base_configuration)
+
+        # Mock connection and cursor
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_connect.return_value.__enter__.return_value = mock_conn
+        mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+        existing_schema = pa.schema(
+            [pa.field("id", pa.int64()), pa.field("name", pa.string()), pa.field("extra", pa.float64())]
+        )
+        mock_conn.adbc_get_table_schema.return_value = existing_schema
+
+        ingested = []
+        mock_cursor.adbc_ingest.side_effect = lambda name, stream, mode, db_schema_name: ingested.append(
+            stream.read_all()
+        ) or len(ingested[-1])
+
+        # Act
+        result = _psql.send_pyarrow_table_to_postgresql(reader, "test_table", False)
+
+        # Assert
+        assert result == 3
+        assert ingested[0].schema == existing_schema
+        assert ingested[0]["id"].to_pylist() == [1, 2, 3]
+        assert ingested[0]["extra"].null_count == 3
+
     @patch("adbc_driver_postgresql.dbapi.connect")
     def test_send_pyarrow_table_to_postgresql_existing_table_replace(self, mock_connect, base_configuration):
         """Test the send_pyarrow_table_to_postgresql function with an existing table in replace mode."""
@@ -362,3 +405,605 @@ class TestPostgresqlFunctions:
         mock_cursor.adbc_ingest.assert_called_once_with(
             target_table_name, data, "replace", db_schema_name=_psql.db_schema
         )
+
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_connection_shared_in_context(self, mock_connect, base_configuration):
+        """Test that calls made inside the context manager share a single connection."""
+        # Arrange
+        mock_conn = mock_connect.return_value
+        mock_conn.adbc_get_table_schema.return_value = None
+        mock_conn.cursor.return_value.__enter__.return_value.adbc_ingest.return_value = 3
+        data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+
+        # Act
+        with PostgresUtils(base_configuration) as _psql:
+            _psql.send_pyarrow_table_to_postgresql(data, "table1", False)
+            _psql.send_pyarrow_table_to_postgresql(data, "table2", False)
+            _psql.is_metadata_exists()
+            _psql.add_fk_constraint("table1", "csm_run_id", "metadata", "last_csm_run_id")
+
+        # Assert
+        mock_connect.assert_called_once_with(_psql.full_uri, autocommit=True)
+        mock_conn.close.assert_called_once()
+        assert _psql._connections == []
+
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_connection_per_call_outside_context(self, mock_connect, base_configuration):
+        """Test that calls made outside the context manager open their own connection."""
+        # Arrange
+        _psql = PostgresUtils(base_configuration)
+
+        # Act
+        _psql.is_metadata_exists()
+        _psql.is_metadata_exists()
+
+        # Assert
+        assert mock_connect.call_count == 2
+        assert _psql._connections == []
+
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_add_fk_constraint(self, mock_connect, base_configuration):
+        """Test the add_fk_constraint function replaces the constraint in a single statement."""
+        # Arrange
+        _psql = PostgresUtils(base_configuration)
+        mock_cursor = mock_connect.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+
+        # Act
+        _psql.add_fk_constraint("table1", "csm_run_id", "metadata", "last_csm_run_id")
+
+        # Assert
+        mock_cursor.execute.assert_called_once()
+        statement = mock_cursor.execute.call_args.args[0]
+        assert "DROP CONSTRAINT IF EXISTS metadata," in statement
+        assert "REFERENCES dbschema.metadata(last_csm_run_id)" in statement
+
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_add_fk_constraints(self, mock_connect, base_configuration):
+        """Test the add_fk_constraints function constrains many tables in one transaction."""
+        # Arrange
+        _psql = PostgresUtils(base_configuration)
+        mock_cursor = mock_connect.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+        mock_cursor.fetchall.return_value = [("table1",)]
+
+        # Act
+        _psql.add_fk_constraints(["table1", "table2"], "csm_run_id", "metadata", "last_csm_run_id")
+
+        # Assert
+        statements = [c.args[0] for c in mock_cursor.execute.call_args_list]
+        assert "pg_constraint" in statements[0]
+        assert mock_cursor.execute.call_args_list[0].args[1] == ("dbschema",)
+        assert statements[1:] == [
+            "BEGIN",
+            "CREATE INDEX IF NOT EXISTS table1_csm_run_id_idx ON dbschema.table1 (csm_run_id)",
+            "CREATE INDEX IF NOT EXISTS table2_csm_run_id_idx ON dbschema.table2 (csm_run_id)",
+            "ALTER TABLE dbschema.table2 ADD CONSTRAINT metadata FOREIGN KEY (csm_run_id) "
+            "REFERENCES dbschema.metadata(last_csm_run_id) ON DELETE CASCADE",
+            "COMMIT",
+        ]
+
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_add_fk_constraints_not_valid(self, mock_connect, base_configuration):
+        """Test NOT VALID constraints get validated once the transaction is committed."""
+        # Arrange
+        _psql = PostgresUtils(base_configuration)
+        mock_cursor = mock_connect.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+        mock_cursor.fetchall.return_value = []
+
+        # Act
+        _psql.add_fk_constraints(["table1"], "csm_run_id", "metadata", "last_csm_run_id", not_valid=True)
+
+        # Assert
+        statements = [c.args[0] for c in mock_cursor.execute.call_args_list]
+        assert statements[3].endswith("ON DELETE CASCADE NOT VALID")
+        assert statements[4:] == ["COMMIT", "ALTER TABLE dbschema.table1 VALIDATE CONSTRAINT metadata"]
+
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_add_fk_constraints_failure(self, mock_connect, base_configuration):
+        """Test a failing constraint rolls back the whole transaction."""
+        # Arrange
+        _psql = PostgresUtils(base_configuration)
+        mock_cursor = mock_connect.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+        mock_cursor.fetchall.return_value = []
+
+        def execute_side_effect(statement, *args):
+            if statement.startswith("ALTER TABLE"):
+                raise OSError("Violates foreign key constraint")
+
+        mock_cursor.execute.side_effect = execute_side_effect
+
+        # Act & Assert
+        with pytest.raises(OSError):
+            _psql.add_fk_constraints(["table1"], "csm_run_id", "metadata", "last_csm_run_id")
+
+        assert mock_cursor.execute.call_args_list[-1].args[0] == "ROLLBACK"
+
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_connection_per_thread_in_context(self, mock_connect, base_configuration):
+        """Test that each thread gets its own connection inside the context manager."""
+        # Arrange
+        mock_connect.side_effect = lambda *args, **kwargs: MagicMock()
+        connections = []
+
+        def use_connection(_psql):
+            with _psql.connect() as first, _psql.connect() as second:
+                connections.append((first, second))
+
+        # Act
+        with PostgresUtils(base_configuration) as _psql:
+            threads = [threading.Thread(target=use_connection, args=(_psql,)) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            opened = list(_psql._connections)
+
+        # Assert
+        assert mock_connect.call_count == 3
+        assert all(first is second for first, second in connections)
+        assert len({id(first) for first, _ in connections}) == 3
+        for connection in opened:
+            connection.close.assert_called_once()
+
+    def test_staging_table_name(self, base_configuration):
+        """Test each load gets its own staging table, named within the identifier length limit."""
+        # Arrange
+        _psql = PostgresUtils(base_configuration)
+        long_name = "é" * 40
+
+        # Act
+        first = _psql._staging_table_name("test_table")
+        second = _psql._staging_table_name("test_table")
+        truncated = _psql._staging_table_name(long_name)
+
+        # Assert
+        assert first.startswith("test_table_staging_")
+        assert first != second
+        assert len(truncated.encode()) <= PostgresUtils.MAX_IDENTIFIER_BYTES
+        assert truncated.startswith("é" * 21 + "_staging_")
+
+    @patch("cosmotech.coal.postgresql.utils.uuid4", return_value=UUID(STAGING_UUID))
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_send_pyarrow_table_to_postgresql_staged_replace(self, mock_connect, mock_uuid4, base_configuration):
+        """Test the staged mode loads an unlogged staging table then swaps it with the target in one transaction."""
+        # Arrange
+        data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        _psql = PostgresUtils(base_configuration)
+        mock_conn = mock_connect.return_value.__enter__.return_value
+        mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
+        mock_conn.adbc_get_table_schema.return_value = data.schema
+        mock_cursor.adbc_ingest.side_effect = [0, 3]
+        prepare_table = MagicMock()
+
+        # Act
+        result = _psql.send_pyarrow_table_to_postgresql(
+            data, "test_table", True, staged=True, unlogged=True, prepare_table=prepare_table
+        )
+
+        # Assert
+        assert result == 3
+        assert [c.args[:3] for c in mock_cursor.adbc_ingest.call_args_list] == [
+            ("test_table_staging_0123456789ab", data.schema.empty_table(), "create"),
+            ("test_table_staging_0123456789ab", data, "append"),
+        ]
+        assert [c.args[0] for c in mock_cursor.execute.call_args_list] == [
+            "ALTER TABLE dbschema.test_table_staging_0123456789ab SET UNLOGGED",
+            "ALTER TABLE dbschema.test_table_staging_0123456789ab SET LOGGED",
+            "BEGIN",
+            "DROP TABLE IF EXISTS dbschema.test_table",
+            "ALTER TABLE dbschema.test_table_staging_0123456789ab RENAME TO test_table",
+            "COMMIT",
+        ]
+        prepare_table.assert_called_once_with("test_table_staging_0123456789ab")
+
+    @patch("cosmotech.coal.postgresql.utils.uuid4", return_value=UUID(STAGING_UUID))
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_send_pyarrow_table_to_postgresql_staged_append(self, mock_connect, mock_uuid4, base_configuration):
+        """Test the staged mode appends the staging table rows to the target in one transaction."""
+        # Arrange
+        data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        _psql = PostgresUtils(base_configuration)
+        mock_conn = mock_connect.return_value.__enter__.return_value
+        mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
+        mock_conn.adbc_get_table_schema.return_value = data.schema
+        mock_cursor.adbc_ingest.side_effect = [0, 3]
+
+        # Act
+        result = _psql.send_pyarrow_table_to_postgresql(data, "test_table", False, staged=True)
+
+        # Assert
+        assert result == 3
+        assert [c.args[0] for c in mock_cursor.execute.call_args_list] == [
+            "BEGIN",
+            "INSERT INTO dbschema.test_table SELECT * FROM dbschema.test_table_staging_0123456789ab",
+            "DROP TABLE dbschema.test_table_staging_0123456789ab",
+            "COMMIT",
+        ]
+
+    @patch("cosmotech.coal.postgresql.utils.uuid4", return_value=UUID(STAGING_UUID))
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_send_pyarrow_table_to_postgresql_staged_prepare_connection(
+        self, mock_connect, mock_uuid4, base_configuration
+    ):
+        """Test the prepare_table callback of a staged append runs on the connection of the publishing transaction."""
+        # Arrange
+        data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        _psql = PostgresUtils(base_configuration)
+        mock_conn = mock_connect.return_value.__enter__.return_value
+        mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
+        mock_conn.adbc_get_table_schema.return_value = data.schema
+        mock_cursor.adbc_ingest.side_effect = [0, 3]
+
+        # Act
+        _psql.send_pyarrow_table_to_postgresql(
+            data,
+            "test_table",
+            False,
+            staged=True,
+            prepare_table=lambda name: _psql.add_fk_constraint(name, "csm_run_id", "metadata", "last_csm_run_id"),
+        )
+
+        # Assert
+        # One connection for the schema lookup, one for the load and the constraint
+        assert mock_connect.call_count == 2
+        statements = [c.args[0].strip() for c in mock_cursor.execute.call_args_list]
+        assert statements[-2].startswith("ALTER TABLE dbschema.test_table\n")
+        assert statements[-1] == "COMMIT"
+        assert _psql._local.active_connection is None
+
+    @patch("cosmotech.coal.postgresql.utils.uuid4", return_value=UUID(STAGING_UUID))
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_send_pyarrow_table_to_postgresql_staged_failure(self, mock_connect, mock_uuid4, base_configuration):
+        """Test a failed staged load drops the staging table and leaves the target untouched."""
+        # Arrange
+        data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        _psql = PostgresUtils(base_configuration)
+        mock_conn = mock_connect.return_value.__enter__.return_value
+        mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
+        mock_conn.adbc_get_table_schema.return_value = data.schema
+        mock_cursor.adbc_ingest.side_effect = [0, OSError("Connection lost")]
+
+        # Act & Assert
+        with pytest.raises(OSError):
+            _psql.send_pyarrow_table_to_postgresql(data, "test_table", True, staged=True)
+
+        assert [c.args[0] for c in mock_cursor.execute.call_args_list] == [
+            "DROP TABLE IF EXISTS dbschema.test_table_staging_0123456789ab",
+        ]
+
+    @patch("cosmotech.coal.postgresql.utils.uuid4", return_value=UUID(STAGING_UUID))
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_send_pyarrow_table_to_postgresql_upsert(self, mock_connect, mock_uuid4, base_configuration):
+        """Test the upsert mode merges the staged rows in the target on the key columns."""
+        # Arrange
+        data = pa.Table.from_arrays([pa.array([1, 2]), pa.array(["a", "b"])], names=["id", "Name"])
+        _psql = PostgresUtils(base_configuration)
+        mock_conn = mock_connect.return_value.__enter__.return_value
+        mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
+        mock_conn.adbc_get_table_schema.return_value = data.schema
+        mock_cursor.adbc_ingest.side_effect = [0, 2]
+
+        # Act
+        result = _psql.send_pyarrow_table_to_postgresql(
+            data, "test_table", True, upsert_keys=["id"], skip_unchanged=True
+        )
+
+        # Assert
+        assert result == 2
+        statements = [c.args[0] for c in mock_cursor.execute.call_args_list]
+        assert statements == [
+            "BEGIN",
+            'CREATE UNIQUE INDEX IF NOT EXISTS "test_table_id_key" ON dbschema.test_table ("id")',
+            'INSERT INTO dbschema.test_table AS target ("id", "Name") '
+            'SELECT "id", "Name" FROM dbschema.test_table_staging_0123456789ab '
+            'ON CONFLICT ("id") DO UPDATE SET "Name" = EXCLUDED."Name" '
+            'WHERE ROW(target."Name") IS DISTINCT FROM ROW(EXCLUDED."Name")',
+            "DROP TABLE dbschema.test_table_staging_0123456789ab",
+            "COMMIT",
+        ]
+
+    @patch("cosmotech.coal.postgresql.utils.uuid4", return_value=UUID(STAGING_UUID))
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_send_pyarrow_table_to_postgresql_upsert_prepare_connection(
+        self, mock_connect, mock_uuid4, base_configuration
+    ):
+        """Test the prepare_table callback of an upsert runs on the connection of the merging transaction."""
+        # Arrange
+        data = pa.Table.from_arrays([pa.array([1, 2]), pa.array(["a", "b"])], names=["id", "Name"])
+        _psql = PostgresUtils(base_configuration)
+        mock_conn = mock_connect.return_value.__enter__.return_value
+        mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
+        mock_conn.adbc_get_table_schema.return_value = data.schema
+        mock_cursor.adbc_ingest.side_effect = [0, 2]
+
+        # Act
+        _psql.send_pyarrow_table_to_postgresql(
+            data,
+            "test_table",
+            False,
+            upsert_keys=["id"],
+            prepare_table=lambda name: _psql.add_fk_constraint(name, "csm_run_id", "metadata", "last_csm_run_id"),
+        )
+
+        # Assert
+        # One connection for the schema lookup, one for the merge and the constraint
+        assert mock_connect.call_count == 2
+        statements = [c.args[0].strip() for c in mock_cursor.execute.call_args_list]
+        assert statements[-3] == "DROP TABLE dbschema.test_table_staging_0123456789ab"
+        assert statements[-2].startswith("ALTER TABLE dbschema.test_table\n")
+        assert statements[-1] == "COMMIT"
+
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_send_pyarrow_table_to_postgresql_upsert_new_table(self, mock_connect, base_configuration):
+        """Test the upsert mode creates the target table when missing and ignores rows only made of keys."""
+        # Arrange
+        data = pa.Table.from_arrays([pa.array([1, 2])], names=["id"])
+        _psql = PostgresUtils(base_configuration)
+        mock_conn = mock_connect.return_value.__enter__.return_value
+        mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
+        mock_conn.adbc_get_table_schema.side_effect = adbc_driver_manager.ProgrammingError(
+            status_code=adbc_driver_manager.AdbcStatusCode.UNKNOWN, message="Table not found"
+        )
+        mock_cursor.adbc_ingest.side_effect = [0, 2, 0]
+
+        # Act
+        _psql.send_pyarrow_table_to_postgresql(data, "test_table", False, upsert_keys=["id"])
+
+        # Assert
+        assert mock_cursor.adbc_ingest.call_args_list[-1].args[:3] == (
+            "test_table",
+            data.schema.empty_table(),
+            "create",
+        )
+        assert mock_cursor.execute.call_args_list[-3].args[0].endswith('ON CONFLICT ("id") DO NOTHING')
+
+    def test_send_pyarrow_table_to_postgresql_upsert_missing_keys(self, base_configuration):
+        """Test the upsert mode rejects keys that are not columns of the data."""
+        # Arrange
+        data = pa.Table.from_arrays([pa.array([1, 2])], names=["id"])
+        _psql = PostgresUtils(base_configuration)
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            _psql.send_pyarrow_table_to_postgresql(data, "test_table", False, upsert_keys=["key"])
+
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_get_postgresql_table_schema_cached(self, mock_connect, base_configuration):
+        """Test table schemas are fetched once until invalidated."""
+        # Arrange
+        _psql = PostgresUtils(base_configuration)
+        mock_conn = mock_connect.return_value.__enter__.return_value
+        mock_conn.adbc_get_table_schema.return_value = pa.schema([pa.field("id", pa.int64())])
+
+        # Act
+        _psql.get_postgresql_table_schema("test_table")
+        _psql.get_postgresql_table_schema("test_table")
+        _psql.invalidate_schema_cache("test_table")
+        _psql.get_postgresql_table_schema("test_table")
+        _psql.get_postgresql_table_schema("test_table", refresh=True)
+
+        # Assert
+        assert mock_conn.adbc_get_table_schema.call_count == 3
+
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_send_pyarrow_table_to_postgresql_invalidates_replaced_schema(self, mock_connect, base_configuration):
+        """Test the cached schema of a table is kept on append and forgotten on replace."""
+        # Arrange
+        data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        _psql = PostgresUtils(base_configuration)
+        mock_conn = mock_connect.return_value.__enter__.return_value
+        mock_conn.adbc_get_table_schema.return_value = data.schema
+        mock_conn.cursor.return_value.__enter__.return_value.adbc_ingest.return_value = 3
+
+        # Act
+        _psql.send_pyarrow_table_to_postgresql(data, "test_table", False)
+        _psql.send_pyarrow_table_to_postgresql(data, "test_table", False)
+        _psql.send_pyarrow_table_to_postgresql(data, "test_table", True)
+        _psql.send_pyarrow_table_to_postgresql(data, "test_table", False)
+
+        # Assert
+        assert mock_conn.adbc_get_table_schema.call_count == 2
+
+    def test_adapt_table_to_schema_nulls_failed_rows(self):
+        """Test values that cannot be cast are replaced with nulls, leaving the rest of the column."""
+        # Arrange
+        data = pa.Table.from_arrays(
+            [pa.array([1.0, 1.5, None, 3.0]), pa.array(["1", "x", "2", None])], names=["count", "value"]
+        )
+        target_schema = pa.schema([pa.field("count", pa.int64()), pa.field("value", pa.float64())])
+
+        # Act
+        result = adapt_table_to_schema(data, target_schema)
+        whole_column = adapt_table_to_schema(data, target_schema, null_failed_rows=False)
+
+        # Assert
+        assert result.to_pydict() == {"count": [1, None, None, 3], "value": [1.0, None, 2.0, None]}
+        assert whole_column["count"].null_count == 4
+        assert whole_column["value"].null_count == 4
+
+    @pytest.mark.parametrize(
+        "values, target_type, expected",
+        [
+            (
+                ["1", "x", "0x10", "-4", "2147483647", "2147483648", None],
+                pa.int32(),
+                [1, None, 16, -4, 2147483647, None, None],
+            ),
+            (["255", "-1", "256", "18446744073709551615"], pa.uint8(), [255, None, None, None]),
+            (["18446744073709551615", "-1"], pa.uint64(), [18446744073709551615, None]),
+            (["1.5", "nan", "abc", "-.5e2"], pa.float64(), [1.5, float("nan"), None, -50.0]),
+            (["True", "no", "0"], pa.bool_(), [True, None, False]),
+            (["2024-01-01", "bad", "2024-13-01"], pa.date32(), [datetime.date(2024, 1, 1), None, None]),
+        ],
+    )
+    def test_adapt_table_to_schema_nulls_failed_text(self, values, target_type, expected):
+        """Test text values that cannot be parsed are replaced with nulls, across the chunks of the column."""
+        # Arrange
+        data = pa.Table.from_arrays([pa.chunked_array([values[:2], values[2:]], type=pa.string())], names=["value"])
+        target_schema = pa.schema([pa.field("value", target_type)])
+
+        # Act
+        result = adapt_table_to_schema(data, target_schema)
+
+        # Assert
+        assert result.schema == target_schema
+        assert str(result["value"].to_pylist()) == str(expected)
+
+    def test_adapt_batch_to_schema(self):
+        """Test the adapt_batch_to_schema function casts, adds and drops columns of a batch."""
+        # Arrange
+        batch = pa.record_batch([pa.array([1, 300]), pa.array(["a", "b"])], names=["id", "extra"])
+        target_schema = pa.schema([pa.field("id", pa.int8()), pa.field("name", pa.string())])
+
+        # Act
+        result = adapt_batch_to_schema(batch, target_schema)
+
+        # Assert
+        assert isinstance(result, pa.RecordBatch)
+        assert result.schema == target_schema
+        assert result.to_pydict() == {"id": [1, None], "name": [None, None]}
+
+    def test_adapt_reader_to_schema(self):
+        """Test the adapt_reader_to_schema function adapts batches as they get read."""
+        # Arrange
+        data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        reader = pa.RecordBatchReader.from_batches(data.schema, data.to_batches(max_chunksize=2))
+        target_schema = pa.schema([pa.field("id", pa.float64())])
+
+        # Act
+        result = adapt_reader_to_schema(reader, target_schema)
+
+        # Assert
+        assert result.schema == target_schema
+        assert [batch.num_rows for batch in result] == [2, 1]
+
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_send_pyarrow_table_to_partition(self, mock_connect, base_configuration):
+        """Test the partition of a run is loaded in its own table then attached to a new partitioned table."""
+        # Arrange
+        data = pa.Table.from_arrays([pa.array([1, 2, 3]), pa.array(["run-1"] * 3)], names=["id", "csm_run_id"])
+        _psql = PostgresUtils(base_configuration)
+        mock_conn = mock_connect.return_value.__enter__.return_value
+        mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
+        mock_conn.adbc_get_table_schema.return_value = None
+        mock_cursor.adbc_ingest.return_value = 3
+
+        # Act
+        result = _psql.send_pyarrow_table_to_partition(data, "test_table", "csm_run_id", "Run-1")
+
+        # Assert
+        assert result == 3
+        mock_cursor.adbc_ingest.assert_called_once_with("test_table_run_1", data, "replace", db_schema_name="dbschema")
+        assert [c.args[0] for c in mock_cursor.execute.call_args_list] == [
+            "BEGIN",
+            "CREATE TABLE IF NOT EXISTS dbschema.test_table (LIKE dbschema.test_table_run_1) "
+            'PARTITION BY LIST ("csm_run_id")',
+            "ALTER TABLE dbschema.test_table ATTACH PARTITION dbschema.test_table_run_1 FOR VALUES IN ('Run-1')",
+            "COMMIT",
+        ]
+
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_send_pyarrow_table_to_partition_existing_table(self, mock_connect, base_configuration):
+        """Test the partition data is adapted to the partitioned table and dropped if it cannot be attached."""
+        # Arrange
+        data = pa.Table.from_arrays([pa.array([1, 2, 3]), pa.array(["run-1"] * 3)], names=["id", "csm_run_id"])
+        existing_schema = pa.schema([("id", pa.float64()), ("csm_run_id", pa.string())])
+        _psql = PostgresUtils(base_configuration)
+        mock_conn = mock_connect.return_value.__enter__.return_value
+        mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
+        mock_conn.adbc_get_table_schema.return_value = existing_schema
+        mock_cursor.fetchall.return_value = [(True,)]
+
+        def execute_side_effect(statement, *args):
+            if "ATTACH PARTITION" in statement:
+                raise OSError("Partition constraint violated")
+
+        mock_cursor.execute.side_effect = execute_side_effect
+
+        # Act & Assert
+        with pytest.raises(OSError):
+            _psql.send_pyarrow_table_to_partition(data, "test_table", "csm_run_id", "run-1")
+
+        assert mock_cursor.adbc_ingest.call_args.args[1].schema == existing_schema
+        assert [c.args[0] for c in mock_cursor.execute.call_args_list][-2:] == [
+            "ROLLBACK",
+            "DROP TABLE IF EXISTS dbschema.test_table_run_1",
+        ]
+
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_send_pyarrow_table_to_partition_not_partitioned(self, mock_connect, base_configuration):
+        """Test sending a partition to an existing table that is not partitioned fails before loading anything."""
+        # Arrange
+        data = pa.Table.from_arrays([pa.array([1, 2, 3]), pa.array(["run-1"] * 3)], names=["id", "csm_run_id"])
+        _psql = PostgresUtils(base_configuration)
+        mock_conn = mock_connect.return_value.__enter__.return_value
+        mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
+        mock_conn.adbc_get_table_schema.return_value = data.schema
+        mock_cursor.fetchall.return_value = [(False,)]
+
+        # Act & Assert
+        with pytest.raises(ValueError, match="not partitioned"):
+            _psql.send_pyarrow_table_to_partition(data, "test_table", "csm_run_id", "run-1")
+
+        assert mock_cursor.execute.call_args.args[1] == ("dbschema", "test_table")
+        mock_cursor.adbc_ingest.assert_not_called()
+
+    def test_partition_table_name(self):
+        """Test partition names are made of the table name and the value, hashed when too long."""
+        # Arrange
+        long_value = "run-" + "0" * 60
+
+        # Act
+        short_name = PostgresUtils.partition_table_name("test_table", "Run-1")
+        long_name = PostgresUtils.partition_table_name("test_table", long_value)
+        other_long_name = PostgresUtils.partition_table_name("test_table", long_value + "1")
+
+        # Assert
+        assert short_name == "test_table_run_1"
+        assert long_name.startswith("test_table_")
+        assert len(long_name.encode()) <= PostgresUtils.MAX_IDENTIFIER_BYTES
+        assert long_name != other_long_name
+
+    def test_partition_table_name_too_long(self):
+        """Test a table name leaving no room for the partition value is rejected."""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            PostgresUtils.partition_table_name("t" * 60, "run-1")
+
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_drop_partitions(self, mock_connect, base_configuration):
+        """Test the partitions of a value are detached and dropped in a single transaction."""
+        # Arrange
+        _psql = PostgresUtils(base_configuration)
+        mock_cursor = mock_connect.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+        mock_cursor.fetchall.return_value = [("table1", "table1_run_1"), ("table2", "table2_run_1")]
+
+        # Act
+        result = _psql.drop_partitions("run-1")
+
+        # Assert
+        assert result == ["table1_run_1", "table2_run_1"]
+        assert mock_cursor.execute.call_args_list[0].args[1] == ("dbschema", "FOR VALUES IN ('run-1')")
+        assert [c.args[0] for c in mock_cursor.execute.call_args_list[1:]] == [
+            "BEGIN",
+            "ALTER TABLE dbschema.table1 DETACH PARTITION dbschema.table1_run_1",
+            "DROP TABLE dbschema.table1_run_1",
+            "ALTER TABLE dbschema.table2 DETACH PARTITION dbschema.table2_run_1",
+            "DROP TABLE dbschema.table2_run_1",
+            "COMMIT",
+        ]
+
+    @patch("adbc_driver_postgresql.dbapi.connect")
+    def test_list_tables(self, mock_connect, base_configuration):
+        """Test the list_tables function lists the tables of the schema."""
+        # Arrange
+        _psql = PostgresUtils(base_configuration)
+        mock_cursor = mock_connect.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+        mock_cursor.fetchall.return_value = [("table1",), ("table2",)]
+
+        # Act
+        result = _psql.list_tables()
+
+        # Assert
+        assert result == ["table1", "table2"]
+        assert "NOT c.relispartition" in mock_cursor.execute.call_args.args[0]
+        assert mock_cursor.execute.call_args.args[1] == ("dbschema",)
@@ -5,196 +5,315 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
-from unittest.mock import MagicMock, mock_open, patch
+import threading
+from unittest.mock import MagicMock, patch
 
-import pytest
-import singlestoredb as s2
+import pyarrow as pa
+from singlestoredb.connection import Description
+from singlestoredb.mysql.constants import FIELD_TYPE
 
 from cosmotech.coal.singlestore.store import _get_data, load_from_singlestore
+from cosmotech.coal.store.store import Store
+from cosmotech.coal.utils.configuration import Configuration
+
+
+def _chunked_cursor(tables: dict[str, pa.Table]) -> MagicMock:
+    """Mock a cursor returning the content of the queried table in chunks of fetchmany rows"""
+    cursor = MagicMock()
+    state = {}
+
+    def execute(query, parameters=None):
+        state["table"] = tables.get(query.split("FROM ")[-1].split()[0])
+        state["offset"] = 0
+
+    def fetchmany(size):
+        table, offset = state["table"], state["offset"]
+        state["offset"] += size
+        # The driver returns an empty tuple once all rows are fetched
+        return table.slice(offset, size) if offset < table.num_rows else ()
+
+    cursor.execute.side_effect = execute
+    cursor.fetchmany.side_effect = fetchmany
+    return cursor
 
 
 class TestStoreFunctions:
     """Tests for top-level functions in the store module."""
 
     @patch("cosmotech.coal.singlestore.store.Store")
-    @patch("cosmotech.coal.singlestore.store.store_csv_file")
     @patch("cosmotech.coal.singlestore.store.s2.connect")
-    @patch("pathlib.Path.mkdir")
-    @patch("pathlib.Path.exists")
-    @patch("pathlib.Path.glob")
-    @patch("os.path.exists")
-    def test_load_from_singlestore(
-        self, mock_os_exists, mock_glob, mock_exists, mock_mkdir, mock_connect, mock_store_csv_file, mock_store
-    ):
+    def test_load_from_singlestore(self, mock_connect, mock_store):
         """Test the load_from_singlestore function."""
         # Arrange
-        single_store_host = "localhost"
-        single_store_port = 3306
-        single_store_db = "test_db"
-        single_store_user = "user"
-        single_store_password = "password"
-        store_folder = "/tmp/store"
-        single_store_tables = "table1,table2"
-
-        # Mock Path.exists to return False so that mkdir is called
-        mock_exists.return_value = False
-
-        # Mock os.path.exists to return True for the CSV files
-        mock_os_exists.return_value = True
-
-        # Mock the connection and cursor
+        tables = {
+            "table1": pa.table({"id": [1, 2, 3], "name": ["a", "b", "c"]}),
+            "table2": pa.table({"value": [0.5, 1.5]}),
+        }
+        mock_cursor = _chunked_cursor(tables)
         mock_conn = MagicMock()
-        mock_cursor = MagicMock()
         mock_conn.__enter__.return_value = mock_conn
         mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
         mock_connect.return_value = mock_conn
 
-        # Mock the cursor.fetchall to return table names
-        mock_cursor.fetchall.return_value = [{"TABLE_NAME": "table1"}, {"TABLE_NAME": "table2"}]
+        loaded = {}
 
-        # Mock Path.glob to return paths to CSV files
-        mock_csv_path1 = MagicMock()
-        mock_csv_path1.name = "table1.csv"
-        mock_csv_path2 = MagicMock()
-        mock_csv_path2.name = "table2.csv"
-        mock_glob.return_value = [mock_csv_path1, mock_csv_path2]
+        def add_table(table_name, data, replace):
+            loaded[table_name] = data.read_all()
 
-        # Mock Store instance
-        mock_store_instance = MagicMock()
-        mock_store.return_value = mock_store_instance
+        mock_store_instance = mock_store.return_value
+        mock_store_instance.add_table.side_effect = add_table
 
         # Act
-        with patch("builtins.open", mock_open()) as mock_file:
-            load_from_singlestore(
-                single_store_host=single_store_host,
-                single_store_port=single_store_port,
-                single_store_db=single_store_db,
-                single_store_user=single_store_user,
-                single_store_password=single_store_password,
-                store_folder=store_folder,
-                single_store_tables=single_store_tables,
-            )
+        load_from_singlestore(
+            single_store_host="localhost",
+            single_store_port=3306,
+            single_store_db="test_db",
+            single_store_user="user",
+            single_store_password="password",
+            store_folder="/tmp/store",
+            single_store_tables="table1,table2",
+            batch_rows=2,
+            watermark_columns={"table2": "value"},
+        )
 
         # Assert
-        # Verify that the directory was created
-        mock_exists.assert_called_once_with("/tmp/store/singlestore")
-        mock_mkdir.assert_called_once()
-
-        # Verify that the connection was established with the correct parameters
-        mock_connect.assert_called_once_with(
-            host=single_store_host,
-            port=single_store_port,
-            database=single_store_db,
-            user=single_store_user,
-            password=single_store_password,
-            results_type="dicts",
+        mock_connect.assert_called_with(
+            host="localhost",
+            port=3306,
+            database="test_db",
+            user="user",
+            password="password",
+            results_type="arrow",
+            buffered=False,
         )
+        assert loaded == tables
+        assert mock_store.call_args.kwargs["configuration"].coal.store == "/tmp/store"
 
-        # Verify that _get_data was called for each table
-        assert mock_cursor.execute.call_count >= 2  # At least one call per table
+    def test_get_data(self):
+        """Test the _get_data function streams the table in chunks."""
+        # Arrange
+        table = pa.table({"id": [1, 2, 3, 4, 5], "name": ["a", "b", "c", "d", "e"]})
+        cursor = _chunked_cursor({"test_table": table})
+        store = MagicMock()
+        batches = []
+        store.add_table.side_effect = lambda table_name, data, replace: batches.extend(data)
 
-        # Verify that store_csv_file was called for each CSV file
-        assert mock_store_csv_file.call_count == 2
-        mock_store_csv_file.assert_any_call("table1", mock_csv_path1, store=mock_store_instance)
-        mock_store_csv_file.assert_any_call("table2", mock_csv_path2, store=mock_store_instance)
+        # Act
+        rows = _get_data("test_table", store, cursor, batch_rows=2)
 
-        # Verify that Store was initialized correctly
-        mock_store.assert_called_with(False, store_folder)
+        # Assert
+        assert rows == 5
+        cursor.execute.assert_called_once_with("SELECT * FROM test_table", None)
+        assert [batch.num_rows for batch in batches] == [2, 2, 1]
+        assert pa.Table.from_batches(batches) == table
 
-    def test_get_data(self):
-        """Test the _get_data function."""
+    def test_get_data_empty_table(self):
+        """Test the _get_data function skips tables without rows."""
         # Arrange
-        table_name = "test_table"
-        output_directory = "/tmp/output"
         cursor = MagicMock()
+        cursor.fetchmany.return_value = ()
+        store = MagicMock()
 
-        # Mock data returned from the database
-        mock_rows = [{"id": 1, "name": "John"}, {"id": 2, "name": "Jane"}]
-        cursor.fetchall.return_value = mock_rows
+        # Act
+        rows = _get_data("test_table", store, cursor, batch_rows=2)
+
+        # Assert
+        assert rows == 0
+        store.add_table.assert_not_called()
+
+    def test_get_data_empty_table_replace(self):
+        """Test the _get_data function empties the store table of a replace without rows."""
+        # Arrange
+        cursor = MagicMock()
+        cursor.fetchmany.return_value = ()
+        cursor.description = [
+            Description("id", FIELD_TYPE.LONGLONG, None, None, None, None, True, 0, 63),
+            Description("name", FIELD_TYPE.VAR_STRING, None, None, None, None, True, 0, 45),
+        ]
+        store = MagicMock()
+        written = []
+        store.add_table.side_effect = lambda table_name, data, replace: written.append((data.read_all(), replace))
 
         # Act
-        with patch("builtins.open", mock_open()) as mock_file:
-            with patch("csv.DictWriter") as mock_dict_writer:
-                # Mock the DictWriter
-                mock_writer = MagicMock()
-                mock_dict_writer.return_value = mock_writer
+        rows = _get_data("test_table", store, cursor, batch_rows=2, replace=True)
+
+        # Assert
+        assert rows == 0
+        assert written == [(pa.table({"id": pa.array([], pa.int64()), "name": pa.array([], pa.string())}), True)]
 
-                # Ensure the directory exists
-                with patch("os.path.exists") as mock_exists:
-                    mock_exists.return_value = True
+    def test_get_data_empty_table_with_watermark(self):
+        """Test the _get_data function keeps the store table of an incremental load without new rows."""
+        # Arrange
+        cursor = MagicMock()
+        cursor.fetchmany.return_value = ()
+        store = MagicMock()
+        store.table_exists.return_value = True
+        store.execute_query.return_value = pa.table({"watermark": [3]})
 
-                    _get_data(table_name, output_directory, cursor)
+        # Act
+        rows = _get_data("test_table", store, cursor, batch_rows=2, replace=True, watermark_column="id")
 
         # Assert
-        # Verify that the SQL query was executed
-        cursor.execute.assert_called_once_with("SELECT * FROM test_table")
+        assert rows == 0
+        store.add_table.assert_not_called()
 
-        # Verify that fetchall was called
-        cursor.fetchall.assert_called_once()
+    def test_get_data_with_watermark(self):
+        """Test the _get_data function only fetches the rows above the watermark and appends them."""
+        # Arrange
+        table = pa.table({"id": [4, 5]})
+        cursor = _chunked_cursor({"test_table": table})
+        store = MagicMock()
+        store.add_table.side_effect = lambda table_name, data, replace: data.read_all()
+        store.table_exists.return_value = True
+        store.execute_query.return_value = pa.table({"watermark": [3]})
 
-    @patch("cosmotech.coal.singlestore.store.Store")
-    @patch("cosmotech.coal.singlestore.store.store_csv_file")
-    @patch("cosmotech.coal.singlestore.store.s2.connect")
-    @patch("pathlib.Path.mkdir")
-    @patch("pathlib.Path.exists")
-    @patch("pathlib.Path.glob")
-    @patch("os.path.exists")
-    def test_load_from_singlestore_no_tables_specified(
-        self, mock_os_exists, mock_glob, mock_exists, mock_mkdir, mock_connect, mock_store_csv_file, mock_store
-    ):
-        """Test the load_from_singlestore function when no tables are specified."""
+        # Act
+        rows = _get_data("test_table", store, cursor, batch_rows=2, replace=True, watermark_column="id")
+
+        # Assert
+        assert rows == 2
+        store.execute_query.assert_called_once_with('select max("id") as watermark from "test_table"')
+        cursor.execute.assert_called_once_with("SELECT * FROM test_table WHERE `id` > %s", (3,))
+        assert store.add_table.call_args.args[2] is False
+
+    def test_get_data_with_watermark_new_table(self):
+        """Test the _get_data function fetches the whole table when it is not in the store yet."""
         # Arrange
-        single_store_host = "localhost"
-        single_store_port = 3306
-        single_store_db = "test_db"
-        single_store_user = "user"
-        single_store_password = "password"
-        store_folder = "/tmp/store"
+        table = pa.table({"id": [1, 2]})
+        cursor = _chunked_cursor({"test_table": table})
+        store = MagicMock()
+        store.add_table.side_effect = lambda table_name, data, replace: data.read_all()
+        store.table_exists.return_value = False
 
-        # Mock Path.exists to return False so that mkdir is called
-        mock_exists.return_value = False
+        # Act
+        rows = _get_data("test_table", store, cursor, batch_rows=2, watermark_column="id")
 
-        # Mock os.path.exists to return True for the CSV files
-        mock_os_exists.return_value = True
+        # Assert
+        assert rows == 2
+        store.execute_query.assert_not_called()
+        cursor.execute.assert_called_once_with("SELECT * FROM test_table", None)
 
-        # Mock the connection and cursor
+    @patch("cosmotech.coal.singlestore.store.Store")
+    @patch("cosmotech.coal.singlestore.store.s2.connect")
+    def test_load_from_singlestore_no_tables_specified(self, mock_connect, mock_store):
+        """Test the load_from_singlestore function when no tables are specified."""
+        # Arrange
+        tables = {f"table{i}": pa.table({"id": [i]}) for i in range(1, 4)}
+        mock_cursor = _chunked_cursor(tables)
+        mock_cursor.fetchall.return_value = pa.table({"Tables_in_test_db": list(tables)})
         mock_conn = MagicMock()
-        mock_cursor = MagicMock()
         mock_conn.__enter__.return_value = mock_conn
         mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
         mock_connect.return_value = mock_conn
 
-        # Mock the cursor.fetchall to return table names for SHOW TABLES
-        mock_cursor.fetchall.return_value = [
-            {"TABLE_NAME": "table1"},
-            {"TABLE_NAME": "table2"},
-            {"TABLE_NAME": "table3"},
-        ]
+        # Act
+        load_from_singlestore(
+            single_store_host="localhost",
+            single_store_port=3306,
+            single_store_db="test_db",
+            single_store_user="user",
+            single_store_password="password",
+            store_folder="/tmp/store",
+        )
 
-        # Mock Path.glob to return paths to CSV files
-        mock_csv_paths = [MagicMock() for _ in range(3)]
-        for i, path in enumerate(mock_csv_paths):
-            path.name = f"table{i+1}.csv"
-        mock_glob.return_value = mock_csv_paths
+        # Assert
+        mock_cursor.execute.assert_any_call("SHOW TABLES")
+        added = sorted(c.args[0] for c in mock_store.return_value.add_table.call_args_list)
+        assert added == ["table1", "table2", "table3"]
 
-        # Mock Store instance
-        mock_store_instance = MagicMock()
-        mock_store.return_value = mock_store_instance
+    @patch("cosmotech.coal.singlestore.store.Store")
+    @patch("cosmotech.coal.singlestore.store.s2.connect")
+    def test_load_from_singlestore_with_max_workers(self, mock_connect, mock_store, tmp_path):
+        """Test the tables are fetched over several connections at once, then written one at a time."""
+        # Arrange
+        tables = {f"table{i}": pa.table({"id": [i, i + 1]}) for i in range(4)}
+        barrier = threading.Barrier(2, timeout=5)
+        fetch_threads = set()
+        loaded = {}
+
+        def connect(**kwargs):
+            cursor = _chunked_cursor(tables)
+            execute = cursor.execute.side_effect
+
+            def execute_together(query, parameters=None):
+                # Only returns once two tables are fetched at the same time
+                barrier.wait()
+                fetch_threads.add(threading.get_ident())
+                execute(query, parameters)
+
+            cursor.execute.side_effect = execute_together
+            mock_conn = MagicMock()
+            mock_conn.__enter__.return_value = mock_conn
+            mock_conn.cursor.return_value.__enter__.return_value = cursor
+            return mock_conn
+
+        def add_table(table_name, data, replace):
+            loaded[table_name] = (data.read_all(), replace, threading.get_ident())
+
+        mock_connect.side_effect = connect
+        mock_store.return_value.store_location = tmp_path
+        mock_store.return_value.add_table.side_effect = add_table
 
         # Act
-        with patch("builtins.open", mock_open()) as mock_file:
-            load_from_singlestore(
-                single_store_host=single_store_host,
-                single_store_port=single_store_port,
-                single_store_db=single_store_db,
-                single_store_user=single_store_user,
-                single_store_password=single_store_password,
-                store_folder=store_folder,
-            )
+        load_from_singlestore(
+            single_store_host="localhost",
+            single_store_port=3306,
+            single_store_db="test_db",
+            single_store_user="user",
+            single_store_password="password",
+            store_folder="/tmp/store",
+            single_store_tables=",".join(tables),
+            max_workers=2,
+            replace=True,
+            watermark_columns={"table0": "id"},
+        )
 
         # Assert
-        # Verify that the cursor was used to execute a query
-        assert mock_cursor.execute.called
+        assert mock_connect.call_count == 4
+        assert len(fetch_threads) == 2
+        assert {name: data for name, (data, _, _) in loaded.items()} == tables
+        assert {name: replace for name, (_, replace, _) in loaded.items()} == {
+            "table0": False,
+            "table1": True,
+            "table2": True,
+            "table3": True,
+        }
+        # Tables are written by the calling thread and their spool files removed
+        assert {thread for _, _, thread in loaded.values()} == {threading.get_ident()}
+        assert list(tmp_path.iterdir()) == []
+
+    @patch("cosmotech.coal.singlestore.store.s2.connect")
+    def test_load_from_singlestore_with_max_workers_replace_empty(self, mock_connect, tmp_path):
+        """Test a parallel replace of a populated store table with an empty source table empties it."""
+        # Arrange
+        tables = {"items": pa.table({"id": pa.array([], pa.int64())}), "other": pa.table({"id": [1]})}
+        with Store(configuration=Configuration({"coal": {"store": str(tmp_path)}})) as store:
+            store.add_table("items", pa.table({"id": [1, 2, 3]}))
+
+        def connect(**kwargs):
+            cursor = _chunked_cursor(tables)
+            cursor.description = [Description("id", FIELD_TYPE.LONGLONG, None, None, None, None, True, 0, 63)]
+            mock_conn = MagicMock()
+            mock_conn.__enter__.return_value = mock_conn
+            mock_conn.cursor.return_value.__enter__.return_value = cursor
+            return mock_conn
 
-        # Verify that store_csv_file was called for each CSV file
-        assert mock_store_csv_file.call_count == 3
+        mock_connect.side_effect = connect
+
+        # Act
+        load_from_singlestore(
+            single_store_host="localhost",
+            single_store_port=3306,
+            single_store_db="test_db",
+            single_store_user="user",
+            single_store_password="password",
+            store_folder=str(tmp_path),
+            single_store_tables="items,other",
+            max_workers=2,
+            replace=True,
+        )
+
+        # Assert
+        with Store(configuration=Configuration({"coal": {"store": str(tmp_path)}})) as store:
+            assert store.get_table("items") == tables["items"]
+            assert store.get_table("other") == tables["other"]
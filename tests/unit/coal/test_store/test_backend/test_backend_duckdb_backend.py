@@ -0,0 +1,78 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+import pathlib
+from unittest.mock import patch
+
+import pyarrow as pa
+import pytest
+
+from cosmotech.coal.store.backend.backend_interface import BackendInterface
+from cosmotech.coal.store.backend.duckdb_backend import DuckdbBackend, _index_columns
+from cosmotech.coal.utils.configuration import Configuration
+
+
+class TestBackendInterface:
+    """Tests for the BackendInterface base class."""
+
+    def test_methods_not_implemented(self):
+        """Test that a backend missing methods can not be created."""
+
+        # Arrange
+        class Backend(BackendInterface):
+            database_file_name = "db"
+
+            def list_tables(self) -> list[str]:
+                return []
+
+        # Act & Assert
+        with pytest.raises(TypeError, match="execute_query"):
+            Backend(pathlib.Path("/store"), Configuration())
+
+
+class TestDuckdbBackend:
+    """Tests for the DuckdbBackend class."""
+
+    @pytest.mark.parametrize(
+        "expressions, columns",
+        [
+            ("[id]", ["id"]),
+            ("[source, target]", ["source", "target"]),
+            ("['\"Name With Space\"', id]", ["Name With Space", "id"]),
+        ],
+    )
+    def test_index_columns(self, expressions, columns):
+        """Test the index expressions listed by DuckDB are parsed into column names."""
+        # Act
+        result = _index_columns(expressions)
+
+        # Assert
+        assert result == columns
+
+    @patch("duckdb.connect")
+    def test_add_table_rolls_back_on_error(self, mock_connect):
+        """Test add_table rolls back the transaction and unregisters the data on failure."""
+        # Arrange
+        mock_conn = mock_connect.return_value
+        mock_conn.execute.side_effect = [None, IndexError("Failure"), None]
+        backend = DuckdbBackend(pathlib.Path("/store"), Configuration())
+        data = pa.Table.from_arrays([pa.array([1])], names=["id"])
+
+        # Act & Assert
+        with pytest.raises(IndexError):
+            backend.add_table("items", data, replace=True)
+
+        assert mock_conn.execute.call_args_list[-1].args == ("rollback",)
+        mock_conn.unregister.assert_called_once_with("_coal_store_data")
+
+    def test_database_path(self):
+        """Test the database file name of the backend."""
+        # Act
+        backend = DuckdbBackend(pathlib.Path("/store"), Configuration())
+
+        # Assert
+        assert backend.database_path == pathlib.Path("/store/db.duckdb")
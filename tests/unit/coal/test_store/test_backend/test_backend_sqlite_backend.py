@@ -0,0 +1,205 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+import pyarrow as pa
+import pytest
+
+from cosmotech.coal.store.backend.sqlite_backend import SqliteBackend, _type_literal
+from cosmotech.coal.utils.configuration import Configuration
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = SqliteBackend(tmp_path, Configuration())
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def null_prefix_backend(backend):
+    """Backend with an untyped column holding NULL values before its first float."""
+    backend.add_table("src", pa.table({"v": [None] * 2000 + [0.5]}))
+    backend.execute_query("create table agg as select v * 2 as w from src")
+    return backend
+
+
+class TestSqliteBackendExecuteQuery:
+    """Tests for the execute_query method of the SqliteBackend class."""
+
+    @pytest.mark.parametrize(
+        "sql_query",
+        [
+            "select w from agg",
+            "select w from agg;",
+            "with doubled as (select w from agg) select w from doubled;",
+        ],
+    )
+    def test_execute_query_retry_type_mismatch(self, null_prefix_backend, sql_query):
+        """Test a query failing on a type mismatch is retried as written with bigger batches."""
+        # Act
+        result = null_prefix_backend.execute_query(sql_query)
+
+        # Assert
+        assert result.num_rows == 2001
+        assert result.column("w").to_pylist()[-1] == 1.0
+        assert null_prefix_backend.query_retries == 1
+
+    def test_execute_query_retry_long_null_prefix(self, backend):
+        """Test a query is run at most twice however long the NULL values precede the first float."""
+        # Arrange
+        backend.add_table("src", pa.table({"v": [None] * 100000 + [0.5]}))
+        backend.execute_query("create table agg as select v * 2 as w from src")
+
+        # Act
+        result = backend.execute_query("select w from agg")
+        again = backend.execute_query("select w from agg")
+
+        # Assert
+        assert result.num_rows == 100001
+        assert result.column("w").type == pa.float64()
+        assert again == result
+        assert backend.query_retries == 2
+
+    def test_execute_query_pragma(self, backend):
+        """Test pragma statements are run as queries."""
+        # Act
+        result = backend.execute_query("pragma user_version;")
+
+        # Assert
+        assert result.column(0).to_pylist() == [0]
+        assert backend.query_retries == 0
+
+
+class TestSqliteBackendExecuteQueryReader:
+    """Tests for the execute_query_reader method of the SqliteBackend class."""
+
+    def test_execute_query_reader_null_prefix(self, null_prefix_backend):
+        """Test a stream whose full first batch has a column of NULL values is read in a single query run."""
+        # Act
+        batches = list(null_prefix_backend.execute_query_reader("select w from agg", batch_rows=1000))
+
+        # Assert
+        assert [batch.num_rows for batch in batches] == [1000, 1000, 1]
+        assert batches[0].schema.field("w").type == pa.float64()
+        assert batches[-1].column(0).to_pylist() == [1.0]
+        assert null_prefix_backend.query_retries == 1
+
+    def test_execute_query_reader_streamed(self, backend):
+        """Test a stream with typed first batch is read as it runs."""
+        # Arrange
+        backend.add_table("src", pa.table({"v": [None] * 999 + [0.5] * 1002}))
+
+        # Act
+        batches = list(backend.execute_query_reader("select v from src;", batch_rows=1000))
+
+        # Assert
+        assert [batch.num_rows for batch in batches] == [1000, 1000, 1]
+        assert backend.query_retries == 0
+
+
+class TestSqliteBackendTypedQuery:
+    """Tests for the typed queries used by the SqliteBackend class to read tables."""
+
+    @pytest.mark.parametrize(
+        "declared_type, literal",
+        [
+            ("INTEGER", "0"),
+            ("BIGINT", "0"),
+            ("VARCHAR(10)", "''"),
+            ("TEXT", "''"),
+            ("BLOB", "x''"),
+            ("DOUBLE", "0.0"),
+            ("real", "0.0"),
+            ("", None),
+            ("NUMERIC", None),
+            ("TIMESTAMP", None),
+        ],
+    )
+    def test_type_literal(self, declared_type, literal):
+        """Test the literal of a declared type follows the sqlite type affinity."""
+        # Act
+        result = _type_literal(declared_type)
+
+        # Assert
+        assert result == literal
+
+    def test_column_literals(self, backend):
+        """Test columns without type affinity get the literal of the values they hold."""
+        # Arrange
+        backend.execute("create table items (id integer, a, b, c timestamp, d)")
+        backend.execute("insert into items values (1, null, 1, '2025-01-01', null), (2, 0.5, 'x', null, null)")
+        columns = [("id", "INTEGER"), ("a", ""), ("b", ""), ("c", "TIMESTAMP"), ("d", "")]
+
+        # Act
+        result = backend._column_literals("items", columns)
+        filtered = backend._column_literals("items", columns, where="id = ?", parameters=[1])
+
+        # Assert
+        assert result == ["0", "0.0", "''", "''", "NULL"]
+        assert filtered == ["0", "NULL", "0", "''", "NULL"]
+
+    def test_typed_table_query(self):
+        """Test the typed query starts with the typing row before the rows of the table."""
+        # Act
+        result = SqliteBackend._typed_table_query("items", [("id", "INTEGER"), ("name", "")], ["0", "''"], "id > ?")
+
+        # Assert
+        assert result == 'select 0 as "id", \'\' as "name" union all select "id", "name" from "items" where id > ?'
+
+    def test_read_table_with_null_prefix(self, null_prefix_backend):
+        """Test a column created from a query is read with the type of its values."""
+        # Act
+        result = null_prefix_backend.read_table("agg", [("w", "")])
+        batches = list(null_prefix_backend.iter_table("agg", [("w", "")], batch_rows=100))
+
+        # Assert
+        assert result.schema.field("w").type == pa.float64()
+        assert result.num_rows == 2001
+        assert sum(batch.num_rows for batch in batches) == 2001
+        assert batches[-1].column(0).to_pylist()[-1] == 1.0
+
+
+class TestSqliteBackendPragmas:
+    """Tests for the pragmas applied by the SqliteBackend class."""
+
+    @pytest.mark.parametrize("profile", list(SqliteBackend.PRAGMA_PROFILES))
+    def test_get_pragmas_profile(self, profile):
+        """Test a profile name selects the pragmas of the profile."""
+        # Act
+        result = SqliteBackend._get_pragmas(Configuration({"coal": {"store_pragmas": profile}}))
+
+        # Assert
+        assert result == SqliteBackend.PRAGMA_PROFILES[profile]
+
+    def test_get_pragmas_table(self):
+        """Test a table of pragmas is used as is."""
+        # Act
+        result = SqliteBackend._get_pragmas(Configuration({"coal": {"store_pragmas": {"cache_size": -2000}}}))
+
+        # Assert
+        assert result == {"cache_size": -2000}
+
+    @pytest.mark.parametrize("pragmas", ["unknown", {"cache_size = 0; drop table items": 1}])
+    def test_get_pragmas_invalid(self, pragmas):
+        """Test unknown profiles and invalid pragma names are rejected."""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            SqliteBackend._get_pragmas(Configuration({"coal": {"store_pragmas": pragmas}}))
+
+    def test_pragmas_applied(self, tmp_path):
+        """Test the pragmas are set on the connections to the database."""
+        # Arrange
+        backend = SqliteBackend(tmp_path, Configuration({"coal": {"store_pragmas": "safe"}}))
+
+        # Act
+        journal_mode = backend.execute_query("pragma journal_mode").column(0).to_pylist()
+        synchronous = backend.execute_query("pragma synchronous").column(0).to_pylist()
+        backend.close()
+
+        # Assert
+        assert journal_mode == ["wal"]
+        assert synchronous == [2]
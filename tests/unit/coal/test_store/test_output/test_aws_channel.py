@@ -65,7 +65,7 @@ class TestAwsChannel:
         mock_s3_class.return_value = mock_s3
 
         mock_store = MagicMock()
-        mock_store._database_path = "/path/to/db.sqlite"
+        mock_store.database_file.return_value = "/path/to/db.sqlite"
         mock_store_class.return_value = mock_store
 
         channel = AwsChannel(base_aws_config)
@@ -78,7 +78,7 @@ class TestAwsChannel:
 
     @patch("cosmotech.coal.store.output.aws_channel.Store")
     @patch("cosmotech.coal.store.output.aws_channel.S3")
-    @patch("cosmotech.coal.store.output.aws_channel.pc.write_csv")
+    @patch("cosmotech.coal.store.output.aws_channel.write_csv_stream")
     def test_send_csv(self, mock_write_csv, mock_s3_class, mock_store_class, base_aws_config):
         """Test sending data as CSV files."""
         # Arrange
@@ -89,7 +89,9 @@ class TestAwsChannel:
         mock_store = MagicMock()
         mock_table = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["col1"])
         mock_store.list_tables.return_value = ["table1", "table2"]
-        mock_store.get_table.return_value = mock_table
+        mock_store.iter_batches.side_effect = lambda _name: pa.RecordBatchReader.from_batches(
+            mock_table.schema, mock_table.to_batches()
+        )
         mock_store_class.return_value = mock_store
 
         channel = AwsChannel(base_aws_config)
@@ -103,7 +105,7 @@ class TestAwsChannel:
 
     @patch("cosmotech.coal.store.output.aws_channel.Store")
     @patch("cosmotech.coal.store.output.aws_channel.S3")
-    @patch("cosmotech.coal.store.output.aws_channel.pq.write_table")
+    @patch("cosmotech.coal.store.output.aws_channel.write_parquet_stream")
     def test_send_parquet(self, mock_write_parquet, mock_s3_class, mock_store_class, base_aws_config):
         """Test sending data as Parquet files."""
         # Arrange
@@ -114,7 +116,9 @@ class TestAwsChannel:
         mock_store = MagicMock()
         mock_table = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["col1"])
         mock_store.list_tables.return_value = ["table1"]
-        mock_store.get_table.return_value = mock_table
+        mock_store.iter_batches.side_effect = lambda _name: pa.RecordBatchReader.from_batches(
+            mock_table.schema, mock_table.to_batches()
+        )
         mock_store_class.return_value = mock_store
 
         channel = AwsChannel(base_aws_config)
@@ -138,7 +142,9 @@ class TestAwsChannel:
         mock_store = MagicMock()
         mock_table = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["col1"])
         mock_store.list_tables.return_value = ["table1", "table2", "table3"]
-        mock_store.get_table.return_value = mock_table
+        mock_store.iter_batches.side_effect = lambda _name: pa.RecordBatchReader.from_batches(
+            mock_table.schema, mock_table.to_batches()
+        )
         mock_store_class.return_value = mock_store
 
         channel = AwsChannel(base_aws_config)
@@ -148,9 +154,9 @@ class TestAwsChannel:
 
         # Assert
         # Should only process table1 and table3
-        assert mock_store.get_table.call_count == 2
-        mock_store.get_table.assert_any_call("table1")
-        mock_store.get_table.assert_any_call("table3")
+        assert mock_store.iter_batches.call_count == 2
+        mock_store.iter_batches.assert_any_call("table1")
+        mock_store.iter_batches.assert_any_call("table3")
 
     @patch("cosmotech.coal.store.output.aws_channel.Store")
     @patch("cosmotech.coal.store.output.aws_channel.S3")
@@ -165,7 +171,9 @@ class TestAwsChannel:
         # Empty table
         mock_table = pa.Table.from_arrays([pa.array([])], names=["col1"])
         mock_store.list_tables.return_value = ["empty_table"]
-        mock_store.get_table.return_value = mock_table
+        mock_store.iter_batches.side_effect = lambda _name: pa.RecordBatchReader.from_batches(
+            mock_table.schema, mock_table.to_batches()
+        )
         mock_store_class.return_value = mock_store
 
         channel = AwsChannel(base_aws_config)
@@ -82,6 +82,9 @@ class TestPostgresChannel:
         assert call_args.kwargs["configuration"] == base_postgres_config
         assert call_args.kwargs["selected_tables"] is None
         assert call_args.kwargs["fk_id"] == "run_id_123"
+        assert call_args.kwargs["defer_constraints"] is False
+        assert call_args.kwargs["not_valid"] is False
+        assert call_args.kwargs["partition_by_run"] is False
 
     @patch("cosmotech.coal.store.output.postgres_channel.dump_store_to_postgresql_from_conf")
     @patch("cosmotech.coal.store.output.postgres_channel.send_runner_metadata_to_postgresql")
@@ -118,3 +121,39 @@ class TestPostgresChannel:
         # Check that configuration was passed
         call_args = mock_remove_metadata.call_args
         assert call_args.args[0] == base_postgres_config
+
+    @patch("cosmotech.coal.store.output.postgres_channel.PostgresUtils")
+    @patch("cosmotech.coal.store.output.postgres_channel.dump_store_to_postgresql_from_conf")
+    @patch("cosmotech.coal.store.output.postgres_channel.send_runner_metadata_to_postgresql")
+    @patch("cosmotech.coal.store.output.postgres_channel.get_runner_run_id_from_postgresql")
+    def test_send_partition_by_run(
+        self, mock_get_run_id, mock_send_metadata, mock_dump, mock_postgres_utils_class, base_postgres_config
+    ):
+        """Test sending partitioned data drops the partitions of the previous run of the runner."""
+        # Arrange
+        base_postgres_config.postgres.partition_by_run = True
+        mock_get_run_id.return_value = "run_id_122"
+        mock_send_metadata.return_value = "run_id_123"
+        channel = PostgresChannel(base_postgres_config)
+
+        # Act
+        channel.send()
+
+        # Assert
+        mock_postgres_utils_class.return_value.drop_partitions.assert_called_once_with("run_id_122")
+        assert mock_dump.call_args.kwargs["partition_by_run"] is True
+
+    @patch("cosmotech.coal.store.output.postgres_channel.PostgresUtils")
+    @patch("cosmotech.coal.store.output.postgres_channel.remove_runner_metadata_from_postgresql")
+    def test_delete_partition_by_run(self, mock_remove_metadata, mock_postgres_utils_class, base_postgres_config):
+        """Test deleting partitioned data drops the partitions of the run."""
+        # Arrange
+        base_postgres_config.postgres.partition_by_run = True
+        mock_remove_metadata.return_value = "run_id_123"
+        channel = PostgresChannel(base_postgres_config)
+
+        # Act
+        channel.delete()
+
+        # Assert
+        mock_postgres_utils_class.return_value.drop_partitions.assert_called_once_with("run_id_123")
@@ -5,6 +5,7 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
+import io
 import pathlib
 from unittest.mock import MagicMock, patch
 
@@ -12,7 +13,12 @@ import pyarrow as pa
 import pyarrow.csv as pc
 import pytest
 
-from cosmotech.coal.store.csv import convert_store_table_to_csv, store_csv_file
+from cosmotech.coal.store.csv import (
+    convert_store_table_to_csv,
+    store_csv_file,
+    store_csv_folder,
+    write_csv_stream,
+)
 from cosmotech.coal.store.store import Store
 
 
@@ -98,7 +104,7 @@ class TestCsvFunctions:
         # Check that add_table was called with the sanitized data
         mock_store.add_table.assert_called_once()
 
-    @patch("pyarrow.csv.write_csv")
+    @patch("cosmotech.coal.store.csv.write_csv_stream")
     @patch("pathlib.Path.exists")
     def test_convert_store_table_to_csv_success(self, mock_exists, mock_write_csv):
         """Test the convert_store_table_to_csv function with a valid table."""
@@ -110,7 +116,8 @@ class TestCsvFunctions:
         # Mock store and table data
         mock_store = MagicMock(spec=Store)
         mock_table = pa.Table.from_arrays([pa.array([1, 2, 3]), pa.array(["a", "b", "c"])], names=["id", "name"])
-        mock_store.get_table.return_value = mock_table
+        mock_reader = pa.RecordBatchReader.from_batches(mock_table.schema, mock_table.to_batches())
+        mock_store.iter_batches.return_value = mock_reader
 
         # Mock mkdir
         with patch.object(pathlib.Path, "mkdir") as mock_mkdir:
@@ -118,9 +125,9 @@ class TestCsvFunctions:
             convert_store_table_to_csv(table_name, csv_path, False, mock_store)
 
             # Assert
-            mock_store.get_table.assert_called_once_with(table_name)
+            mock_store.iter_batches.assert_called_once_with(table_name, columns=None, where=None, parameters=None)
             mock_mkdir.assert_called_once_with(parents=True, exist_ok=True)
-            mock_write_csv.assert_called_once_with(mock_table, csv_path)
+            mock_write_csv.assert_called_once_with(mock_reader, csv_path)
 
     @patch("pathlib.Path.exists")
     def test_convert_store_table_to_csv_file_exists(self, mock_exists):
@@ -140,7 +147,7 @@ class TestCsvFunctions:
         mock_exists.assert_called_once_with()
         mock_store.get_table.assert_not_called()
 
-    @patch("pyarrow.csv.write_csv")
+    @patch("cosmotech.coal.store.csv.write_csv_stream")
     @patch("pathlib.Path.exists")
     def test_convert_store_table_to_csv_replace_existing(self, mock_exists, mock_write_csv):
         """Test the convert_store_table_to_csv function with replace_existing_file=True."""
@@ -152,7 +159,8 @@ class TestCsvFunctions:
         # Mock store and table data
         mock_store = MagicMock(spec=Store)
         mock_table = pa.Table.from_arrays([pa.array([1, 2, 3]), pa.array(["a", "b", "c"])], names=["id", "name"])
-        mock_store.get_table.return_value = mock_table
+        mock_reader = pa.RecordBatchReader.from_batches(mock_table.schema, mock_table.to_batches())
+        mock_store.iter_batches.return_value = mock_reader
 
         # Mock mkdir
         with patch.object(pathlib.Path, "mkdir") as mock_mkdir:
@@ -160,11 +168,11 @@ class TestCsvFunctions:
             convert_store_table_to_csv(table_name, csv_path, True, mock_store)
 
             # Assert
-            mock_store.get_table.assert_called_once_with(table_name)
+            mock_store.iter_batches.assert_called_once_with(table_name, columns=None, where=None, parameters=None)
             mock_mkdir.assert_called_once_with(parents=True, exist_ok=True)
-            mock_write_csv.assert_called_once_with(mock_table, csv_path)
+            mock_write_csv.assert_called_once_with(mock_reader, csv_path)
 
-    @patch("pyarrow.csv.write_csv")
+    @patch("cosmotech.coal.store.csv.write_csv_stream")
     @patch("pathlib.Path.exists")
     def test_convert_store_table_to_csv_directory_path(self, mock_exists, mock_write_csv):
         """Test the convert_store_table_to_csv function with a directory path."""
@@ -176,7 +184,8 @@ class TestCsvFunctions:
         # Mock store and table data
         mock_store = MagicMock(spec=Store)
         mock_table = pa.Table.from_arrays([pa.array([1, 2, 3]), pa.array(["a", "b", "c"])], names=["id", "name"])
-        mock_store.get_table.return_value = mock_table
+        mock_reader = pa.RecordBatchReader.from_batches(mock_table.schema, mock_table.to_batches())
+        mock_store.iter_batches.return_value = mock_reader
 
         # Mock mkdir
         with patch.object(pathlib.Path, "mkdir") as mock_mkdir:
@@ -184,8 +193,100 @@ class TestCsvFunctions:
             convert_store_table_to_csv(table_name, csv_path, False, mock_store)
 
             # Assert
-            mock_store.get_table.assert_called_once_with(table_name)
+            mock_store.iter_batches.assert_called_once_with(table_name, columns=None, where=None, parameters=None)
             mock_mkdir.assert_called_once_with(parents=True, exist_ok=True)
             # Check that the path was modified to include the table name
             expected_path = csv_path / f"{table_name}.csv"
-            mock_write_csv.assert_called_once_with(mock_table, expected_path)
+            mock_write_csv.assert_called_once_with(mock_reader, expected_path)
+
+    def test_write_csv_stream(self):
+        """Test the write_csv_stream function writes every batch of the reader."""
+        # Arrange
+        table = pa.Table.from_arrays([pa.array([1, 2, 3]), pa.array(["a", "b", "c"])], names=["id", "name"])
+        reader = pa.RecordBatchReader.from_batches(table.schema, table.to_batches(max_chunksize=1))
+        sink = io.BytesIO()
+
+        # Act
+        write_csv_stream(reader, sink)
+
+        # Assert
+        assert pc.read_csv(io.BytesIO(sink.getvalue())) == table
+
+    def test_write_csv_stream_without_header(self):
+        """Test the write_csv_stream function with include_header=False."""
+        # Arrange
+        table = pa.Table.from_arrays([pa.array([1, 2])], names=["id"])
+        reader = pa.RecordBatchReader.from_batches(table.schema, table.to_batches())
+        sink = io.BytesIO()
+
+        # Act
+        write_csv_stream(reader, sink, include_header=False)
+
+        # Assert
+        assert sink.getvalue() == b"1\n2\n"
+
+    def test_store_csv_folder(self, tmp_path):
+        """Test the store_csv_folder function stores every CSV file of the folder."""
+        # Arrange
+        for name in ("first", "second", "third"):
+            (tmp_path / f"{name}.csv").write_text("id,my name\n1,a\n2,b\n")
+        (tmp_path / "ignored.txt").write_text("not a csv")
+        mock_store = MagicMock(spec=Store)
+
+        # Act
+        store_csv_folder(tmp_path, store=mock_store, workers=2)
+
+        # Assert
+        assert mock_store.add_table.call_count == 3
+        stored = {kwargs["table_name"]: kwargs["data"] for _, kwargs in mock_store.add_table.call_args_list}
+        assert sorted(stored) == ["first", "second", "third"]
+        assert all(data.column_names == ["id", "my_name"] for data in stored.values())
+
+    def test_store_csv_folder_with_replace(self, tmp_path):
+        """Test the store_csv_folder function with replace_existsing_file=True."""
+        # Arrange
+        (tmp_path / "table.csv").write_text("id\n1\n")
+        mock_store = MagicMock(spec=Store)
+
+        # Act
+        store_csv_folder(tmp_path, replace_existsing_file=True, store=mock_store)
+
+        # Assert
+        mock_store.add_table.assert_called_once()
+        assert mock_store.add_table.call_args.kwargs["replace"] is True
+
+    def test_store_csv_file_with_block_size(self, tmp_path):
+        """Test the store_csv_file function streams the file when given a block size."""
+        # Arrange
+        csv_path = tmp_path / "test.csv"
+        csv_path.write_text("id,my name\n" + "".join(f"{i},name_{i}\n" for i in range(1000)))
+        mock_store = MagicMock(spec=Store)
+        batches = []
+        mock_store.add_table.side_effect = lambda table_name, data, replace: batches.extend(data)
+
+        # Act
+        store_csv_file("test_table", csv_path, False, mock_store, block_size=1024)
+
+        # Assert
+        mock_store.add_table.assert_called_once()
+        assert isinstance(mock_store.add_table.call_args.kwargs["data"], pa.RecordBatchReader)
+        assert len(batches) > 1
+        result = pa.Table.from_batches(batches)
+        assert result.column_names == ["id", "my_name"]
+        assert result.column("id").to_pylist() == list(range(1000))
+
+    @patch("cosmotech.coal.store.csv.store_csv_file")
+    def test_store_csv_folder_with_block_size(self, mock_store_csv_file, tmp_path):
+        """Test the store_csv_folder function streams every file when given a block size."""
+        # Arrange
+        for name in ("first", "second"):
+            (tmp_path / f"{name}.csv").write_text("id\n1\n")
+        mock_store = MagicMock(spec=Store)
+
+        # Act
+        store_csv_folder(tmp_path, store=mock_store, block_size=1024)
+
+        # Assert
+        assert mock_store_csv_file.call_count == 2
+        mock_store_csv_file.assert_any_call("first", tmp_path / "first.csv", False, mock_store, 1024)
+        mock_store_csv_file.assert_any_call("second", tmp_path / "second.csv", False, mock_store, 1024)
@@ -67,6 +67,20 @@ class TestNativePythonFunctions:
             assert kwargs["data"] == mock_table
             assert kwargs["replace"] is True
 
+    @patch("cosmotech.coal.store.native_python.Store")
+    def test_store_pylist_default_store(self, mock_store_class):
+        """Test the store_pylist function closes the store it opens when none is given."""
+        # Arrange
+        data = [{"id": 1, "name": "Alice"}]
+        mock_store = mock_store_class.return_value.__enter__.return_value
+
+        # Act
+        store_pylist("test_table", data)
+
+        # Assert
+        mock_store.add_table.assert_called_once()
+        mock_store_class.return_value.__exit__.assert_called_once()
+
     def test_convert_table_as_pylist(self):
         """Test the convert_table_as_pylist function."""
         # Arrange
@@ -85,7 +99,7 @@ class TestNativePythonFunctions:
         result = convert_table_as_pylist(table_name, mock_store)
 
         # Assert
-        mock_store.get_table.assert_called_once_with(table_name)
+        mock_store.get_table.assert_called_once_with(table_name, columns=None, where=None, parameters=None)
         mock_table.to_pylist.assert_called_once()
         assert result == expected_result
 
@@ -107,6 +121,6 @@ class TestNativePythonFunctions:
         result = convert_table_as_pylist(table_name, mock_store)
 
         # Assert
-        mock_store.get_table.assert_called_once_with(table_name)
+        mock_store.get_table.assert_called_once_with(table_name, columns=None, where=None, parameters=None)
         mock_table.to_pylist.assert_called_once()
         assert result == expected_result
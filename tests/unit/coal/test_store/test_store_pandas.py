@@ -93,7 +93,7 @@ class TestPandasFunctions:
         result = convert_store_table_to_dataframe(table_name, mock_store)
 
         # Assert
-        mock_store.get_table.assert_called_once_with(table_name)
+        mock_store.get_table.assert_called_once_with(table_name, columns=None, where=None, parameters=None)
         mock_table.to_pandas.assert_called_once()
         pd.testing.assert_frame_equal(result, expected_df)
 
@@ -115,7 +115,7 @@ class TestPandasFunctions:
         result = convert_store_table_to_dataframe(table_name, mock_store)
 
         # Assert
-        mock_store.get_table.assert_called_once_with(table_name)
+        mock_store.get_table.assert_called_once_with(table_name, columns=None, where=None, parameters=None)
         mock_table.to_pandas.assert_called_once()
         pd.testing.assert_frame_equal(result, expected_df)
 
@@ -137,6 +137,6 @@ class TestPandasFunctions:
         result = convert_store_table_to_dataframe(table_name, custom_store)
 
         # Assert
-        custom_store.get_table.assert_called_once_with(table_name)
+        custom_store.get_table.assert_called_once_with(table_name, columns=None, where=None, parameters=None)
         mock_table.to_pandas.assert_called_once()
         pd.testing.assert_frame_equal(result, expected_df)
@@ -5,15 +5,19 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
+import io
 import pathlib
 from unittest.mock import MagicMock, patch
 
 import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 
 from cosmotech.coal.store.parquet import (
     convert_store_table_to_parquet,
     store_parquet_file,
+    store_parquet_folder,
+    write_parquet_stream,
 )
 from cosmotech.coal.store.store import Store
 
@@ -115,7 +119,7 @@ class TestParquetFunctions:
         args, kwargs = mock_store.add_table.call_args
         assert kwargs["replace"] is True
 
-    @patch("pyarrow.parquet.write_table")
+    @patch("cosmotech.coal.store.parquet.write_parquet_stream")
     @patch("pathlib.Path.exists")
     def test_convert_store_table_to_parquet_success(self, mock_exists, mock_write_table):
         """Test the convert_store_table_to_parquet function with a valid table."""
@@ -126,16 +130,25 @@ class TestParquetFunctions:
 
         mock_store = MagicMock(spec=Store)
         mock_table = pa.Table.from_arrays([pa.array([1, 2, 3]), pa.array(["a", "b", "c"])], names=["id", "name"])
-        mock_store.get_table.return_value = mock_table
+        mock_reader = pa.RecordBatchReader.from_batches(mock_table.schema, mock_table.to_batches())
+        mock_store.iter_batches.return_value = mock_reader
 
         with patch.object(pathlib.Path, "mkdir") as mock_mkdir:
             # Act
             convert_store_table_to_parquet(table_name, parquet_path, False, mock_store)
 
             # Assert
-            mock_store.get_table.assert_called_once_with(table_name)
+            mock_store.iter_batches.assert_called_once_with(
+                table_name, batch_rows=Store.DEFAULT_BATCH_ROWS, columns=None, where=None, parameters=None
+            )
             mock_mkdir.assert_called_once_with(parents=True, exist_ok=True)
-            mock_write_table.assert_called_once_with(mock_table, parquet_path)
+            mock_write_table.assert_called_once_with(
+                mock_reader,
+                parquet_path,
+                row_group_size=Store.DEFAULT_BATCH_ROWS,
+                compression="snappy",
+                use_dictionary=True,
+            )
 
     @patch("pathlib.Path.exists")
     def test_convert_store_table_to_parquet_file_exists(self, mock_exists):
@@ -154,7 +167,7 @@ class TestParquetFunctions:
         mock_exists.assert_called_once_with()
         mock_store.get_table.assert_not_called()
 
-    @patch("pyarrow.parquet.write_table")
+    @patch("cosmotech.coal.store.parquet.write_parquet_stream")
     @patch("pathlib.Path.exists")
     def test_convert_store_table_to_parquet_replace_existing(self, mock_exists, mock_write_table):
         """Test the convert_store_table_to_parquet function with replace_existing_file=True."""
@@ -165,18 +178,27 @@ class TestParquetFunctions:
 
         mock_store = MagicMock(spec=Store)
         mock_table = pa.Table.from_arrays([pa.array([1, 2, 3]), pa.array(["a", "b", "c"])], names=["id", "name"])
-        mock_store.get_table.return_value = mock_table
+        mock_reader = pa.RecordBatchReader.from_batches(mock_table.schema, mock_table.to_batches())
+        mock_store.iter_batches.return_value = mock_reader
 
         with patch.object(pathlib.Path, "mkdir") as mock_mkdir:
             # Act
             convert_store_table_to_parquet(table_name, parquet_path, True, mock_store)
 
             # Assert
-            mock_store.get_table.assert_called_once_with(table_name)
+            mock_store.iter_batches.assert_called_once_with(
+                table_name, batch_rows=Store.DEFAULT_BATCH_ROWS, columns=None, where=None, parameters=None
+            )
             mock_mkdir.assert_called_once_with(parents=True, exist_ok=True)
-            mock_write_table.assert_called_once_with(mock_table, parquet_path)
-
-    @patch("pyarrow.parquet.write_table")
+            mock_write_table.assert_called_once_with(
+                mock_reader,
+                parquet_path,
+                row_group_size=Store.DEFAULT_BATCH_ROWS,
+                compression="snappy",
+                use_dictionary=True,
+            )
+
+    @patch("cosmotech.coal.store.parquet.write_parquet_stream")
     @patch("pathlib.Path.exists")
     def test_convert_store_table_to_parquet_directory_path(self, mock_exists, mock_write_table):
         """Test the convert_store_table_to_parquet function with a directory path."""
@@ -187,14 +209,92 @@ class TestParquetFunctions:
 
         mock_store = MagicMock(spec=Store)
         mock_table = pa.Table.from_arrays([pa.array([1, 2, 3]), pa.array(["a", "b", "c"])], names=["id", "name"])
-        mock_store.get_table.return_value = mock_table
+        mock_reader = pa.RecordBatchReader.from_batches(mock_table.schema, mock_table.to_batches())
+        mock_store.iter_batches.return_value = mock_reader
 
         with patch.object(pathlib.Path, "mkdir") as mock_mkdir:
             # Act
             convert_store_table_to_parquet(table_name, parquet_path, False, mock_store)
 
             # Assert
-            mock_store.get_table.assert_called_once_with(table_name)
+            mock_store.iter_batches.assert_called_once_with(
+                table_name, batch_rows=Store.DEFAULT_BATCH_ROWS, columns=None, where=None, parameters=None
+            )
             mock_mkdir.assert_called_once_with(parents=True, exist_ok=True)
             expected_path = parquet_path / f"{table_name}.parquet"
-            mock_write_table.assert_called_once_with(mock_table, expected_path)
+            mock_write_table.assert_called_once_with(
+                mock_reader,
+                expected_path,
+                row_group_size=Store.DEFAULT_BATCH_ROWS,
+                compression="snappy",
+                use_dictionary=True,
+            )
+
+    def test_write_parquet_stream(self):
+        """Test the write_parquet_stream function writes every batch of the reader."""
+        # Arrange
+        table = pa.Table.from_arrays([pa.array([1, 2, 3]), pa.array(["a", "b", "c"])], names=["id", "name"])
+        reader = pa.RecordBatchReader.from_batches(table.schema, table.to_batches(max_chunksize=1))
+        sink = io.BytesIO()
+
+        # Act
+        write_parquet_stream(reader, sink)
+
+        # Assert
+        assert pq.read_table(io.BytesIO(sink.getvalue())) == table
+
+    def test_store_parquet_folder(self, tmp_path):
+        """Test the store_parquet_folder function stores every Parquet file of the folder."""
+        # Arrange
+        table = pa.Table.from_arrays([pa.array([1, 2]), pa.array(["a", "b"])], names=["id", "my name"])
+        for name in ("first", "second", "third"):
+            pq.write_table(table, tmp_path / f"{name}.parquet")
+        (tmp_path / "ignored.csv").write_text("id\n1\n")
+        mock_store = MagicMock(spec=Store)
+
+        # Act
+        store_parquet_folder(tmp_path, store=mock_store, workers=2)
+
+        # Assert
+        assert mock_store.add_table.call_count == 3
+        stored = {kwargs["table_name"]: kwargs["data"] for _, kwargs in mock_store.add_table.call_args_list}
+        assert sorted(stored) == ["first", "second", "third"]
+        assert all(data.column_names == ["id", "my_name"] for data in stored.values())
+
+    def test_write_parquet_stream_with_options(self):
+        """Test the write_parquet_stream function applies the row group size, compression and dictionary options."""
+        # Arrange
+        table = pa.Table.from_arrays([pa.array(range(10)), pa.array(["a", "b"] * 5)], names=["id", "name"])
+        reader = pa.RecordBatchReader.from_batches(table.schema, table.to_batches())
+        sink = io.BytesIO()
+
+        # Act
+        write_parquet_stream(reader, sink, row_group_size=4, compression="zstd", use_dictionary=["name"])
+
+        # Assert
+        metadata = pq.ParquetFile(io.BytesIO(sink.getvalue())).metadata
+        assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [4, 4, 2]
+        assert metadata.row_group(0).column(0).compression == "ZSTD"
+        assert not metadata.row_group(0).column(0).has_dictionary_page
+        assert metadata.row_group(0).column(1).has_dictionary_page
+
+    def test_store_parquet_file_with_batch_size(self, tmp_path):
+        """Test the store_parquet_file function streams the file when given a batch size."""
+        # Arrange
+        parquet_path = tmp_path / "test.parquet"
+        table = pa.Table.from_arrays([pa.array(range(100))], names=["my id"])
+        pq.write_table(table, parquet_path, row_group_size=30)
+        mock_store = MagicMock(spec=Store)
+        batches = []
+        mock_store.add_table.side_effect = lambda table_name, data, replace: batches.extend(data)
+
+        # Act
+        store_parquet_file("test_table", parquet_path, False, mock_store, batch_size=10)
+
+        # Assert
+        mock_store.add_table.assert_called_once()
+        assert isinstance(mock_store.add_table.call_args.kwargs["data"], pa.RecordBatchReader)
+        assert all(batch.num_rows <= 10 for batch in batches)
+        result = pa.Table.from_batches(batches)
+        assert result.column_names == ["my_id"]
+        assert result.column("my_id").to_pylist() == list(range(100))
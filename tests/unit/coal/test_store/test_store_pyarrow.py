@@ -5,7 +5,7 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pyarrow as pa
 import pytest
@@ -77,7 +77,7 @@ class TestPyarrowFunctions:
         result = convert_store_table_to_dataframe(table_name, mock_store)
 
         # Assert
-        mock_store.get_table.assert_called_once_with(table_name)
+        mock_store.get_table.assert_called_once_with(table_name, columns=None, where=None, parameters=None)
         assert result == expected_table
 
     def test_convert_store_table_to_dataframe_empty_table(self):
@@ -94,7 +94,7 @@ class TestPyarrowFunctions:
         result = convert_store_table_to_dataframe(table_name, mock_store)
 
         # Assert
-        mock_store.get_table.assert_called_once_with(table_name)
+        mock_store.get_table.assert_called_once_with(table_name, columns=None, where=None, parameters=None)
         assert result == expected_table
 
     def test_convert_store_table_to_dataframe_with_custom_store(self):
@@ -115,5 +115,20 @@ class TestPyarrowFunctions:
         result = convert_store_table_to_dataframe(table_name, custom_store)
 
         # Assert
-        custom_store.get_table.assert_called_once_with(table_name)
+        custom_store.get_table.assert_called_once_with(table_name, columns=None, where=None, parameters=None)
         assert result == expected_table
+
+    @patch("cosmotech.coal.store.pyarrow.Store")
+    def test_convert_store_table_to_dataframe_default_store(self, mock_store_class):
+        """Test the convert_store_table_to_dataframe function closes the store it opens when none is given."""
+        # Arrange
+        expected_table = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        mock_store = mock_store_class.return_value.__enter__.return_value
+        mock_store.get_table.return_value = expected_table
+
+        # Act
+        result = convert_store_table_to_dataframe("test_table")
+
+        # Assert
+        assert result == expected_table
+        mock_store_class.return_value.__exit__.assert_called_once()
@@ -6,13 +6,15 @@
 # specifically authorized by written means by Cosmo Tech.
 
 import pathlib
-from unittest.mock import MagicMock, patch
+import threading
+from unittest.mock import MagicMock, call, patch
 
 import pyarrow as pa
 import pytest
 from adbc_driver_sqlite import dbapi
 
-from cosmotech.coal.store.store import Store
+from cosmotech.coal.store.backend import DuckdbBackend, SqliteBackend
+from cosmotech.coal.store.store import Store, read_files, read_spool, spool_reader
 from cosmotech.coal.utils import configuration
 
 
@@ -43,8 +45,9 @@ class TestStore:
         store.reset()
 
         # Assert
-        mock_exists.assert_called_once()
-        mock_unlink.assert_called_once()
+        # Database and write-ahead log files
+        assert mock_exists.call_count == 3
+        assert mock_unlink.call_count == 3
 
     @patch("pathlib.Path.exists")
     @patch("pathlib.Path.unlink")
@@ -58,18 +61,23 @@ class TestStore:
         store.reset()
 
         # Assert
-        mock_exists.assert_called_once()
+        assert mock_exists.call_count == 3
         mock_unlink.assert_not_called()
 
     @patch.object(Store, "table_exists")
-    @patch.object(Store, "execute_query")
+    @patch.object(SqliteBackend, "execute_query")
     def test_get_table(self, mock_execute_query, mock_table_exists):
         """Test the get_table method."""
         # Arrange
         table_name = "test_table"
         mock_table_exists.return_value = True
-        expected_table = pa.Table.from_arrays([pa.array([1, 2, 3]), pa.array(["a", "b", "c"])], names=["id", "name"])
-        mock_execute_query.return_value = expected_table
+        columns = pa.Table.from_arrays(
+            [pa.array(["id", "name"]), pa.array(["INTEGER", "TEXT"])], names=["name", "type"]
+        )
+        query_result = pa.Table.from_arrays(
+            [pa.array([0, 1, 2, 3]), pa.array(["", "a", "b", "c"])], names=["id", "name"]
+        )
+        mock_execute_query.side_effect = [columns, query_result]
         store = Store()
 
         # Act
@@ -77,8 +85,51 @@ class TestStore:
 
         # Assert
         mock_table_exists.assert_called_once_with(table_name)
-        mock_execute_query.assert_called_once_with(f'select * from "{table_name}"')
-        assert result == expected_table
+        mock_execute_query.assert_any_call("select name, type from pragma_table_info(?)", parameters=[table_name])
+        mock_execute_query.assert_called_with(
+            f'select 0 as "id", \'\' as "name" union all select "id", "name" from "{table_name}"', None
+        )
+        assert result.to_pydict() == {"id": [1, 2, 3], "name": ["a", "b", "c"]}
+
+    @patch.object(Store, "table_exists")
+    @patch.object(SqliteBackend, "execute_query")
+    def test_get_table_with_columns_and_where(self, mock_execute_query, mock_table_exists):
+        """Test the get_table method with a column projection and a parameterized filter."""
+        # Arrange
+        table_name = "test_table"
+        mock_table_exists.return_value = True
+        columns = pa.Table.from_arrays(
+            [pa.array(["id", "name"]), pa.array(["INTEGER", "TEXT"])], names=["name", "type"]
+        )
+        query_result = pa.Table.from_arrays([pa.array(["", "b"])], names=["name"])
+        mock_execute_query.side_effect = [columns, query_result]
+        store = Store()
+
+        # Act
+        result = store.get_table(table_name, columns=["NAME"], where="id > ?", parameters=[1])
+
+        # Assert
+        mock_execute_query.assert_called_with(
+            f'select \'\' as "name" union all select "name" from "{table_name}" where id > ?', [1]
+        )
+        assert result.to_pydict() == {"name": ["b"]}
+
+    @patch.object(Store, "table_exists")
+    @patch.object(SqliteBackend, "execute_query")
+    def test_get_table_with_unknown_column(self, mock_execute_query, mock_table_exists):
+        """Test the get_table method rejects columns the table does not have."""
+        # Arrange
+        mock_table_exists.return_value = True
+        mock_execute_query.return_value = pa.Table.from_arrays(
+            [pa.array(["id"]), pa.array(["INTEGER"])], names=["name", "type"]
+        )
+        store = Store()
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            store.get_table("test_table", columns=['id" from sqlite_master --'])
+
+        mock_execute_query.assert_called_once()
 
     @patch.object(Store, "table_exists")
     def test_get_table_not_exists(self, mock_table_exists):
@@ -94,7 +145,7 @@ class TestStore:
 
         mock_table_exists.assert_called_once_with(table_name)
 
-    @patch.object(Store, "list_tables")
+    @patch.object(SqliteBackend, "list_tables")
     def test_table_exists_true(self, mock_list_tables):
         """Test the table_exists method when the table exists."""
         # Arrange
@@ -109,7 +160,7 @@ class TestStore:
         assert result is True
         mock_list_tables.assert_called_once()
 
-    @patch.object(Store, "list_tables")
+    @patch.object(SqliteBackend, "list_tables")
     def test_table_exists_false(self, mock_list_tables):
         """Test the table_exists method when the table doesn't exist."""
         # Arrange
@@ -134,7 +185,7 @@ class TestStore:
 
         # Mock connection and cursor
         mock_conn = MagicMock()
-        mock_connect.return_value.__enter__.return_value = mock_conn
+        mock_connect.return_value = mock_conn
 
         # Mock schema
         expected_schema = pa.schema([pa.field("id", pa.int64()), pa.field("name", pa.string())])
@@ -174,7 +225,7 @@ class TestStore:
         # Mock connection and cursor
         mock_conn = MagicMock()
         mock_cursor = MagicMock()
-        mock_connect.return_value.__enter__.return_value = mock_conn
+        mock_connect.return_value = mock_conn
         mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
         mock_cursor.adbc_ingest.return_value = 3  # 3 rows inserted
 
@@ -187,6 +238,24 @@ class TestStore:
         mock_connect.assert_called_once()
         mock_cursor.adbc_ingest.assert_called_once_with(table_name, data, "create_append")
 
+    @patch("adbc_driver_sqlite.dbapi.connect")
+    def test_add_table_rolls_back_on_error(self, mock_connect):
+        """Test the add_table method rolls back the transaction when the ingestion fails."""
+        # Arrange
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_connect.return_value = mock_conn
+        mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.adbc_ingest.side_effect = OSError("Invalid batch")
+
+        store = Store()
+
+        # Act & Assert
+        with pytest.raises(OSError):
+            store.add_table("test_table", MagicMock(spec=pa.RecordBatchReader))
+
+        assert mock_cursor.execute.call_args_list == [call("begin"), call("rollback")]
+
     @patch("adbc_driver_sqlite.dbapi.connect")
     def test_add_table_with_replace(self, mock_connect):
         """Test the add_table method with replace=True."""
@@ -197,7 +266,7 @@ class TestStore:
         # Mock connection and cursor
         mock_conn = MagicMock()
         mock_cursor = MagicMock()
-        mock_connect.return_value.__enter__.return_value = mock_conn
+        mock_connect.return_value = mock_conn
         mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
         mock_cursor.adbc_ingest.return_value = 3  # 3 rows inserted
 
@@ -216,7 +285,7 @@ class TestStore:
         # Arrange
         # Mock connection
         mock_conn = MagicMock()
-        mock_connect.return_value.__enter__.return_value = mock_conn
+        mock_connect.return_value = mock_conn
 
         # Mock objects result
         mock_objects = MagicMock()
@@ -242,7 +311,7 @@ class TestStore:
 
         # Assert
         mock_connect.assert_called_once()
-        mock_conn.adbc_get_objects.assert_called_once_with(depth="all")
+        mock_conn.adbc_get_objects.assert_called_once_with(depth="tables")
         assert result == ["table1", "table2"]
 
     @patch("adbc_driver_sqlite.dbapi.connect")
@@ -255,7 +324,7 @@ class TestStore:
         # Mock connection and cursor
         mock_conn = MagicMock()
         mock_cursor = MagicMock()
-        mock_connect.return_value.__enter__.return_value = mock_conn
+        mock_connect.return_value = mock_conn
         mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
 
         # Mock cursor methods
@@ -274,26 +343,23 @@ class TestStore:
         mock_cursor.fetch_arrow_table.assert_called_once()
         assert result == expected_table
 
+    @patch.object(SqliteBackend, "_count_result_rows", return_value=5000)
     @patch("adbc_driver_sqlite.dbapi.connect")
-    def test_execute_query_with_oserror(self, mock_connect):
+    def test_execute_query_with_oserror(self, mock_connect, mock_count):
         """Test the execute_query method with OSError handling."""
         # Arrange
-        sql_query = "SELECT * FROM test_table"
+        sql_query = "SELECT * FROM test_table;"
         expected_table = pa.Table.from_arrays([pa.array([1, 2, 3]), pa.array(["a", "b", "c"])], names=["id", "name"])
 
         # Mock connection and cursor
         mock_conn = MagicMock()
         mock_cursor = MagicMock()
-        mock_connect.return_value.__enter__.return_value = mock_conn
+        mock_connect.return_value = mock_conn
         mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
 
-        # Set up to raise OSError on first attempt, then succeed on second attempt
-        mock_cursor.adbc_statement.set_options.side_effect = [
-            OSError("Batch size too large"),  # First call raises OSError
-            None,  # Second call succeeds
-        ]
+        # Set up to raise OSError on the first attempt, then succeed on the second one
         mock_cursor.execute.return_value = None
-        mock_cursor.fetch_arrow_table.return_value = expected_table
+        mock_cursor.fetch_arrow_table.side_effect = [OSError("Type mismatch in column 0"), expected_table]
 
         store = Store()
 
@@ -301,15 +367,356 @@ class TestStore:
         result = store.execute_query(sql_query)
 
         # Assert
-        assert mock_connect.call_count == 2
-        assert mock_cursor.adbc_statement.set_options.call_count == 2
-        # First call with batch_size = 1024, second with batch_size = 2048
-        mock_cursor.adbc_statement.set_options.assert_any_call(**{"adbc.sqlite.query.batch_rows": "1024"})
-        mock_cursor.adbc_statement.set_options.assert_any_call(**{"adbc.sqlite.query.batch_rows": "2048"})
-        mock_cursor.execute.assert_called_once_with(sql_query, None)
-        mock_cursor.fetch_arrow_table.assert_called_once()
+        mock_connect.assert_called_once()
+        # Query is run again as written in a single batch holding all its rows
+        mock_count.assert_called_once_with(sql_query, None)
+        assert mock_cursor.execute.call_args_list == [call(sql_query, None)] * 2
+        assert mock_cursor.adbc_statement.set_options.call_args_list == [
+            call(**{"adbc.sqlite.query.batch_rows": "1024"}),
+            call(**{"adbc.sqlite.query.batch_rows": "5000"}),
+        ]
+        assert store.query_retries == 1
         assert result == expected_table
 
+    @patch.object(SqliteBackend, "_count_result_rows", return_value=5000)
+    @patch("adbc_driver_sqlite.dbapi.connect")
+    def test_execute_query_with_oserror_on_retry(self, mock_connect, mock_count):
+        """Test execute_query runs a query at most twice on type mismatches."""
+        # Arrange
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_connect.return_value = mock_conn
+        mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetch_arrow_table.side_effect = OSError("Type mismatch in column 0")
+
+        store = Store()
+
+        # Act & Assert
+        with pytest.raises(OSError, match="Type mismatch"):
+            store.execute_query("SELECT * FROM test_table")
+
+        assert mock_cursor.execute.call_count == 2
+        assert store.query_retries == 1
+
+    @patch("adbc_driver_sqlite.dbapi.connect")
+    def test_execute_query_with_other_oserror(self, mock_connect):
+        """Test execute_query raises errors other than type mismatches without retrying."""
+        # Arrange
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_connect.return_value = mock_conn
+        mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetch_arrow_table.side_effect = [OSError("Disk I/O error")]
+
+        store = Store()
+
+        # Act & Assert
+        with pytest.raises(OSError, match="Disk I/O error"):
+            store.execute_query("PRAGMA optimize")
+
+        mock_cursor.execute.assert_called_once()
+        assert store.query_retries == 0
+
+    @patch.object(SqliteBackend, "_database_inode")
+    @patch("adbc_driver_sqlite.dbapi.connect")
+    def test_connection_reused(self, mock_connect, mock_inode):
+        """Test that successive calls share a single connection."""
+        # Arrange
+        mock_inode.return_value = 1
+        mock_conn = MagicMock()
+        mock_connect.return_value = mock_conn
+        data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        store = Store()
+
+        # Act
+        store.add_table("table1", data)
+        store.add_table("table2", data)
+        store.execute_query("SELECT * FROM table1")
+
+        # Assert
+        mock_connect.assert_called_once()
+        mock_conn.close.assert_not_called()
+
+    @patch.object(SqliteBackend, "_database_inode")
+    @patch("adbc_driver_sqlite.dbapi.connect")
+    def test_connection_reopened_when_database_replaced(self, mock_connect, mock_inode):
+        """Test that the connection is reopened if the database file changed."""
+        # Arrange
+        mock_inode.side_effect = [1, 2, 2]
+        first_conn = MagicMock()
+        second_conn = MagicMock()
+        mock_connect.side_effect = [first_conn, second_conn]
+        data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        store = Store()
+
+        # Act
+        store.add_table("table1", data)
+        store.add_table("table1", data)
+
+        # Assert
+        assert mock_connect.call_count == 2
+        first_conn.close.assert_called_once()
+
+    @patch("adbc_driver_sqlite.dbapi.connect")
+    def test_context_manager_closes_connection(self, mock_connect):
+        """Test that leaving the context manager closes the connection."""
+        # Arrange
+        mock_conn = MagicMock()
+        mock_connect.return_value = mock_conn
+        data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+
+        # Act
+        with Store() as store:
+            store.add_table("table1", data)
+
+        # Assert
+        mock_conn.close.assert_called_once()
+        assert store._backend._connection is None
+
+    @patch.object(SqliteBackend, "_database_inode")
+    @patch("adbc_driver_sqlite.dbapi.connect")
+    def test_table_exists_uses_catalog_cache(self, mock_connect, mock_inode):
+        """Test that the table catalog is only fetched once and updated by add_table."""
+        # Arrange
+        mock_inode.return_value = 1
+        mock_conn = MagicMock()
+        mock_connect.return_value = mock_conn
+        table1 = MagicMock()
+        table1.as_py.return_value = "table1"
+        mock_conn.adbc_get_objects.return_value.read_all.return_value = {
+            "catalog_db_schemas": [[{"db_schema_tables": [{"table_name": table1}]}]]
+        }
+        store = Store()
+
+        # Act
+        first = store.table_exists("table1")
+        second = store.table_exists("TABLE1")
+        store.add_table("table2", pa.Table.from_arrays([pa.array([1])], names=["id"]))
+        third = store.table_exists("table2")
+
+        # Assert
+        assert first and second and third
+        mock_conn.adbc_get_objects.assert_called_once_with(depth="tables")
+
+    @patch.object(SqliteBackend, "_database_inode")
+    @patch("adbc_driver_sqlite.dbapi.connect")
+    def test_table_exists_refreshes_catalog_on_miss(self, mock_connect, mock_inode):
+        """Test that an unknown table name triggers a catalog refresh."""
+        # Arrange
+        mock_inode.return_value = 1
+        mock_conn = MagicMock()
+        mock_connect.return_value = mock_conn
+        mock_conn.adbc_get_objects.return_value.read_all.return_value = {
+            "catalog_db_schemas": [[{"db_schema_tables": []}]]
+        }
+        store = Store()
+
+        # Act
+        store.table_exists("table1")
+        store.table_exists("table1")
+
+        # Assert
+        assert mock_conn.adbc_get_objects.call_count == 2
+
+    @patch("pathlib.Path.exists")
+    @patch("pathlib.Path.unlink")
+    @patch("adbc_driver_sqlite.dbapi.connect")
+    def test_reset_closes_connection(self, mock_connect, mock_unlink, mock_exists):
+        """Test that reset closes the shared connection before removing the database."""
+        # Arrange
+        mock_exists.return_value = True
+        mock_conn = MagicMock()
+        mock_connect.return_value = mock_conn
+        store = Store()
+        store.add_table("table1", pa.Table.from_arrays([pa.array([1])], names=["id"]))
+
+        # Act
+        store.reset()
+
+        # Assert
+        mock_conn.close.assert_called_once()
+        assert mock_unlink.call_count == 3
+        assert store._backend._connection is None
+        assert store._backend._table_catalog is None
+
+    @patch("adbc_driver_sqlite.dbapi.connect")
+    def test_pragma_profile_applied_on_connect(self, mock_connect):
+        """Test the pragmas of the configured profile are applied when connecting."""
+        # Arrange
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_connect.return_value = mock_conn
+        mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+        store = Store(configuration=configuration.Configuration({"coal": {"store_pragmas": "safe"}}))
+
+        # Act
+        store.drop_index("idx")
+
+        # Assert
+        assert mock_cursor.execute.call_args_list[:2] == [
+            call("pragma journal_mode = WAL"),
+            call("pragma synchronous = FULL"),
+        ]
+
+    @patch("adbc_driver_sqlite.dbapi.connect")
+    def test_custom_pragmas(self, mock_connect):
+        """Test pragmas given as a table in the configuration."""
+        # Arrange
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_connect.return_value = mock_conn
+        mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+        store = Store(configuration=configuration.Configuration({"coal": {"store_pragmas": {"cache_size": -2000}}}))
+
+        # Act
+        store.drop_index("idx")
+
+        # Assert
+        assert mock_cursor.execute.call_args_list[0] == call("pragma cache_size = -2000")
+
+    @pytest.mark.parametrize(
+        "pragmas",
+        ["unknown_profile", {"cache_size = 0; drop table t; --": 0}],
+    )
+    def test_invalid_pragmas(self, pragmas):
+        """Test unknown profiles and invalid pragma names are rejected."""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            Store(configuration=configuration.Configuration({"coal": {"store_pragmas": pragmas}}))
+
+    @patch.object(Store, "_table_columns")
+    @patch.object(Store, "table_exists")
+    @patch("adbc_driver_sqlite.dbapi.connect")
+    def test_create_index(self, mock_connect, mock_table_exists, mock_table_columns):
+        """Test the create_index method."""
+        # Arrange
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_connect.return_value = mock_conn
+        mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_table_exists.return_value = True
+        mock_table_columns.return_value = [("source", "INTEGER"), ("target", "INTEGER")]
+        store = Store()
+
+        # Act
+        result = store.create_index("Links", ["Source", "TARGET"], unique=True)
+
+        # Assert
+        mock_table_columns.assert_called_once_with("links", ["Source", "TARGET"])
+        mock_cursor.execute.assert_called_once_with(
+            'create unique index if not exists "links_source_target_idx" on "links" ("source", "target")'
+        )
+        assert result == "links_source_target_idx"
+
+    @patch.object(Store, "table_exists")
+    def test_create_index_table_not_exists(self, mock_table_exists):
+        """Test the create_index method when the table doesn't exist."""
+        # Arrange
+        mock_table_exists.return_value = False
+        store = Store()
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            store.create_index("nonexistent_table", ["id"])
+
+    @patch.object(Store, "create_index")
+    @patch.object(Store, "_table_columns")
+    def test_create_id_indexes(self, mock_table_columns, mock_create_index):
+        """Test the create_id_indexes method only indexes the id columns."""
+        # Arrange
+        mock_table_columns.return_value = [("Source", "INTEGER"), ("weight", "REAL"), ("target", "INTEGER")]
+        mock_create_index.side_effect = lambda table_name, columns: f"{table_name}_{columns[0]}_idx"
+        store = Store()
+
+        # Act
+        result = store.create_id_indexes("links")
+
+        # Assert
+        assert mock_create_index.call_args_list == [call("links", ["Source"]), call("links", ["target"])]
+        assert result == ["links_Source_idx", "links_target_idx"]
+
+    @patch.object(Store, "create_id_indexes")
+    @patch("adbc_driver_sqlite.dbapi.connect")
+    def test_add_table_with_index_id_columns(self, mock_connect, mock_create_id_indexes):
+        """Test the add_table method indexes the id columns on request."""
+        # Arrange
+        mock_conn = MagicMock()
+        mock_connect.return_value = mock_conn
+        data = pa.Table.from_arrays([pa.array([1, 2, 3])], names=["id"])
+        store = Store()
+
+        # Act
+        store.add_table("test_table", data)
+        store.add_table("test_table", data, index_id_columns=True)
+
+        # Assert
+        mock_create_id_indexes.assert_called_once_with("test_table")
+
+    @patch.object(SqliteBackend, "execute_query")
+    def test_list_indexes(self, mock_execute_query):
+        """Test the list_indexes method groups the indexed columns by index."""
+        # Arrange
+        mock_execute_query.return_value = pa.Table.from_pylist(
+            [
+                {"table_name": "links", "index_name": "links_idx", "is_unique": 1, "column_name": "source"},
+                {"table_name": "links", "index_name": "links_idx", "is_unique": 1, "column_name": "target"},
+            ]
+        )
+        store = Store()
+
+        # Act
+        result = store.list_indexes("Links")
+
+        # Assert
+        assert mock_execute_query.call_args.kwargs["parameters"] == ["links", "links"]
+        assert result == [{"name": "links_idx", "table": "links", "columns": ["source", "target"], "unique": True}]
+
+    @patch("adbc_driver_sqlite.dbapi.connect")
+    def test_drop_index(self, mock_connect):
+        """Test the drop_index method."""
+        # Arrange
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_connect.return_value = mock_conn
+        mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+        store = Store()
+
+        # Act
+        store.drop_index("links_idx")
+
+        # Assert
+        mock_cursor.execute.assert_called_once_with('drop index if exists "links_idx"')
+
+    @patch("pathlib.Path.mkdir")
+    def test_init_with_duckdb_backend(self, mock_mkdir):
+        """Test the __init__ method selects the backend from the configuration."""
+        # Act
+        store = Store(configuration=configuration.Configuration({"coal": {"store_backend": "duckdb"}}))
+
+        # Assert
+        assert isinstance(store._backend, DuckdbBackend)
+        assert store._database_path.name == "db.duckdb"
+
+    def test_init_with_unknown_backend(self):
+        """Test the __init__ method rejects unknown backends."""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            Store(configuration=configuration.Configuration({"coal": {"store_backend": "unknown"}}))
+
+    @patch.object(SqliteBackend, "database_file")
+    def test_database_file(self, mock_database_file):
+        """Test the database_file method delegates to the backend."""
+        # Arrange
+        mock_database_file.return_value = pathlib.Path("/path/to/db.sqlite")
+        store = Store()
+
+        # Act
+        result = store.database_file()
+
+        # Assert
+        mock_database_file.assert_called_once()
+        assert result == pathlib.Path("/path/to/db.sqlite")
+
     @patch("pathlib.Path.mkdir")
     @patch("pathlib.Path.exists")
     def test_init_default_parameters(self, mock_exists, mock_mkdir):
@@ -323,8 +730,7 @@ class TestStore:
         # Assert
         mock_mkdir.assert_called_once_with(parents=True, exist_ok=True)
         assert store._database_path.name == "db.sqlite"
-        assert store._database == str(store._database_path)
-        assert not store._tables  # Should be an empty dict
+        assert store._backend._database == str(store._database_path)
 
     @patch("pathlib.Path.mkdir")
     @patch("pathlib.Path.exists")
@@ -339,10 +745,10 @@ class TestStore:
 
         # Assert
         mock_mkdir.assert_called_once_with(parents=True, exist_ok=True)
-        mock_exists.assert_called_once()
-        mock_unlink.assert_called_once()
+        assert mock_exists.call_count == 3
+        assert mock_unlink.call_count == 3
         assert store._database_path.name == "db.sqlite"
-        assert store._database == str(store._database_path)
+        assert store._backend._database == str(store._database_path)
 
     @patch("pathlib.Path.mkdir")
     def test_init_with_custom_location(self, mock_mkdir):
@@ -359,4 +765,54 @@ class TestStore:
         mock_mkdir.assert_called_once_with(parents=True, exist_ok=True)
         assert store.store_location == pathlib.Path(custom_location) / ".coal/store"
         assert store._database_path == pathlib.Path(custom_location) / ".coal/store" / "db.sqlite"
-        assert store._database == str(store._database_path)
+        assert store._backend._database == str(store._database_path)
+
+
+class TestSpool:
+    """Tests for the spool files of readers."""
+
+    def test_spool_round_trip(self, tmp_path):
+        """Test a spooled reader is read back batch by batch, then its file is removed."""
+        # Arrange
+        table = pa.table({"id": [1, 2, 3], "name": ["a", "b", None]})
+        reader = pa.RecordBatchReader.from_batches(table.schema, table.to_batches(max_chunksize=2))
+        spool_path = tmp_path / "items.arrow"
+
+        # Act
+        rows = spool_reader(reader, spool_path)
+        with read_spool(spool_path) as spooled:
+            batches = list(spooled)
+
+        # Assert
+        assert rows == 3
+        assert [batch.num_rows for batch in batches] == [2, 1]
+        assert pa.Table.from_batches(batches) == table
+        assert not spool_path.exists()
+
+
+class TestReadFiles:
+    """Tests for the read_files function."""
+
+    def test_read_files_bounded(self):
+        """Test files are read concurrently without reading more than workers files ahead of the caller."""
+        # Arrange
+        paths = [pathlib.Path(f"file{i}") for i in range(10)]
+        lock = threading.Lock()
+        started = []
+
+        def read_file(path):
+            with lock:
+                started.append(path)
+            return pa.table({"name": [path.name]})
+
+        # Act
+        results = read_files(read_file, paths, workers=2)
+        first_path, first_table = next(results)
+        started_before_consuming = len(started)
+        remaining = list(results)
+
+        # Assert
+        assert first_table == pa.table({"name": [first_path.name]})
+        # The two first files plus the one submitted when the first table got yielded
+        assert started_before_consuming <= 3
+        assert sorted([first_path] + [path for path, _ in remaining]) == sorted(paths)
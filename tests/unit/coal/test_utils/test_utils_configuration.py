@@ -62,6 +62,22 @@ class TestUtilsConfiguration:
 
         assert c.section.ref == c.section.sub.TEST
 
+    def test_default_store_keeps_coal_section(self):
+        c = configuration.Configuration({"coal": {"store_pragmas": "safe"}})
+
+        assert c.safe_get("coal.store_pragmas") == "safe"
+        assert c.coal["store"] == "$cosmotech.parameters_absolute_path"
+
+    def test_store_pragmas_from_env_var(self):
+        os.environ["CSM_STORE_PRAGMAS"] = "bulk_load"
+        try:
+            c = configuration.Configuration()
+        finally:
+            os.environ.pop("CSM_STORE_PRAGMAS")
+
+        assert c.safe_get("coal.store_pragmas") == "bulk_load"
+        assert c.coal["store"] == "$cosmotech.parameters_absolute_path"
+
     def test_safe_get(self):
         os.environ["LOG_LEVEL"] = "test_value"
         c = configuration.Configuration()
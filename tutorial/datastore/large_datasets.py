@@ -14,3 +14,12 @@ store.execute_query(
     -- Add more chunks as needed
 """
 )
+
+# Stream a large table batch by batch instead of loading it whole
+for batch in store.iter_batches("combined_data", batch_rows=chunk_size):
+    print(f"Processing {batch.num_rows} rows")
+
+# Query results can be streamed the same way
+reader = store.execute_query_reader("SELECT * FROM combined_data WHERE value > ?", parameters=[100])
+for batch in reader:
+    print(f"Processing {batch.num_rows} filtered rows")
@@ -0,0 +1,32 @@
+import tempfile
+import time
+
+import pyarrow as pa
+
+from cosmotech.coal.store.backend import SqliteBackend
+from cosmotech.coal.store.store import Store
+from cosmotech.coal.utils.configuration import Configuration
+
+# Benchmark add_table throughput of each profile
+rows = 1_000_000
+data = pa.table(
+    {
+        "id": pa.array(range(rows)),
+        "value": pa.array([i * 0.5 for i in range(rows)]),
+        "label": pa.array([f"label_{i % 1000}" for i in range(rows)]),
+    }
+)
+batches = data.to_batches(max_chunksize=10_000)
+
+for profile in SqliteBackend.PRAGMA_PROFILES:
+    with tempfile.TemporaryDirectory() as folder:
+        # Select a pragma profile for the store ("default", "bulk_load" or "safe")
+        # It can also be set with the CSM_STORE_PRAGMAS environment variable or a table of pragmas
+        configuration = Configuration({"coal": {"store": folder, "store_pragmas": profile}})
+        with Store(reset=True, configuration=configuration) as store:
+            start = time.perf_counter()
+            # One add_table per batch, as done by loaders appending data as it arrives
+            for batch in batches:
+                store.add_table("benchmark", pa.Table.from_batches([batch]))
+            duration = time.perf_counter() - start
+            print(f"{profile:>10}: {rows / duration:,.0f} rows/s")